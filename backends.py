@@ -0,0 +1,293 @@
+# backends.py
+import re
+import sqlite3
+from datetime import date, datetime
+from decimal import Decimal
+
+try:
+    import mysql.connector
+    from mysql.connector.constants import ClientFlag
+except ImportError:     # Only needed for the MySQL backend
+    mysql = None
+
+
+class PoolError(Exception):
+    """Raised when no pooled connection becomes available in time"""
+
+
+# Exception types any backend may raise
+Error = (PoolError, sqlite3.Error) + ((mysql.connector.Error,) if mysql else ())
+
+# Parameters SQLite has no native type for; Decimals go in as exact text
+sqlite3.register_adapter(Decimal, str)
+sqlite3.register_adapter(date, date.isoformat)
+sqlite3.register_adapter(datetime, lambda value: value.isoformat(" "))
+
+
+class _DictRows:
+    """Cursor wrapper returning rows as dicts, for prepared cursors that only return tuples"""
+
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def fetchone(self):
+        row = self._cursor.fetchone()
+        return None if row is None else dict(zip(self._cursor.column_names, row))
+
+    def fetchall(self):
+        names = self._cursor.column_names
+        return [dict(zip(names, row)) for row in self._cursor.fetchall()]
+
+
+class MySQLBackend:
+    """MySQL server storage through mysql-connector-python"""
+
+    name = 'mysql'
+    supports_fulltext = True
+
+    def __init__(self, **config):
+        if mysql is None:
+            raise ImportError("mysql-connector-python is required for the MySQL backend")
+        # Report the rows an UPDATE matched rather than those it changed, as SQLite does
+        self.config = dict(config, client_flags=[ClientFlag.FOUND_ROWS])
+
+    def connect(self):
+        """Open a new physical connection"""
+        return mysql.connector.connect(**self.config)
+
+    def is_healthy(self, connection):
+        """Check that a pooled connection is still usable"""
+        return connection.is_connected()
+
+    def in_transaction(self, connection):
+        return connection.in_transaction
+
+    def start_transaction(self, connection):
+        connection.start_transaction()
+
+    def cursor(self, connection, dictionary=False):
+        return connection.cursor(dictionary=dictionary)
+
+    def prepare(self, connection, dictionary=False):
+        """Open a cursor that prepares its statement on the server and reuses it while the SQL is unchanged"""
+        cursor = connection.cursor(prepared=True)
+        return _DictRows(cursor) if dictionary else cursor
+
+    def translate(self, query):
+        """Queries are written in the MySQL dialect"""
+        return query
+
+    def translate_ddl(self, statement):
+        """Schema statements are written in the MySQL dialect"""
+        return statement
+
+    def index_exists(self, cursor, table, name):
+        cursor.execute("""
+            SELECT 1 FROM information_schema.STATISTICS
+            WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND INDEX_NAME = %s
+            LIMIT 1
+        """, (table, name))
+        return bool(cursor.fetchall())
+
+    def column_exists(self, cursor, table, column):
+        cursor.execute("""
+            SELECT 1 FROM information_schema.COLUMNS
+            WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND COLUMN_NAME = %s
+        """, (table, column))
+        return bool(cursor.fetchall())
+
+    def index_sql(self, index):
+        """CREATE INDEX statement for a migrations.Index"""
+        kind = "FULLTEXT " if index.fulltext else "UNIQUE " if index.unique else ""
+        return f"CREATE {kind}INDEX {index.name} ON {index.table}({', '.join(index.columns)})"
+
+    def drop_index_sql(self, name, table):
+        return f"DROP INDEX {name} ON {table}"
+
+    def explain(self, query):
+        """Prefix a query to return its plan"""
+        return f"EXPLAIN {query}"
+
+    def full_scans(self, plan):
+        """Tables a query plan reads in full, from EXPLAIN rows"""
+        # Derived tables and union results (<derived2>, <union1,2>) are temporary
+        return [row['table'] for row in plan if row['type'] == 'ALL' and not str(row['table']).startswith('<')]
+
+    def insert_many(self, cursor, query, params_list):
+        """Run a multi-row insert and return the first inserted ID"""
+        # A plain INSERT ... VALUES is rewritten into one multi-row statement
+        cursor.executemany(query, params_list)
+        return cursor.lastrowid
+
+    def running_id(self, connection):
+        """Identify a connection for cancel()"""
+        return connection.connection_id
+
+    def finish_cursor(self, connection, cursor):
+        """Discard unread rows so the connection can be reused"""
+        if connection.unread_result:
+            connection.consume_results()
+        cursor.close()
+
+    def cancel(self, pool, running_id):
+        """Abort the statement running on another connection"""
+        # KILL has to be sent from a different connection
+        connection = pool.checkout()
+        try:
+            cursor = connection.cursor()
+            cursor.execute(f"KILL QUERY {int(running_id)}")
+            cursor.close()
+        finally:
+            pool.checkin(connection)
+
+    def row_estimate_query(self, table):
+        """Query estimating a table's row count from statistics without scanning"""
+        return """
+            SELECT TABLE_ROWS as total
+            FROM information_schema.TABLES
+            WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s
+        """, (table,)
+
+
+def _dict_row(cursor, row):
+    """sqlite3 row factory returning dicts like MySQL's dictionary cursors"""
+    return {column[0]: value for column, value in zip(cursor.description, row)}
+
+
+class SQLiteBackend:
+    """Embedded SQLite storage in a single file, using WAL mode and mmap I/O"""
+
+    name = 'sqlite'
+    supports_fulltext = False
+
+    # Statement cache per connection (sqlite3 prepares each distinct SQL once)
+    CACHED_STATEMENTS = 512
+    MMAP_SIZE = 256 * 1024 * 1024
+
+    _PARAM_RE = re.compile(r"%s")
+    _UPSERT_RE = re.compile(r"ON\s+DUPLICATE\s+KEY\s+UPDATE", re.IGNORECASE)
+    _UPSERT_VALUE_RE = re.compile(r"VALUES\((\w+)\)", re.IGNORECASE)
+    _ENUM_RE = re.compile(r"(\w+)\s+ENUM\(([^)]*)\)", re.IGNORECASE)
+    _FOR_UPDATE_RE = re.compile(r"\s+FOR\s+UPDATE\b", re.IGNORECASE)
+    _SCAN_RE = re.compile(r"SCAN (?:TABLE )?(\w+)(?: AS \w+)?")
+
+    def __init__(self, path):
+        self.path = path
+        self._translated = {}
+
+    def connect(self):
+        """Open a new connection in autocommit mode; transactions are explicit"""
+        connection = sqlite3.connect(
+            self.path,
+            timeout=30,
+            isolation_level=None,
+            check_same_thread=False,    # The pool hands connections between threads
+            cached_statements=self.CACHED_STATEMENTS
+        )
+        connection.execute("PRAGMA journal_mode = WAL")
+        connection.execute("PRAGMA synchronous = NORMAL")
+        connection.execute(f"PRAGMA mmap_size = {self.MMAP_SIZE}")
+        connection.execute("PRAGMA foreign_keys = ON")
+        return connection
+
+    def is_healthy(self, connection):
+        return True
+
+    def in_transaction(self, connection):
+        return connection.in_transaction
+
+    def start_transaction(self, connection):
+        # Take the write lock up front, like MySQL's row locks on first UPDATE
+        connection.execute("BEGIN IMMEDIATE")
+
+    def cursor(self, connection, dictionary=False):
+        cursor = connection.cursor()
+        cursor.row_factory = _dict_row if dictionary else None
+        return cursor
+
+    def prepare(self, connection, dictionary=False):
+        """Open a cursor to reuse for one statement; sqlite3 keeps it prepared in its statement cache"""
+        return self.cursor(connection, dictionary)
+
+    def translate(self, query):
+        """Rewrite a MySQL-dialect query for SQLite, caching the result"""
+        translated = self._translated.get(query)
+        if translated is None:
+            translated = self._PARAM_RE.sub("?", query)
+            translated = translated.replace("INSERT IGNORE", "INSERT OR IGNORE")
+            # BEGIN IMMEDIATE already holds the database write lock
+            translated = self._FOR_UPDATE_RE.sub("", translated)
+            upsert = self._UPSERT_RE.search(translated)
+            if upsert:
+                head, tail = translated[:upsert.start()], translated[upsert.end():]
+                tail = self._UPSERT_VALUE_RE.sub(r"excluded.\1", tail)
+                translated = f"{head}ON CONFLICT DO UPDATE SET{tail}"
+            self._translated[query] = translated
+        return translated
+
+    def translate_ddl(self, statement):
+        """Rewrite a MySQL-dialect schema statement for SQLite"""
+        statement = statement.replace("INT AUTO_INCREMENT PRIMARY KEY", "INTEGER PRIMARY KEY AUTOINCREMENT")
+        return self._ENUM_RE.sub(r"\1 TEXT CHECK (\1 IN (\2))", statement)
+
+    def index_exists(self, cursor, table, name):
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'index' AND tbl_name = ? AND name = ?",
+                       (table, name))
+        return cursor.fetchone() is not None
+
+    def column_exists(self, cursor, table, column):
+        cursor.execute(f"PRAGMA table_info({table})")
+        return any(row[1] == column for row in cursor.fetchall())
+
+    def index_sql(self, index):
+        """CREATE INDEX statement for a migrations.Index, or None if unsupported"""
+        if index.fulltext:
+            # No FULLTEXT in SQLite; searches fall back to prefix LIKE
+            return None
+        # LIKE ignores case, so only NOCASE indexes can serve prefix searches
+        collate = " COLLATE NOCASE" if index.nocase else ""
+        columns = ", ".join(f"{column}{collate}" for column in index.columns)
+        return f"CREATE {'UNIQUE ' if index.unique else ''}INDEX {index.name} ON {index.table}({columns})"
+
+    def drop_index_sql(self, name, table):
+        return f"DROP INDEX {name}"
+
+    def explain(self, query):
+        """Prefix a query to return its plan"""
+        return f"EXPLAIN QUERY PLAN {query}"
+
+    def full_scans(self, plan):
+        """Tables a query plan reads in full, from EXPLAIN QUERY PLAN rows"""
+        # "SCAN t USING INDEX ..." walks an index in order (LIMIT stops it
+        # early); a bare "SCAN t" reads every row of the table, unless t is
+        # a subquery result (MySQL's <derived> tables)
+        subqueries = {row['detail'].split()[-1] for row in plan
+                      if row['detail'].startswith(("MATERIALIZE", "CO-ROUTINE"))}
+        scans = (self._SCAN_RE.fullmatch(row['detail']) for row in plan)
+        return [scan.group(1) for scan in scans if scan and scan.group(1) not in subqueries]
+
+    def insert_many(self, cursor, query, params_list):
+        """Run a multi-row insert and return the first inserted ID"""
+        cursor.executemany(query, params_list)
+        # Rowids of one executemany are consecutive under SQLite's single writer
+        cursor.execute("SELECT last_insert_rowid()")
+        return cursor.fetchone()[0] - len(params_list) + 1
+
+    def running_id(self, connection):
+        return connection
+
+    def finish_cursor(self, connection, cursor):
+        cursor.close()
+
+    def cancel(self, pool, running_id):
+        """Abort the statement running on a connection"""
+        running_id.interrupt()
+
+    def row_estimate_query(self, table):
+        """Query counting a table's rows (cheap on SQLite's b-tree)"""
+        if not re.fullmatch(r"\w+", table):
+            raise ValueError(f"Invalid table name: {table}")
+        return f"SELECT COUNT(*) as total FROM {table}", None
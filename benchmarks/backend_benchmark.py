@@ -0,0 +1,116 @@
+# benchmarks/backend_benchmark.py
+# Run the same model workload on the MySQL and SQLite backends.
+# Run from the project root; rows are added to the configured MySQL database
+# and to a throwaway SQLite file:
+#   python -m benchmarks.backend_benchmark [mysql|sqlite ...]
+import os
+import sys
+import random
+import tempfile
+import time
+import database
+from backends import Error, SQLiteBackend
+from models.customer import Customer
+from models.bill import Bill
+from models.cache import results as result_cache
+
+CUSTOMERS = 200
+BILLS = 500
+ITEMS_PER_BILL = 10
+LOOKUPS = 500
+
+def timed(results, label, func):
+    """Time func and record the result under label"""
+    started = time.perf_counter()
+    func()
+    results[label] = time.perf_counter() - started
+
+def workload():
+    """Create customers and bills, then read them back; return timings"""
+    results = {}
+    customer_ids = []
+    bill_ids = []
+    lookups = []
+
+    def create_customers():
+        for i in range(CUSTOMERS):
+            customer = Customer(name=f"Benchmark Customer {i}", email=f"bench{i}@example.com")
+            customer.save()
+            customer_ids.append(customer.id)
+
+    def create_bills():
+        for i in range(BILLS):
+            bill = Bill(customer_id=random.choice(customer_ids))
+            for j in range(ITEMS_PER_BILL):
+                bill.add_item(f"Item {j}", j + 1, 9.99)
+            bill.save()
+            bill_ids.append(bill.id)
+
+    def scroll_bills():
+        cursor = None
+        while True:
+            page = Bill.get_page(cursor)
+            if not page:
+                break
+            cursor = Bill.page_cursor(page[-1])
+
+    def load_bills():
+        lookups[:] = random.sample(bill_ids, min(LOOKUPS, len(bill_ids)))
+        for bill_id in lookups:
+            Bill.get_by_id(bill_id)
+
+    def reload_bills():
+        for bill_id in lookups:
+            Bill.get_by_id(bill_id)
+
+    def load_bills_batched():
+        Bill.load_many(random.sample(bill_ids, min(LOOKUPS, len(bill_ids))))
+
+    def search():
+        for i in range(50):
+            Customer.search(f"Benchmark Customer {i}")
+            Bill.search("INV")
+
+    timed(results, "create customers", create_customers)
+    timed(results, "create bills", create_bills)
+    timed(results, "scroll all bills", scroll_bills)
+    timed(results, "load bills by id", load_bills)
+    timed(results, "reload bills by id", reload_bills)
+    timed(results, "load bills batched", load_bills_batched)
+    timed(results, "search", search)
+    return results
+
+def run(name):
+    """Run the workload on one backend; return timings or None if unavailable"""
+    try:
+        if name == 'sqlite':
+            path = os.path.join(tempfile.mkdtemp(), 'benchmark.db')
+            database.configure(SQLiteBackend(path))
+        else:
+            database.configure(name)
+        if not database.Database().initialize_database():
+            return None
+        results = workload()
+        stats = database.get_pool().stats()
+        print(f"{name}: prepared statements {stats['statement_hits']} hits, "
+              f"{stats['statement_misses']} misses, {stats['statement_evictions']} evicted")
+        stats = result_cache.stats()
+        print(f"{name}: result cache {stats['hits'] + stats['disk_hits']} hits, {stats['misses']} misses, "
+              f"hit rate {stats['hit_rate']:.0%}")
+        return results
+    except Error + (ImportError,) as e:
+        print(f"{name}: unavailable ({e})")
+        return None
+
+def main(names):
+    timings = {name: run(name) for name in names}
+    timings = {name: result for name, result in timings.items() if result}
+    if not timings:
+        return
+
+    print(f"{'step':<20}" + "".join(f"{name:>12}" for name in timings))
+    for step in next(iter(timings.values())):
+        print(f"{step:<20}" + "".join(f"{result[step]:>11.3f}s" for result in timings.values()))
+
+if __name__ == "__main__":
+    main(sys.argv[1:] or ['mysql', 'sqlite'])
@@ -0,0 +1,72 @@
+# benchmarks/memory_benchmark.py
+# Measure the memory held per model record. Customers, bill items and bills
+# with their items are built in bulk and the bytes still allocated afterwards
+# are divided by the record count; the dict rows the queries return for the
+# same customers are measured alongside for comparison. Needs no database:
+#   python -m benchmarks.memory_benchmark [--records N]
+import argparse
+import sys
+import tracemalloc
+from datetime import date
+from models.bill import Bill, BillItem
+from models.customer import Customer
+
+RECORDS = 50000
+ITEMS_PER_BILL = 3
+
+def measure(build, count):
+    """Return the bytes per record held by the records build(count) returns"""
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        records = build(count)
+        held = tracemalloc.get_traced_memory()[0] - before
+    finally:
+        tracemalloc.stop()
+    del records
+    return held / count
+
+def customer_rows(count):
+    return [
+        {'id': i, 'name': f"Customer {i}", 'email': f"customer{i}@example.com", 'phone': f"555{i:07d}",
+         'address': "1 Main Street", 'created_at': None}
+        for i in range(count)
+    ]
+
+def customers(count):
+    return [
+        Customer(id=i, name=f"Customer {i}", email=f"customer{i}@example.com", phone=f"555{i:07d}",
+                 address="1 Main Street")
+        for i in range(count)
+    ]
+
+def bill_items(count):
+    return [BillItem(id=i, bill_id=i, description="Item", quantity=2, unit_price="9.99") for i in range(count)]
+
+def bills(count):
+    day = date.today()
+    lines = [("Item", j + 1, "9.99") for j in range(ITEMS_PER_BILL)]
+    result = []
+    for i in range(count):
+        bill = Bill(id=i, bill_number=f"INV-{i:06d}", customer_id=i, bill_date=day, due_date=day)
+        bill.add_items(lines)
+        result.append(bill)
+    return result
+
+def main(argv):
+    parser = argparse.ArgumentParser(description="Measure memory held per model record.")
+    parser.add_argument('--records', type=int, default=RECORDS)
+    args = parser.parse_args(argv)
+
+    print(f"{'record':<28}{'bytes':>10}")
+    for name, build in (
+        ("customer row (dict)", customer_rows),
+        ("Customer", customers),
+        ("BillItem", bill_items),
+        (f"Bill with {ITEMS_PER_BILL} items", bills),
+    ):
+        print(f"{name:<28}{measure(build, args.records):>10.0f}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,151 @@
+# benchmarks/query_plans.py
+# Check that no model query reads a whole table. A model workload runs against
+# seeded data while every SELECT, UPDATE and DELETE it issues is recorded; each
+# one is then run through EXPLAIN and the check fails (exit status 1) if any
+# plan scans a table in full. Run from the project root; rows are added to the
+# configured MySQL database and to a throwaway SQLite file:
+#   python -m benchmarks.query_plans [mysql|sqlite ...]
+#
+# Queries that read every row by design (Customer.get_all, Bill.get_all,
+# report.rebuild, full exports and recompute_totals() without ids) are not
+# part of the workload.
+import os
+import sys
+import random
+import tempfile
+from contextlib import contextmanager
+from datetime import date, timedelta
+import database
+from backends import Error, SQLiteBackend
+from models import overdue, report
+from models.customer import Customer
+from models.bill import Bill
+
+# Enough rows that the optimizer prefers an index wherever one applies
+CUSTOMERS = 2000
+BILLS = 10000
+
+_CHECKED = ('SELECT', 'UPDATE', 'DELETE')
+
+@contextmanager
+def recording(queries):
+    """Record the (query, params) of every statement the models run"""
+    originals = {}
+
+    def wrap(name):
+        original = originals[name] = getattr(database.Database, name)
+
+        def recorded(self, query, params=None, *args, **kwargs):
+            if query.lstrip().upper().startswith(_CHECKED):
+                queries.setdefault(" ".join(query.split()), params)
+            return original(self, query, params, *args, **kwargs)
+        setattr(database.Database, name, recorded)
+
+    for name in ('execute_query', 'fetch_all', 'fetch_one', 'iter_chunks'):
+        wrap(name)
+    try:
+        yield queries
+    finally:
+        for name, original in originals.items():
+            setattr(database.Database, name, original)
+
+def seed(db):
+    """Add customers and bills spread over three years"""
+    first = db.insert_many(
+        "INSERT INTO customers (name, email, phone) VALUES (%s, %s, %s)",
+        [(f"Plan Customer {i}", f"plan{i}@example.com", f"555{i:07d}") for i in range(CUSTOMERS)]
+    )
+    today = date.today()
+    statuses = ['PENDING', 'PAID', 'PAID', 'PAID', 'OVERDUE']
+    rows = []
+    for i in range(BILLS):
+        bill_date = today - timedelta(days=random.randrange(3 * 365))
+        rows.append((
+            f"PLAN-{os.getpid()}-{i:06d}", first + random.randrange(CUSTOMERS), bill_date,
+            bill_date + timedelta(days=30), 100, 10, 110, random.choice(statuses)
+        ))
+    db.insert_many(
+        """
+        INSERT INTO bills (bill_number, customer_id, bill_date, due_date, total_amount, tax_amount,
+                           grand_total, status)
+        VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+        """,
+        rows
+    )
+    report.rebuild(db)
+
+def workload():
+    """Exercise every model query path once"""
+    customer = Customer(name="Plan Check", email="plan.check@example.com", phone="5550000000")
+    customer.save()
+    customer.address = "1 Plan Street"
+    customer.save()
+    Customer.get_by_id(customer.id)
+    Customer.search("Pl")
+    Customer.search("Plan Customer 12")
+
+    bill = Bill(customer_id=customer.id)
+    bill.add_item("Planning", 2, 50)
+    bill.save()
+    bill.add_item("Review", 1, 25)
+    bill.save()
+    Bill.get_by_id(bill.id)
+    Bill.load_many([bill.id, bill.id + 1])
+    list(Bill.iter_with_items(customer_id=customer.id))
+    bill.update_item(0, quantity=3)
+    bill.remove_item(1)
+    bill.save()
+
+    page = Bill.get_page()
+    Bill.get_page(Bill.page_cursor(page[-1]))
+    Bill.get_by_customer(customer.id)
+    Bill.search("PL")
+    Bill.search("PLAN-1")
+    Bill.search("Plan Customer")
+    Bill.recompute_totals([bill.id])
+
+    today = date.today()
+    report.period_totals(report.quarter_start(today), today)
+    report.monthly_totals(today.replace(month=1, day=1), today)
+    report.outstanding_by_customer()
+    overdue.sweep()
+
+    bill.delete()
+    customer.delete()
+
+def check(name):
+    """Run the workload on one backend and EXPLAIN what it ran; return the failures or None"""
+    try:
+        if name == 'sqlite':
+            path = os.path.join(tempfile.mkdtemp(), 'query_plans.db')
+            database.configure(SQLiteBackend(path))
+        else:
+            database.configure(name)
+        db = database.Database()
+        if not db.initialize_database():
+            return None
+        seed(db)
+    except Error + (ImportError,) as e:
+        print(f"{name}: unavailable ({e})")
+        return None
+
+    with recording({}) as queries:
+        workload()
+
+    failures = []
+    for query, params in queries.items():
+        plan = db.fetch_all(db.backend.explain(query), params)
+        scans = db.backend.full_scans(plan)
+        result = f"FULL SCAN {', '.join(scans)}" if scans else "ok" if plan else "EXPLAIN FAILED"
+        print(f"{name:<8}{result:<24}{query[:100]}")
+        if scans or not plan:
+            failures.append(query)
+    print(f"{name}: {len(queries)} queries, {len(failures)} with full scans")
+    return failures
+
+def main(names):
+    results = [check(name) for name in names]
+    return 1 if any(results) else 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:] or ['mysql', 'sqlite']))
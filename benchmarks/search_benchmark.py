@@ -0,0 +1,58 @@
+# benchmarks/search_benchmark.py
+# Compare indexed search against the old leading-wildcard LIKE queries.
+# Run from the project root against a populated database:
+#   python -m benchmarks.search_benchmark [term ...]
+import sys
+import time
+from database import Database
+from models.customer import Customer
+from models.bill import Bill
+
+ROUNDS = 20
+DEFAULT_TERMS = ["smith", "john", "example", "INV-2025", "ltd"]
+
+def like_customers(db, term):
+    """Customer search as it was before full-text indexing"""
+    query = """
+        SELECT * FROM customers
+        WHERE name LIKE %s OR email LIKE %s OR phone LIKE %s
+        ORDER BY name
+    """
+    search_term = f"%{term}%"
+    return db.fetch_all(query, (search_term, search_term, search_term))
+
+def like_bills(db, term):
+    """Bill search as it was before full-text indexing"""
+    query = """
+        SELECT b.*, c.name as customer_name
+        FROM bills b
+        JOIN customers c ON b.customer_id = c.id
+        WHERE b.bill_number LIKE %s OR c.name LIKE %s
+        ORDER BY b.bill_date DESC
+    """
+    search_term = f"%{term}%"
+    return db.fetch_all(query, (search_term, search_term))
+
+def timed(func, term):
+    """Return (mean milliseconds, result count) over ROUNDS calls"""
+    started = time.perf_counter()
+    for _ in range(ROUNDS):
+        rows = func(term)
+    return (time.perf_counter() - started) * 1000 / ROUNDS, len(rows)
+
+def main(terms):
+    db = Database()
+    cases = [
+        ("customers", lambda term: like_customers(db, term), Customer.search),
+        ("bills", lambda term: like_bills(db, term), Bill.search),
+    ]
+    print(f"{'table':<10} {'term':<12} {'LIKE ms':>9} {'rows':>7} {'index ms':>9} {'rows':>7} {'speedup':>8}")
+    for table, like, indexed in cases:
+        for term in terms:
+            like_ms, like_rows = timed(like, term)
+            index_ms, index_rows = timed(indexed, term)
+            speedup = like_ms / index_ms if index_ms else float('inf')
+            print(f"{table:<10} {term:<12} {like_ms:>9.2f} {like_rows:>7} {index_ms:>9.2f} {index_rows:>7} {speedup:>7.1f}x")
+
+if __name__ == "__main__":
+    main(sys.argv[1:] or DEFAULT_TERMS)
@@ -0,0 +1,112 @@
+# benchmarks/startup_benchmark.py
+# Time cold starts of the application: from launching the interpreter to the
+# first paint of the main window, and to the customer list being filled. Each
+# run is a fresh process on the real startup path (main.start). Run from the
+# project root; the SQLite runs use a throwaway database seeded with customers:
+#   python -m benchmarks.startup_benchmark [mysql|sqlite] [--runs N]
+# Exits non-zero when the median time to first paint misses FIRST_PAINT_TARGET.
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+# Median seconds from launch to the first paint of the main window
+FIRST_PAINT_TARGET = 1.0
+
+CUSTOMERS = 5000
+RUNS = 5
+
+def seed(path):
+    """Create a migrated SQLite database with customers"""
+    import database
+    from backends import SQLiteBackend
+    database.configure(SQLiteBackend(path))
+    db = database.Database()
+    db.initialize_database()
+    db.insert_many(
+        "INSERT INTO customers (name, email, phone) VALUES (%s, %s, %s)",
+        [(f"Startup Customer {i}", f"startup{i}@example.com", f"555{i:07d}") for i in range(CUSTOMERS)]
+    )
+    database.get_pool().close_all()
+
+def child(backend, path, launched):
+    """Start the application and print the timings as JSON"""
+    timings = {}
+    import main
+    timings['imports'] = time.time() - launched
+
+    from PySide6.QtCore import QEvent, QObject, QTimer
+    from PySide6.QtWidgets import QApplication
+    import database
+    from backends import SQLiteBackend
+    from ui.customers_view import CustomersView
+
+    database.configure(SQLiteBackend(path) if backend == 'sqlite' else backend)
+    app = QApplication([])
+
+    class PaintWatcher(QObject):
+        def eventFilter(self, watched, event):
+            if event.type() == QEvent.Paint and 'first_paint' not in timings:
+                timings['first_paint'] = time.time() - launched
+            return False
+
+    watcher = PaintWatcher()
+    app.installEventFilter(watcher)
+    window = main.start(app)
+
+    def poll():
+        view = window.pages.get(CustomersView)
+        if view is not None and view.model.rowCount() > 0:
+            timings['customers_loaded'] = time.time() - launched
+            app.quit()
+
+    timer = QTimer()
+    timer.timeout.connect(poll)
+    timer.start(5)
+    QTimer.singleShot(30000, app.quit)
+    app.exec()
+    print(json.dumps(timings))
+
+def run(backend, path):
+    """Launch one cold start and return its timings"""
+    env = dict(os.environ, STARTUP_BENCHMARK_LAUNCHED=repr(time.time()))
+    result = subprocess.run(
+        [sys.executable, '-m', 'benchmarks.startup_benchmark', '--child', backend, '--path', path or ''],
+        env=env, capture_output=True, text=True
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+def main(argv):
+    parser = argparse.ArgumentParser(description="Time application cold starts.")
+    parser.add_argument('backend', nargs='?', default='sqlite', choices=['mysql', 'sqlite'])
+    parser.add_argument('--runs', type=int, default=RUNS)
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('--path', help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        child(args.backend, args.path, float(os.environ['STARTUP_BENCHMARK_LAUNCHED']))
+        return 0
+
+    path = None
+    if args.backend == 'sqlite':
+        path = os.path.join(tempfile.mkdtemp(), 'startup.db')
+        seed(path)
+
+    runs = [run(args.backend, path) for _ in range(args.runs)]
+    print(f"{'step':<20}{'median':>10}{'max':>10}")
+    for step in ('imports', 'first_paint', 'customers_loaded'):
+        values = [timings[step] for timings in runs if step in timings]
+        if values:
+            print(f"{step:<20}{statistics.median(values):>9.3f}s{max(values):>9.3f}s")
+
+    first_paint = statistics.median(timings.get('first_paint', float('inf')) for timings in runs)
+    print(f"First paint target {FIRST_PAINT_TARGET:.1f}s: {'met' if first_paint <= FIRST_PAINT_TARGET else 'MISSED'}")
+    return 0 if first_paint <= FIRST_PAINT_TARGET else 1
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
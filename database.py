@@ -1,7 +1,11 @@
 # database.py
 import os
-import mysql.connector
-from mysql.connector import Error
+import time
+import threading
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from backends import Error, PoolError, MySQLBackend, SQLiteBackend
+import migrations
 from datetime import datetime
 import logging
 
@@ -15,132 +19,532 @@ logging.basicConfig(
     ]
 )
 
+# Storage backend: 'mysql' or 'sqlite' (override with BILLING_DB_BACKEND)
+DB_BACKEND = os.environ.get('BILLING_DB_BACKEND', 'mysql')
+
+# SQLite database file
+SQLITE_PATH = os.path.join('data', 'billing.db')
+
+# MySQL connection settings
+DB_CONFIG = {
+    'host': 'localhost',
+    'user': 'root',         # Replace with your MySQL username
+    'password': '9899',     # Replace with your MySQL password
+    'database': 'billing_app',
+    'connection_timeout': 3 # Seconds to wait for the server when connecting
+}
+
+# Pool settings
+POOL_SIZE = 10              # Maximum number of open connections
+POOL_TIMEOUT = 30           # Seconds to wait for a free connection
+POOL_IDLE_TIMEOUT = 300     # Seconds before an idle connection is closed
+STATEMENT_CACHE_SIZE = 100  # Prepared statements kept per connection
+
+
+def create_backend(name=None):
+    """Create the storage backend selected by name or DB_BACKEND"""
+    name = name or DB_BACKEND
+    if name == 'mysql':
+        return MySQLBackend(**DB_CONFIG)
+    if name == 'sqlite':
+        return SQLiteBackend(SQLITE_PATH)
+    raise ValueError(f"Unknown database backend: {name}")
+
+
+class StatementCache:
+    """Prepared statements of one connection keyed by SQL text, least recently used first
+
+    Each entry is a cursor from backend.prepare() that keeps its statement
+    prepared, so running the same SQL again skips parsing and planning.
+    Only the thread holding the connection uses its cache.
+    """
+
+    def __init__(self, backend, connection, size=STATEMENT_CACHE_SIZE):
+        self.backend = backend
+        self.connection = connection
+        self.size = size
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._cursors = OrderedDict()   # (query, dictionary) -> cursor
+
+    def get(self, query, dictionary=False):
+        """Get the cursor for a statement, preparing a new one on a miss"""
+        key = (query, dictionary)
+        cursor = self._cursors.get(key)
+        if cursor is not None:
+            self._cursors.move_to_end(key)
+            self.hits += 1
+            return cursor
+
+        self.misses += 1
+        cursor = self._cursors[key] = self.backend.prepare(self.connection, dictionary)
+        while len(self._cursors) > self.size:
+            _, evicted = self._cursors.popitem(last=False)
+            self.evictions += 1
+            self._release(evicted)
+        return cursor
+
+    def discard(self, query, dictionary=False):
+        """Drop a statement, so it is prepared afresh next time"""
+        cursor = self._cursors.pop((query, dictionary), None)
+        if cursor is not None:
+            self._release(cursor)
+
+    def _release(self, cursor):
+        """Close a cursor, deallocating its statement, ignoring errors"""
+        try:
+            cursor.close()
+        except Error:
+            pass
+
+
+class ConnectionPool:
+    """Size-bounded pool of backend connections shared by the whole process"""
+
+    def __init__(self, backend, size=POOL_SIZE, timeout=POOL_TIMEOUT, idle_timeout=POOL_IDLE_TIMEOUT):
+        self.backend = backend
+        self.size = size
+        self.timeout = timeout
+        self.idle_timeout = idle_timeout
+        self._idle = deque()        # (connection, last_used) pairs, most recent on the right
+        self._open = 0              # Connections currently open (idle + in use)
+        self._in_use = 0
+        self._cond = threading.Condition()
+        self._statements = {}       # Connection -> StatementCache
+        self.unreachable = False    # Whether the last checkout failed to connect
+        self._metrics = {
+            'checkouts': 0,
+            'waits': 0,
+            'wait_time': 0.0,
+            'timeouts': 0,
+            'created': 0,
+            'evicted': 0,
+            'health_failures': 0,
+            'statement_hits': 0,
+            'statement_misses': 0,
+            'statement_evictions': 0,
+        }
+
+    def _create(self):
+        """Open a new physical connection"""
+        try:
+            connection = self.backend.connect()
+        except Error:
+            self.unreachable = True
+            raise
+        with self._cond:
+            self._metrics['created'] += 1
+        logging.info(f"Connected to {self.backend.name} database")
+        return connection
+
+    def _close(self, connection):
+        """Close a physical connection, ignoring errors"""
+        # Closing the connection deallocates its prepared statements
+        with self._cond:
+            statements = self._statements.pop(connection, None)
+            if statements is not None:
+                self._add_statement_counts(self._metrics, statements)
+        try:
+            connection.close()
+        except Error:
+            pass
+
+    def _evict_idle(self):
+        """Close connections that have been idle longer than idle_timeout (lock held)"""
+        cutoff = time.monotonic() - self.idle_timeout
+        while self._idle and self._idle[0][1] < cutoff:
+            connection, _ = self._idle.popleft()
+            self._open -= 1
+            self._metrics['evicted'] += 1
+            self._close(connection)
+
+    def checkout(self):
+        """Take a healthy connection from the pool, opening one if allowed"""
+        deadline = time.monotonic() + self.timeout
+        with self._cond:
+            self._evict_idle()
+            waited = False
+            started = time.monotonic()
+            while not self._idle and self._open >= self.size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._metrics['timeouts'] += 1
+                    raise PoolError("Timed out waiting for a database connection")
+                if not waited:
+                    waited = True
+                    self._metrics['waits'] += 1
+                self._cond.wait(remaining)
+            if waited:
+                self._metrics['wait_time'] += time.monotonic() - started
+
+            connection = self._idle.pop()[0] if self._idle else None
+            if connection is None:
+                self._open += 1
+            self._in_use += 1
+            self._metrics['checkouts'] += 1
+
+        # Connect and health check outside the lock
+        try:
+            if connection is not None and not self.backend.is_healthy(connection):
+                with self._cond:
+                    self._metrics['health_failures'] += 1
+                self._close(connection)
+                connection = None
+            if connection is None:
+                connection = self._create()
+            # Any usable connection, new or pooled, shows the server is reachable
+            self.unreachable = False
+            return connection
+        except Error:
+            with self._cond:
+                self._open -= 1
+                self._in_use -= 1
+                self._cond.notify()
+            raise
+
+    def checkin(self, connection):
+        """Return a connection to the pool"""
+        try:
+            if self.backend.in_transaction(connection):
+                connection.rollback()
+            healthy = True
+        except Error:
+            healthy = False
+
+        with self._cond:
+            self._in_use -= 1
+            if healthy:
+                self._idle.append((connection, time.monotonic()))
+            else:
+                self._open -= 1
+                self._close(connection)
+            self._cond.notify()
+
+    def statements(self, connection):
+        """Get the prepared statement cache of a connection"""
+        statements = self._statements.get(connection)
+        if statements is None:
+            with self._cond:
+                statements = self._statements.setdefault(connection, StatementCache(self.backend, connection))
+        return statements
+
+    @staticmethod
+    def _add_statement_counts(metrics, statements):
+        metrics['statement_hits'] += statements.hits
+        metrics['statement_misses'] += statements.misses
+        metrics['statement_evictions'] += statements.evictions
+
+    def close_all(self):
+        """Close every idle connection"""
+        with self._cond:
+            while self._idle:
+                connection, _ = self._idle.pop()
+                self._open -= 1
+                self._close(connection)
+        logging.info("Database connection pool closed")
+
+    def stats(self):
+        """Return a snapshot of pool metrics"""
+        with self._cond:
+            stats = dict(self._metrics)
+            for statements in self._statements.values():
+                self._add_statement_counts(stats, statements)
+            stats.update(size=self.size, open=self._open, idle=len(self._idle), in_use=self._in_use)
+        return stats
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    """Return the process-wide connection pool, creating it on first use"""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool(create_backend())
+    return _pool
+
+
+def configure(backend):
+    """Switch the process-wide pool to a backend name or instance"""
+    global _pool
+    if isinstance(backend, str):
+        backend = create_backend(backend)
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close_all()
+        _pool = ConnectionPool(backend)
+    return _pool
+
+
+def get_backend():
+    """Return the storage backend in use"""
+    return get_pool().backend
+
+
 class Database:
     """Database connection and operations class"""
-    
-    def __init__(self):
-        """Initialize database connection"""
-        self.connection = None
-        self.connect()
-        
-    def connect(self):
-        """Connect to MySQL database"""
-        try:
-            self.connection = mysql.connector.connect(
-                host='localhost',
-                user='root',         # Replace with your MySQL username
-                password='9899', # Replace with your MySQL password
-                database='billing_app'
-            )
-            
-            if self.connection.is_connected():
-                logging.info("Connected to MySQL database")
-        except Error as e:
-            logging.error(f"Error connecting to MySQL: {e}")
-            
-    def disconnect(self):
-        """Close database connection"""
-        if self.connection and self.connection.is_connected():
-            self.connection.close()
-            logging.info("MySQL connection closed")
-    
+
+    def __init__(self, pool=None):
+        """Initialize database access on top of the shared pool"""
+        self.pool = pool or get_pool()
+        self.backend = self.pool.backend
+        self.connection = None      # Pinned connection while a transaction is open
+        self._running_id = None     # Backend handle of a streaming query in progress
+        self._running_lock = threading.Lock()
+
+    @contextmanager
+    def _connection(self):
+        """Use the transaction's connection, or check one out for a single operation"""
+        if self.connection is not None:
+            yield self.connection
+            return
+        connection = self.pool.checkout()
+        try:
+            yield connection
+        finally:
+            self.pool.checkin(connection)
+
+    @contextmanager
+    def _prepared(self, query, params=None, dictionary=False):
+        """Run a statement through the connection's prepared statement cache; yields (connection, cursor)
+
+        The cursor stays cached, so callers read every row and do not close it.
+        """
+        query = self.backend.translate(query)
+        with self._connection() as connection:
+            statements = self.pool.statements(connection)
+            cursor = statements.get(query, dictionary)
+            try:
+                if params:
+                    cursor.execute(query, params)
+                else:
+                    cursor.execute(query)
+                yield connection, cursor
+            except Error:
+                # The cursor may be left mid-result, so it is not reused
+                statements.discard(query, dictionary)
+                raise
+
     def execute_query(self, query, params=None):
         """Execute a query with no return value"""
         try:
-            if not self.connection or not self.connection.is_connected():
-                self.connect()
-                
-            cursor = self.connection.cursor()
-            if params:
-                cursor.execute(query, params)
-            else:
-                cursor.execute(query)
-                
-            self.connection.commit()
-            cursor.close()
+            with self._prepared(query, params) as (connection, cursor):
+                if self.connection is None:
+                    connection.commit()
             return True
         except Error as e:
             logging.error(f"Error executing query: {e}")
             return False
-    
-    def fetch_all(self, query, params=None):
-        """Execute a query and return all results"""
-        try:
-            if not self.connection or not self.connection.is_connected():
-                self.connect()
-                
-            cursor = self.connection.cursor(dictionary=True)
-            if params:
-                cursor.execute(query, params)
-            else:
-                cursor.execute(query)
-                
-            result = cursor.fetchall()
-            cursor.close()
-            return result
+
+    def fetch_all(self, query, params=None, dictionary=True):
+        """Execute a query and return all results
+
+        Rows are dicts, or plain tuples in select-list order with dictionary=False,
+        which skips building a dict per row.
+        """
+        try:
+            with self._prepared(query, params, dictionary) as (connection, cursor):
+                return cursor.fetchall()
         except Error as e:
             logging.error(f"Error fetching data: {e}")
             return []
-    
+
+    def iter_chunks(self, query, params=None, size=500, dictionary=True):
+        """Execute a query and yield results as lists of up to size rows (tuples with dictionary=False)
+
+        A failure is logged and raised, including a query aborted by cancel(),
+        so a read cut short is never taken for the end of the results.
+        """
+        try:
+            with self._connection() as connection:
+                cursor = self.backend.cursor(connection, dictionary=dictionary)
+                with self._running_lock:
+                    self._running_id = self.backend.running_id(connection)
+                try:
+                    if params:
+                        cursor.execute(self.backend.translate(query), params)
+                    else:
+                        cursor.execute(self.backend.translate(query))
+
+                    while True:
+                        rows = cursor.fetchmany(size)
+                        if not rows:
+                            break
+                        yield rows
+                finally:
+                    # Hold the lock until the connection is clean so cancel()
+                    # can never hit a connection that went back to the pool
+                    with self._running_lock:
+                        self._running_id = None
+                        self.backend.finish_cursor(connection, cursor)
+        except Error as e:
+            logging.error(f"Error fetching data: {e}")
+            raise
+
+    def cancel(self):
+        """Abort the streaming query this instance is running, if any"""
+        with self._running_lock:
+            if self._running_id is None:
+                return False
+            try:
+                self.backend.cancel(self.pool, self._running_id)
+                return True
+            except Error as e:
+                logging.error(f"Error cancelling query: {e}")
+                return False
+
     def fetch_one(self, query, params=None):
         """Execute a query and return one result"""
         try:
-            if not self.connection or not self.connection.is_connected():
-                self.connect()
-                
-            cursor = self.connection.cursor(dictionary=True)
-            if params:
-                cursor.execute(query, params)
-            else:
-                cursor.execute(query)
-                
-            result = cursor.fetchone()
-            cursor.close()
+            with self._prepared(query, params, dictionary=True) as (connection, cursor):
+                result = cursor.fetchone()
+                cursor.fetchall()
             return result
         except Error as e:
             logging.error(f"Error fetching data: {e}")
             return None
-    
+
     def insert(self, query, params=None):
         """Insert a record and return the last inserted ID"""
         try:
-            if not self.connection or not self.connection.is_connected():
-                self.connect()
-                
-            cursor = self.connection.cursor()
-            if params:
-                cursor.execute(query, params)
-            else:
-                cursor.execute(query)
-                
-            self.connection.commit()
-            last_id = cursor.lastrowid
-            cursor.close()
-            return last_id
+            with self._prepared(query, params) as (connection, cursor):
+                if self.connection is None:
+                    connection.commit()
+                return cursor.lastrowid
         except Error as e:
             logging.error(f"Error inserting data: {e}")
             return None
-    
+
+    def insert_many(self, query, params_list):
+        """Insert many records in one round trip and return the first inserted ID"""
+        if not params_list:
+            return None
+        try:
+            with self._connection() as connection:
+                cursor = self.backend.cursor(connection)
+                first_id = self.backend.insert_many(cursor, self.backend.translate(query), params_list)
+
+                if self.connection is None:
+                    connection.commit()
+                cursor.close()
+            return first_id
+        except Error as e:
+            logging.error(f"Error inserting data: {e}")
+            return None
+
+    def execute_many(self, query, params_list):
+        """Execute a statement once per parameter set with no return value"""
+        if not params_list:
+            return True
+        try:
+            with self._connection() as connection:
+                cursor = self.backend.cursor(connection)
+                cursor.executemany(self.backend.translate(query), params_list)
+
+                if self.connection is None:
+                    connection.commit()
+                cursor.close()
+            return True
+        except Error as e:
+            logging.error(f"Error executing query: {e}")
+            return False
+
+    def update_many(self, query, params_list):
+        """Execute an UPDATE once per parameter set and return the rows matched, or None on error"""
+        if not params_list:
+            return 0
+        try:
+            with self._connection() as connection:
+                cursor = self.backend.cursor(connection)
+                cursor.executemany(self.backend.translate(query), params_list)
+                matched = cursor.rowcount
+
+                if self.connection is None:
+                    connection.commit()
+                cursor.close()
+            return matched
+        except Error as e:
+            logging.error(f"Error executing query: {e}")
+            return None
+
+    def estimate_rows(self, table):
+        """Estimate a table's row count as cheaply as the backend allows"""
+        query, params = self.backend.row_estimate_query(table)
+        result = self.fetch_one(query, params)
+        if result and result['total'] is not None:
+            return int(result['total'])
+        return 0
+
+    def is_reachable(self):
+        """Whether the last connection checkout, new or pooled, succeeded; tries no connection itself"""
+        return not self.pool.unreachable
+
+    def probe(self):
+        """Try to obtain a connection, connecting if none is idle, and return whether it worked"""
+        try:
+            with self._connection():
+                return True
+        except Error:
+            return False
+
+    def begin(self):
+        """Start a transaction, pinning one pooled connection until commit/rollback"""
+        if self.connection is not None:
+            logging.error("Transaction already in progress")
+            return False
+        try:
+            connection = self.pool.checkout()
+        except Error as e:
+            logging.error(f"Error starting transaction: {e}")
+            return False
+        try:
+            self.backend.start_transaction(connection)
+        except Error as e:
+            self.pool.checkin(connection)
+            logging.error(f"Error starting transaction: {e}")
+            return False
+        self.connection = connection
+        return True
+
+    def commit(self):
+        """Commit the current transaction and release its connection"""
+        if self.connection is None:
+            return False
+        connection, self.connection = self.connection, None
+        try:
+            connection.commit()
+            return True
+        except Error as e:
+            logging.error(f"Error committing transaction: {e}")
+            return False
+        finally:
+            self.pool.checkin(connection)
+
+    def rollback(self):
+        """Roll back the current transaction and release its connection"""
+        if self.connection is None:
+            return False
+        connection, self.connection = self.connection, None
+        try:
+            connection.rollback()
+            return True
+        except Error as e:
+            logging.error(f"Error rolling back transaction: {e}")
+            return False
+        finally:
+            self.pool.checkin(connection)
+
     def initialize_database(self):
-        """Initialize database with schema if not exists"""
-        try:
-            # Read schema file
-            with open('schema.sql', 'r') as f:
-                sql_commands = f.read()
-            
-            # Execute each command
-            cursor = self.connection.cursor()
-            for command in sql_commands.split(';'):
-                if command.strip():
-                    cursor.execute(command + ';')
-            
-            self.connection.commit()
-            cursor.close()
+        """Bring the database schema up to date by applying pending migrations"""
+        try:
+            with self._connection() as connection:
+                migrations.migrate(self.backend, connection)
             logging.info("Database initialized successfully")
             return True
         except Error as e:
             logging.error(f"Error initializing database: {e}")
             return False
-        except FileNotFoundError:
-            logging.error("Schema file not found")
-            return False
\ No newline at end of file
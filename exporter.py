@@ -0,0 +1,251 @@
+# exporter.py
+# Streaming export of bills, bill items or customers to CSV, Parquet or Arrow.
+# Rows are read from the database and written in chunks, so memory use stays
+# flat however many rows are exported. Run from the project root:
+#   python exporter.py bills bills.csv --from 2024-01-01 --to 2024-12-31
+#   python exporter.py items items.parquet --status PAID
+# Parquet and Arrow output needs pyarrow.
+import argparse
+import csv
+import os
+import sys
+import time
+from datetime import date, datetime
+from backends import Error
+from database import Database
+from models.money import RATE_PLACES, to_decimal
+
+try:
+    import pyarrow
+    import pyarrow.ipc
+    import pyarrow.parquet
+except ImportError:     # Only needed for Parquet and Arrow output
+    pyarrow = None
+
+# Rows fetched and written per chunk
+CHUNK_SIZE = 5000
+
+# Output formats by file extension
+FORMATS = {'.csv': 'csv', '.parquet': 'parquet', '.arrow': 'arrow'}
+
+# Columns of each dataset as (name, type) pairs
+DATASETS = {
+    'bills': [
+        ('id', 'int'), ('bill_number', 'text'), ('customer_id', 'int'), ('customer_name', 'text'),
+        ('bill_date', 'date'), ('due_date', 'date'), ('total_amount', 'money'), ('tax_amount', 'money'),
+        ('grand_total', 'money'), ('tax_rate', 'rate'), ('status', 'text'), ('notes', 'text'),
+        ('created_at', 'datetime'),
+    ],
+    'items': [
+        ('id', 'int'), ('bill_id', 'int'), ('bill_number', 'text'), ('description', 'text'),
+        ('quantity', 'money'), ('unit_price', 'money'), ('amount', 'money'), ('tax_rate', 'rate'),
+    ],
+    'customers': [
+        ('id', 'int'), ('name', 'text'), ('email', 'text'), ('phone', 'text'), ('address', 'text'),
+        ('created_at', 'datetime'),
+    ],
+}
+
+_QUERIES = {
+    'bills': """
+        SELECT b.id, b.bill_number, b.customer_id, c.name as customer_name, b.bill_date, b.due_date,
+               b.total_amount, b.tax_amount, b.grand_total, b.tax_rate, b.status, b.notes, b.created_at
+        FROM bills b
+        JOIN customers c ON b.customer_id = c.id
+    """,
+    'items': """
+        SELECT i.id, i.bill_id, b.bill_number, i.description, i.quantity, i.unit_price, i.amount, i.tax_rate
+        FROM bill_items i
+        JOIN bills b ON b.id = i.bill_id
+    """,
+    'customers': """
+        SELECT c.id, c.name, c.email, c.phone, c.address, c.created_at
+        FROM customers c
+    """,
+}
+
+_ORDER = {'bills': "b.id", 'items': "i.id", 'customers': "c.id"}
+
+# Table holding one row per exported row of each dataset
+_TABLES = {'bills': 'bills', 'items': 'bill_items', 'customers': 'customers'}
+
+def _convert(value, kind):
+    """Normalise a column value so both backends export the same types"""
+    if value is None:
+        return None
+    if kind == 'money':
+        return to_decimal(value)
+    if kind == 'rate':
+        return to_decimal(value, RATE_PLACES)
+    if kind == 'date' and not isinstance(value, date):
+        return date.fromisoformat(str(value))
+    if kind == 'datetime' and not isinstance(value, datetime):
+        return datetime.fromisoformat(str(value))
+    return value
+
+
+class CsvWriter:
+    """Writes rows to a CSV file with a header row"""
+
+    def __init__(self, path, columns):
+        self._file = open(path, 'w', newline='', encoding='utf-8')
+        self._writer = csv.writer(self._file)
+        self._writer.writerow([name for name, _ in columns])
+
+    def write(self, rows):
+        self._writer.writerows(rows)
+
+    def close(self):
+        self._file.close()
+
+
+class ArrowWriter:
+    """Writes rows to a Parquet or Arrow IPC file, one record batch per chunk"""
+
+    TYPES = {
+        'int': lambda: pyarrow.int64(),
+        'text': lambda: pyarrow.string(),
+        'money': lambda: pyarrow.decimal128(10, 2),
+        'rate': lambda: pyarrow.decimal128(5, 4),
+        'date': lambda: pyarrow.date32(),
+        'datetime': lambda: pyarrow.timestamp('s'),
+    }
+
+    def __init__(self, path, columns, format):
+        self.schema = pyarrow.schema([(name, self.TYPES[kind]()) for name, kind in columns])
+        if format == 'parquet':
+            self._writer = pyarrow.parquet.ParquetWriter(path, self.schema)
+        else:
+            self._writer = pyarrow.ipc.new_file(path, self.schema)
+
+    def write(self, rows):
+        columns = list(zip(*rows))
+        arrays = [pyarrow.array(values, type=field.type) for values, field in zip(columns, self.schema)]
+        self._writer.write_batch(pyarrow.RecordBatch.from_arrays(arrays, schema=self.schema))
+
+    def close(self):
+        self._writer.close()
+
+
+class Exporter:
+    """Streams one dataset to a file, optionally filtered by bill date and status
+
+    Rows are read with a streaming cursor and written chunk by chunk to a
+    temporary file, which replaces path only when the query has read every
+    row without error or cancellation. The date and status filters apply
+    to bills and items.
+    """
+
+    def __init__(self, dataset, path, date_from=None, date_to=None, status=None, chunk_size=CHUNK_SIZE):
+        if dataset not in DATASETS:
+            raise ValueError(f"Unknown dataset: {dataset}")
+        format = FORMATS.get(os.path.splitext(path)[1].lower())
+        if format is None:
+            raise ValueError(f"Unsupported file type: {path}")
+        if format != 'csv' and pyarrow is None:
+            raise ValueError("pyarrow is required for Parquet and Arrow output")
+        self.dataset = dataset
+        self.path = path
+        self.format = format
+        self.date_from = date_from
+        self.date_to = date_to
+        self.status = status
+        self.chunk_size = chunk_size
+        self.cancelled = False
+        self.db = Database()
+
+    def _filter(self):
+        """Build the WHERE clause and parameters for the filters"""
+        conditions = []
+        params = []
+        if self.dataset != 'customers':
+            if self.date_from:
+                conditions.append("b.bill_date >= %s")
+                params.append(self.date_from)
+            if self.date_to:
+                conditions.append("b.bill_date <= %s")
+                params.append(self.date_to)
+            if self.status:
+                conditions.append("b.status = %s")
+                params.append(self.status)
+        where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+        return where, tuple(params)
+
+    def estimate(self):
+        """Estimate the rows the export will write, for progress only"""
+        where, params = self._filter()
+        if not where:
+            # Every row of the table is exported; its statistics avoid a scan
+            return self.db.estimate_rows(_TABLES[self.dataset])
+        query = f"SELECT COUNT(*) as total FROM ({_QUERIES[self.dataset]}{where}) x"
+        result = self.db.fetch_one(query, params or None)
+        return int(result['total']) if result else 0
+
+    def _open_writer(self, path):
+        columns = DATASETS[self.dataset]
+        if self.format == 'csv':
+            return CsvWriter(path, columns)
+        return ArrowWriter(path, columns, self.format)
+
+    def run(self, progress=None):
+        """Write the export and return statistics
+
+        progress, if given, is called with the statistics after each chunk.
+        """
+        stats = {'path': self.path, 'rows': 0, 'total': self.estimate(), 'seconds': 0.0,
+                 'rows_per_sec': 0.0, 'complete': False}
+        started = time.perf_counter()
+        columns = DATASETS[self.dataset]
+        where, params = self._filter()
+        query = f"{_QUERIES[self.dataset]}{where} ORDER BY {_ORDER[self.dataset]}"
+
+        partial = self.path + '.part'
+        writer = self._open_writer(partial)
+        failed = False
+        try:
+            for chunk in self.db.iter_chunks(query, params or None, size=self.chunk_size):
+                if self.cancelled:
+                    break
+                writer.write([tuple(_convert(row[name], kind) for name, kind in columns) for row in chunk])
+                stats['rows'] += len(chunk)
+                stats['seconds'] = time.perf_counter() - started
+                stats['rows_per_sec'] = stats['rows'] / stats['seconds'] if stats['seconds'] else 0.0
+                if progress:
+                    progress(dict(stats))
+        except Error:
+            failed = True   # Logged by iter_chunks; a cancelled query also ends here
+        finally:
+            writer.close()
+
+        stats['complete'] = not self.cancelled and not failed
+        if stats['complete']:
+            os.replace(partial, self.path)
+        else:
+            os.remove(partial)
+        return stats
+
+    def cancel(self):
+        """Stop an export running on another thread"""
+        self.cancelled = True
+        self.db.cancel()
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description="Export bills, bill items or customers.")
+    parser.add_argument('dataset', choices=DATASETS)
+    parser.add_argument('path', help="Output file: .csv, .parquet or .arrow")
+    parser.add_argument('--from', dest='date_from', type=date.fromisoformat, help="First bill date (YYYY-MM-DD)")
+    parser.add_argument('--to', dest='date_to', type=date.fromisoformat, help="Last bill date (YYYY-MM-DD)")
+    parser.add_argument('--status', choices=['PENDING', 'PAID', 'OVERDUE'])
+    args = parser.parse_args(argv)
+
+    def report(stats):
+        print(f"{stats['rows']} of about {stats['total']} rows written, {stats['rows_per_sec']:.0f} rows/sec")
+
+    exporter = Exporter(args.dataset, args.path, args.date_from, args.date_to, args.status)
+    stats = exporter.run(progress=report)
+    print(f"{'Finished' if stats['complete'] else 'Failed'} in {stats['seconds']:.1f}s")
+    return 0 if stats['complete'] else 1
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,422 @@
+# importer.py
+# Bulk import of customers, bills and bill items from CSV or JSONL files.
+# Import customers first, then bills, then items; rows are linked through the
+# ids they had in the source system. Run from the project root:
+#   python importer.py customers customers.csv
+#   python importer.py bills bills.jsonl
+#   python importer.py items items.csv
+# An interrupted import resumes after the last committed chunk when run again.
+import argparse
+import csv
+import json
+import logging
+import os
+import sys
+import time
+from abc import ABC, abstractmethod
+from datetime import datetime, timedelta
+from database import Database
+from models.bill import Bill
+from models import report
+from models.cache import results
+from models.customer import cache as customer_cache
+from models.money import DEFAULT_TAX_RATE, line_amount, parse_decimal, to_decimal, to_rate
+
+# Records written per transaction
+CHUNK_SIZE = 1000
+
+BILL_STATUSES = ('PENDING', 'PAID', 'OVERDUE')
+
+def read_records(path):
+    """Yield the records of a CSV file (with a header row) or a JSONL file as dicts"""
+    with open(path, newline='', encoding='utf-8-sig') as f:
+        if path.lower().endswith(('.jsonl', '.json')):
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+        else:
+            yield from csv.DictReader(f)
+
+def read_chunks(records, size, skip=0):
+    """Group records into lists of up to size, after skipping the first skip records"""
+    chunk = []
+    for index, record in enumerate(records):
+        if index < skip:
+            continue
+        chunk.append(record)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+def _text(record, field, max_length, required=False):
+    """Get a stripped string field, checking presence and column length"""
+    value = record.get(field)
+    value = "" if value is None else str(value).strip()
+    if required and not value:
+        raise ValueError(f"{field} is required")
+    if len(value) > max_length:
+        raise ValueError(f"{field} is longer than {max_length} characters")
+    return value
+
+def _source_id(record, field='id', required=False):
+    """Get the id a record had in the source system, or None"""
+    return _text(record, field, 64, required) or None
+
+def _date(record, field, default=None):
+    """Get a YYYY-MM-DD date field"""
+    value = _text(record, field, 10)
+    if not value:
+        if default is None:
+            raise ValueError(f"{field} is required")
+        return default
+    try:
+        return datetime.strptime(value, "%Y-%m-%d").date()
+    except ValueError:
+        raise ValueError(f"{field} is not a YYYY-MM-DD date: {value!r}") from None
+
+def _decimal(record, field, default=None):
+    """Get a decimal field"""
+    value = record.get(field)
+    if value is None or str(value).strip() == "":
+        if default is None:
+            raise ValueError(f"{field} is required")
+        return default
+    return parse_decimal(str(value))
+
+
+class Importer(ABC):
+    """Streams records from a file into the database in chunks
+
+    Each chunk is validated, written with multi-row INSERTs and committed
+    together with the job's checkpoint, so a failed or interrupted import
+    can be run again and continues after the last committed chunk.
+    Subclasses define validate() and write().
+    """
+
+    kind = None
+
+    def __init__(self, path, job=None, chunk_size=CHUNK_SIZE):
+        self.path = path
+        self.job = job or f"{self.kind}:{os.path.abspath(path)}"
+        self.chunk_size = chunk_size
+        self.db = Database()
+
+    @abstractmethod
+    def validate(self, record):
+        """Convert a record to the values to insert, raising ValueError if invalid"""
+
+    @abstractmethod
+    def write(self, rows):
+        """Insert validated rows inside the open transaction
+
+        Returns the number of rows imported, or None on a database error.
+        Rows left out, such as ones already imported, count as skipped.
+        """
+
+    def run(self, restart=False, progress=None):
+        """Import the file and return statistics
+
+        progress, if given, is called with the statistics after each chunk.
+        """
+        position = 0 if restart else self.checkpoint()
+        stats = {
+            'job': self.job,
+            'resumed_at': position,
+            'position': position,
+            'imported': 0,
+            'skipped': 0,
+            'seconds': 0.0,
+            'rows_per_sec': 0.0,
+            'complete': False,
+        }
+        started = time.perf_counter()
+
+        for chunk in read_chunks(read_records(self.path), self.chunk_size, skip=position):
+            rows = []
+            for offset, record in enumerate(chunk):
+                try:
+                    rows.append(self.validate(record))
+                except ValueError as e:
+                    logging.warning(f"{self.path}: skipped record {position + offset + 1}: {e}")
+
+            if not self.db.begin():
+                return stats
+            imported = self.write(rows) if rows else 0
+            if imported is None or not self._save_checkpoint(position + len(chunk)) or not self.db.commit():
+                self.db.rollback()
+                logging.error(f"{self.path}: import stopped at record {position + 1}")
+                return stats
+
+            position += len(chunk)
+            stats['position'] = position
+            stats['imported'] += imported
+            stats['skipped'] += len(chunk) - imported
+            stats['seconds'] = time.perf_counter() - started
+            stats['rows_per_sec'] = (position - stats['resumed_at']) / stats['seconds'] if stats['seconds'] else 0.0
+            if progress:
+                progress(stats)
+
+        stats['complete'] = True
+        self.finish()
+        return stats
+
+    def finish(self):
+        """Called once the whole file has been imported"""
+
+    def checkpoint(self):
+        """Get the number of records of this job already committed"""
+        result = self.db.fetch_one("SELECT position FROM import_jobs WHERE name = %s", (self.job,))
+        return int(result['position']) if result else 0
+
+    def _save_checkpoint(self, position):
+        query = """
+            INSERT INTO import_jobs (name, position) VALUES (%s, %s)
+            ON DUPLICATE KEY UPDATE position = VALUES(position)
+        """
+        return self.db.execute_query(query, (self.job, position))
+
+    def mapped_ids(self, kind, source_ids):
+        """Map source ids of a kind to the ids of rows already imported"""
+        source_ids = list({source_id for source_id in source_ids if source_id is not None})
+        if not source_ids:
+            return {}
+        placeholders = ", ".join(["%s"] * len(source_ids))
+        query = f"SELECT source_id, target_id FROM import_ids WHERE kind = %s AND source_id IN ({placeholders})"
+        return {row['source_id']: row['target_id'] for row in self.db.fetch_all(query, (kind, *source_ids))}
+
+    def map_ids(self, pairs):
+        """Record (source_id, target_id) pairs for this importer's kind"""
+        if not pairs:
+            return True
+        query = "INSERT INTO import_ids (kind, source_id, target_id) VALUES (%s, %s, %s)"
+        return self.db.execute_many(query, [(self.kind, source, target) for source, target in pairs])
+
+    def insert_mapped(self, query, rows, values, inserted_ids):
+        """Insert rows in one statement and map their source ids to the new ids
+
+        inserted_ids(rows, first_id) reads the new ids back in the order of
+        rows: the ids of one insert ascend from first_id but need not be
+        consecutive (auto_increment_increment, interleaved lock mode).
+        """
+        first_id = self.db.insert_many(query, [values(row) for row in rows])
+        if not first_id:
+            return None
+        ids = inserted_ids(rows, first_id)
+        if len(ids) != len(rows):
+            logging.error(f"{self.path}: could not read back the ids of {len(rows)} imported {self.kind}")
+            return None
+        pairs = [(row['id'], new_id) for row, new_id in zip(rows, ids) if row['id']]
+        return len(rows) if self.map_ids(pairs) else None
+
+
+class CustomerImporter(Importer):
+    """Imports customers: id, name, email, phone, address"""
+
+    kind = 'customers'
+
+    def validate(self, record):
+        return {
+            'id': _source_id(record),
+            'name': _text(record, 'name', 100, required=True),
+            'email': _text(record, 'email', 100),
+            'phone': _text(record, 'phone', 20),
+            'address': _text(record, 'address', 65535),
+        }
+
+    def write(self, rows):
+        done = self.mapped_ids(self.kind, (row['id'] for row in rows))
+        rows = [row for row in rows if row['id'] not in done]
+        if not rows:
+            return 0
+        query = "INSERT INTO customers (name, email, phone, address) VALUES (%s, %s, %s, %s)"
+        return self.insert_mapped(query, rows, self._values, self._inserted_ids)
+
+    @staticmethod
+    def _values(row):
+        return (row['name'], row['email'], row['phone'], row['address'])
+
+    def _inserted_ids(self, rows, first_id):
+        """Match the rows from first_id on to the inserted ones, in id order"""
+        # Customers have no unique natural key; rows other sessions inserted
+        # meanwhile are passed over as their values differ
+        query = "SELECT id, name, email, phone, address FROM customers WHERE id >= %s ORDER BY id"
+        ids = []
+        for row in self.db.fetch_all(query, (first_id,), dictionary=False):
+            if len(ids) == len(rows):
+                break
+            if tuple(row[1:]) == self._values(rows[len(ids)]):
+                ids.append(row[0])
+        return ids
+
+    def finish(self):
+        customer_cache.invalidate()
+
+
+class BillImporter(Importer):
+    """Imports bill headers: id, customer_id, bill_number, bill_date, due_date,
+    status, notes, tax_rate and optionally total_amount, tax_amount, grand_total
+
+    customer_id is the customer's source id. Bills without a bill_number are
+    numbered from the current month's sequence. Totals are recomputed when
+    the bill's items are imported.
+    """
+
+    kind = 'bills'
+
+    def finish(self):
+        # Bulk inserts bypass Bill.save, so the summaries are recomputed once at the end
+        report.rebuild(self.db)
+        results.invalidate("bills")
+        # and imported numbers bypass the sequence, which must not hand them out again
+        Bill().skip_used_numbers(self.db)
+
+    def validate(self, record):
+        bill_date = _date(record, 'bill_date')
+        status = _text(record, 'status', 10).upper() or 'PENDING'
+        if status not in BILL_STATUSES:
+            raise ValueError(f"status must be one of {', '.join(BILL_STATUSES)}")
+        # Numbers come from the sequence's own transaction, so take them before the chunk's
+        bill_number = _text(record, 'bill_number', 50) or Bill()._generate_bill_number()
+        if not bill_number:
+            raise ValueError("no bill number could be assigned")
+        return {
+            'id': _source_id(record),
+            'customer_id': _source_id(record, 'customer_id', required=True),
+            'bill_number': bill_number,
+            'bill_date': bill_date,
+            'due_date': _date(record, 'due_date', default=bill_date + timedelta(days=30)),
+            'status': status,
+            'notes': _text(record, 'notes', 65535),
+            'tax_rate': to_rate(_decimal(record, 'tax_rate', DEFAULT_TAX_RATE)),
+            'total_amount': to_decimal(_decimal(record, 'total_amount', 0)),
+            'tax_amount': to_decimal(_decimal(record, 'tax_amount', 0)),
+            'grand_total': to_decimal(_decimal(record, 'grand_total', 0)),
+        }
+
+    def write(self, rows):
+        done = self.mapped_ids(self.kind, (row['id'] for row in rows))
+        customers = self.mapped_ids('customers', (row['customer_id'] for row in rows))
+        placeholders = ", ".join(["%s"] * len(rows))
+        query = f"SELECT bill_number FROM bills WHERE bill_number IN ({placeholders})"
+        taken = {row['bill_number'] for row in self.db.fetch_all(query, tuple(row['bill_number'] for row in rows))}
+
+        accepted = []
+        for row in rows:
+            if row['id'] in done:
+                continue
+            row['customer_id'] = customers.get(row['customer_id'])
+            if row['customer_id'] is None:
+                logging.warning(f"{self.path}: skipped bill {row['id']}: unknown customer")
+                continue
+            if row['bill_number'] in taken:
+                logging.warning(f"{self.path}: skipped bill {row['id']}: duplicate bill number {row['bill_number']}")
+                continue
+            taken.add(row['bill_number'])
+            accepted.append(row)
+        if not accepted:
+            return 0
+
+        query = """
+            INSERT INTO bills (bill_number, customer_id, bill_date, due_date, total_amount,
+                               tax_amount, grand_total, tax_rate, status, notes)
+            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+        """
+        return self.insert_mapped(query, accepted, lambda row: (
+            row['bill_number'], row['customer_id'], row['bill_date'], row['due_date'], row['total_amount'],
+            row['tax_amount'], row['grand_total'], row['tax_rate'], row['status'], row['notes']
+        ), self._inserted_ids)
+
+    def _inserted_ids(self, rows, first_id):
+        """Look the inserted bills up by their unique bill numbers"""
+        placeholders = ", ".join(["%s"] * len(rows))
+        query = f"SELECT bill_number, id FROM bills WHERE bill_number IN ({placeholders})"
+        ids = dict(self.db.fetch_all(query, tuple(row['bill_number'] for row in rows), dictionary=False))
+        return [ids[row['bill_number']] for row in rows if row['bill_number'] in ids]
+
+
+class ItemImporter(Importer):
+    """Imports bill items: bill_id, description, quantity, unit_price, tax_rate
+
+    bill_id is the bill's source id. The totals of every bill that received
+    items are recomputed in the same transaction.
+    """
+
+    kind = 'items'
+
+    def finish(self):
+        report.rebuild(self.db)
+        results.invalidate("bills")
+
+    def validate(self, record):
+        quantity = to_decimal(_decimal(record, 'quantity', 1))
+        unit_price = to_decimal(_decimal(record, 'unit_price'))
+        tax_rate = _text(record, 'tax_rate', 10)
+        return {
+            'bill_id': _source_id(record, 'bill_id', required=True),
+            'description': _text(record, 'description', 255, required=True),
+            'quantity': quantity,
+            'unit_price': unit_price,
+            'amount': line_amount(quantity, unit_price),
+            'tax_rate': to_rate(parse_decimal(tax_rate)) if tax_rate else None,
+        }
+
+    def write(self, rows):
+        bills = self.mapped_ids('bills', (row['bill_id'] for row in rows))
+        params = []
+        for row in rows:
+            bill_id = bills.get(row['bill_id'])
+            if bill_id is None:
+                logging.warning(f"{self.path}: skipped item of bill {row['bill_id']}: unknown bill")
+                continue
+            params.append((bill_id, row['description'], row['quantity'], row['unit_price'], row['amount'], row['tax_rate']))
+        if not params:
+            return 0
+
+        query = """
+            INSERT INTO bill_items (bill_id, description, quantity, unit_price, amount, tax_rate)
+            VALUES (%s, %s, %s, %s, %s, %s)
+        """
+        if not self.db.execute_many(query, params):
+            return None
+
+        totals = Bill.recompute_totals({param[0] for param in params}, db=self.db)
+        query = "UPDATE bills SET total_amount = %s, tax_amount = %s, grand_total = %s WHERE id = %s"
+        if not self.db.execute_many(query, [(*values, bill_id) for bill_id, values in totals.items()]):
+            return None
+        return len(params)
+
+
+IMPORTERS = {
+    'customers': CustomerImporter,
+    'bills': BillImporter,
+    'items': ItemImporter,
+}
+
+def main(argv):
+    parser = argparse.ArgumentParser(description="Bulk import customers, bills or bill items.")
+    parser.add_argument('kind', choices=IMPORTERS)
+    parser.add_argument('path', help="CSV file with a header row, or JSONL file")
+    parser.add_argument('--job', help="Checkpoint name (default: kind and absolute path)")
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE)
+    parser.add_argument('--restart', action='store_true', help="Ignore the checkpoint and start from the first record")
+    args = parser.parse_args(argv)
+
+    if not Database().initialize_database():
+        return 1
+
+    def print_progress(stats):
+        print(f"{stats['position']} records read, {stats['imported']} imported, "
+              f"{stats['skipped']} skipped, {stats['rows_per_sec']:.0f} rows/sec")
+
+    importer = IMPORTERS[args.kind](args.path, job=args.job, chunk_size=args.chunk_size)
+    position = importer.checkpoint()
+    if position and not args.restart:
+        print(f"Resuming {importer.job} after record {position}")
+    stats = importer.run(restart=args.restart, progress=print_progress)
+    print(f"{'Finished' if stats['complete'] else 'Stopped'} in {stats['seconds']:.1f}s")
+    return 0 if stats['complete'] else 1
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
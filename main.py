@@ -5,13 +5,21 @@ from PySide6.QtWidgets import QApplication
 from PySide6.QtGui import QIcon
 from PySide6.QtCore import QDir
 from ui.main_window import MainWindow
-from database import Database
+from database import get_pool
 
 def setup_environment():
     """Setup application environment"""
     # Make sure database dir exists
     os.makedirs('data', exist_ok=True)
 
+def start(app):
+    """Show the main window; it loads data once the database is ready"""
+    app.aboutToQuit.connect(get_pool().close_all)
+    window = MainWindow()
+    window.show()
+    window.open_database()
+    return window
+
 def main():
     """Main entry point"""
     # Setup environment
@@ -22,13 +30,8 @@ def main():
     app.setApplicationName("Billing Application")
     app.setOrganizationName("InfooWare")
     
-    # Initialize database
-    db = Database()
-    db.initialize_database()
-    
     # Create and show main window
-    window = MainWindow()
-    window.show()
+    window = start(app)
     
     # Run application
     sys.exit(app.exec())
@@ -0,0 +1,276 @@
+# migrations.py
+# Versioned schema changes. Database.initialize_database applies the ones a
+# database has not had yet, in order, and records each version in
+# schema_migrations. Never edit a released migration; add a new one at the end.
+# Show the schema version with:
+#   python migrations.py
+#
+# Statements are written in the MySQL dialect and translated by the backend.
+# Index and Column steps check the catalog first, so a migration interrupted
+# part way (MySQL commits each DDL statement) can simply be run again.
+import logging
+import sys
+from backends import Error
+
+
+class Index:
+    """CREATE INDEX step, skipped when the index already exists
+
+    nocase indexes serve case-insensitive prefix LIKE searches; they make a
+    difference on SQLite only, as MySQL's default collations ignore case.
+    Full-text indexes are skipped on backends without full-text search, and
+    any index on backends not named in backends, when that is given.
+    """
+
+    def __init__(self, name, table, columns, unique=False, fulltext=False, nocase=False, backends=None):
+        self.name = name
+        self.table = table
+        self.columns = columns
+        self.unique = unique
+        self.fulltext = fulltext
+        self.nocase = nocase
+        self.backends = backends
+
+    def apply(self, backend, cursor):
+        if self.backends is not None and backend.name not in self.backends:
+            return
+        if backend.index_exists(cursor, self.table, self.name):
+            return
+        statement = backend.index_sql(self)
+        if statement:
+            cursor.execute(statement)
+
+
+class DropIndex:
+    """DROP INDEX step, skipped when the index does not exist"""
+
+    def __init__(self, name, table):
+        self.name = name
+        self.table = table
+
+    def apply(self, backend, cursor):
+        if backend.index_exists(cursor, self.table, self.name):
+            cursor.execute(backend.drop_index_sql(self.name, self.table))
+
+
+class Column:
+    """ADD COLUMN step, skipped when the column already exists"""
+
+    def __init__(self, table, name, definition):
+        self.table = table
+        self.name = name
+        self.definition = definition
+
+    def apply(self, backend, cursor):
+        if not backend.column_exists(cursor, self.table, self.name):
+            cursor.execute(backend.translate_ddl(
+                f"ALTER TABLE {self.table} ADD COLUMN {self.name} {self.definition}"
+            ))
+
+
+def apply_step(backend, cursor, step):
+    """Run one migration step: a DDL statement or an Index/DropIndex/Column"""
+    if isinstance(step, str):
+        cursor.execute(backend.translate_ddl(step))
+    else:
+        step.apply(backend, cursor)
+
+
+VERSION_TABLE = """
+    CREATE TABLE IF NOT EXISTS schema_migrations (
+        version INT PRIMARY KEY,
+        description VARCHAR(255) NOT NULL,
+        applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+"""
+
+# (version, description, steps), in version order
+MIGRATIONS = [
+    (1, "Initial schema", [
+        """
+        CREATE TABLE IF NOT EXISTS customers (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            name VARCHAR(100) NOT NULL,
+            email VARCHAR(100),
+            phone VARCHAR(20),
+            address TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS bills (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            bill_number VARCHAR(50) NOT NULL UNIQUE,
+            customer_id INT NOT NULL,
+            bill_date DATE NOT NULL,
+            due_date DATE NOT NULL,
+            total_amount DECIMAL(10, 2) NOT NULL DEFAULT 0.00,
+            tax_amount DECIMAL(10, 2) NOT NULL DEFAULT 0.00,
+            grand_total DECIMAL(10, 2) NOT NULL DEFAULT 0.00,
+            tax_rate DECIMAL(5, 4) NOT NULL DEFAULT 0.1000,
+            status ENUM('PENDING', 'PAID', 'OVERDUE') NOT NULL DEFAULT 'PENDING',
+            notes TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (customer_id) REFERENCES customers(id) ON DELETE CASCADE
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS bill_items (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            bill_id INT NOT NULL,
+            description VARCHAR(255) NOT NULL,
+            quantity DECIMAL(10, 2) NOT NULL DEFAULT 1.00,
+            unit_price DECIMAL(10, 2) NOT NULL DEFAULT 0.00,
+            amount DECIMAL(10, 2) NOT NULL DEFAULT 0.00,
+            tax_rate DECIMAL(5, 4),
+            FOREIGN KEY (bill_id) REFERENCES bills(id) ON DELETE CASCADE
+        )
+        """,
+        # Named counters (bill numbers per month)
+        """
+        CREATE TABLE IF NOT EXISTS sequences (
+            name VARCHAR(50) PRIMARY KEY,
+            next_value BIGINT NOT NULL DEFAULT 1
+        )
+        """,
+        # Bulk imports: ids of imported rows by source id, and records done per job
+        """
+        CREATE TABLE IF NOT EXISTS import_ids (
+            kind VARCHAR(20) NOT NULL,
+            source_id VARCHAR(64) NOT NULL,
+            target_id INT NOT NULL,
+            PRIMARY KEY (kind, source_id)
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS import_jobs (
+            name VARCHAR(255) PRIMARY KEY,
+            position BIGINT NOT NULL DEFAULT 0
+        )
+        """,
+        # Reporting summaries per bill date and per customer, by status (see models/report.py)
+        """
+        CREATE TABLE IF NOT EXISTS report_daily (
+            day DATE NOT NULL,
+            status ENUM('PENDING', 'PAID', 'OVERDUE') NOT NULL,
+            bills INT NOT NULL DEFAULT 0,
+            total_amount DECIMAL(14, 2) NOT NULL DEFAULT 0.00,
+            tax_amount DECIMAL(14, 2) NOT NULL DEFAULT 0.00,
+            grand_total DECIMAL(14, 2) NOT NULL DEFAULT 0.00,
+            PRIMARY KEY (day, status)
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS report_customer (
+            customer_id INT NOT NULL,
+            status ENUM('PENDING', 'PAID', 'OVERDUE') NOT NULL,
+            bills INT NOT NULL DEFAULT 0,
+            total_amount DECIMAL(14, 2) NOT NULL DEFAULT 0.00,
+            tax_amount DECIMAL(14, 2) NOT NULL DEFAULT 0.00,
+            grand_total DECIMAL(14, 2) NOT NULL DEFAULT 0.00,
+            PRIMARY KEY (customer_id, status),
+            FOREIGN KEY (customer_id) REFERENCES customers(id) ON DELETE CASCADE
+        )
+        """,
+        # Databases created from the old schema.sql may predate per-bill tax rates
+        Column('bills', 'tax_rate', "DECIMAL(5, 4) NOT NULL DEFAULT 0.1000"),
+        Column('bill_items', 'tax_rate', "DECIMAL(5, 4)"),
+        Index('idx_customer_id', 'bills', ['customer_id']),
+        Index('idx_bill_id', 'bill_items', ['bill_id']),
+        Index('idx_status_due_date', 'bills', ['status', 'due_date']),
+        Index('ft_customer_search', 'customers', ['name', 'email', 'phone'], fulltext=True),
+        Index('ft_customer_name', 'customers', ['name'], fulltext=True),
+    ]),
+    (2, "Indexes for the model queries", [
+        # Bills list paging and sorting, newest first (the primary key rides
+        # along in the index, so (bill_date, id) keyset pages are range scans)
+        Index('idx_bill_date', 'bills', ['bill_date']),
+        # A customer's bills newest first; replaces idx_customer_id, which it
+        # also serves as the foreign key index
+        Index('idx_customer_bill_date', 'bills', ['customer_id', 'bill_date']),
+        DropIndex('idx_customer_id', 'bills'),
+        # Customer list order and short-term prefix searches
+        Index('idx_customer_name', 'customers', ['name'], nocase=True),
+        Index('idx_customer_email', 'customers', ['email'], nocase=True),
+        Index('idx_customer_phone', 'customers', ['phone'], nocase=True),
+        # Bill number prefix searches; MySQL uses the UNIQUE index
+        Index('idx_bill_number_nocase', 'bills', ['bill_number'], nocase=True, backends=('sqlite',)),
+        # Outstanding balances by customer, covering the summed columns
+        Index('idx_report_customer_status', 'report_customer',
+              ['status', 'customer_id', 'bills', 'total_amount', 'tax_amount', 'grand_total']),
+    ]),
+    (3, "Idempotency keys of replayed offline writes", [
+        # One row per journal entry applied (see models/journal.py), written
+        # in the same transaction as the write itself
+        """
+        CREATE TABLE IF NOT EXISTS idempotency_keys (
+            idempotency_key VARCHAR(64) PRIMARY KEY,
+            record_id INT,
+            applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """,
+    ]),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+def schema_version(cursor):
+    """Latest migration applied, or 0 for a database without migrations"""
+    try:
+        cursor.execute("SELECT MAX(version) FROM schema_migrations")
+        return cursor.fetchone()[0] or 0
+    except Error:
+        return 0
+
+
+def applied_versions(backend, cursor):
+    """Versions already applied to the database"""
+    cursor.execute(backend.translate_ddl(VERSION_TABLE))
+    cursor.execute("SELECT version FROM schema_migrations")
+    return {row[0] for row in cursor.fetchall()}
+
+
+def migrate(backend, connection):
+    """Apply every pending migration on connection; returns the versions applied
+
+    An up-to-date database costs one query: the version stamp is checked
+    before any DDL runs.
+    """
+    cursor = backend.cursor(connection)
+    try:
+        if schema_version(cursor) >= LATEST_VERSION:
+            return []
+        done = applied_versions(backend, cursor)
+        applied = []
+        for version, description, steps in MIGRATIONS:
+            if version in done:
+                continue
+            for step in steps:
+                apply_step(backend, cursor, step)
+            cursor.execute(
+                backend.translate("INSERT INTO schema_migrations (version, description) VALUES (%s, %s)"),
+                (version, description)
+            )
+            connection.commit()
+            applied.append(version)
+            logging.info(f"Applied migration {version}: {description}")
+        return applied
+    finally:
+        cursor.close()
+
+
+def main(argv):
+    from database import Database
+    db = Database()
+    if not db.initialize_database():
+        return 1
+    rows = db.fetch_all("SELECT version, description, applied_at FROM schema_migrations ORDER BY version")
+    for row in rows:
+        print(f"{row['version']:>4}  {row['applied_at']}  {row['description']}")
+    print(f"Schema version {max(row['version'] for row in rows)} (latest {LATEST_VERSION})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -1,197 +1,537 @@
 # models/bill.py
 from database import Database
+from models.sequence import get_sequence
+from models.search import SEARCH_LIMIT, fulltext_query, prefix_pattern
+from models import events, journal, report
+from models.cache import results
+from models.money import DEFAULT_TAX_RATE, Totals, batch_totals, line_amount, to_decimal, to_rate
 from datetime import datetime, timedelta
+import logging
 import uuid
 
+# Rows per page for keyset-paginated listings
+PAGE_SIZE = 200
+
+# Bill ids per IN list when loading many bills
+LOAD_CHUNK = 500
+
+# Bills joined to their items: one row per item, or a single row with NULL item
+# columns for a bill without items. Read through tuple cursors by position.
+_WITH_ITEMS = """
+    SELECT b.id, b.bill_number, b.customer_id, b.bill_date, b.due_date, b.total_amount,
+           b.tax_amount, b.grand_total, b.tax_rate, b.status, b.notes, b.created_at,
+           i.id, i.description, i.quantity, i.unit_price, i.amount, i.tax_rate
+    FROM bills b
+    LEFT JOIN bill_items i ON i.bill_id = b.id
+"""
+_ITEM_COLUMN = 12   # Position of the first item column
+
 class BillItem:
     """Bill item model class"""
     
-    def __init__(self, id=None, bill_id=None, description="", quantity=1.0, unit_price=0.0, amount=0.0):
+    __slots__ = ('id', 'bill_id', 'description', 'quantity', 'unit_price', 'amount', 'tax_rate', '_persisted')
+    
+    def __init__(self, id=None, bill_id=None, description="", quantity=1, unit_price=0, amount=None, tax_rate=None):
         self.id = id
         self.bill_id = bill_id
         self.description = description
-        self.quantity = quantity
-        self.unit_price = unit_price
-        self.amount = amount
+        self.quantity = to_decimal(quantity)
+        self.unit_price = to_decimal(unit_price)
+        self.amount = line_amount(self.quantity, self.unit_price) if amount is None else to_decimal(amount)
+        self.tax_rate = to_rate(tax_rate)  # None uses the bill's rate
+        # Field values as last persisted; None until the item is stored
+        self._persisted = self._values() if id is not None else None
+    
+    def _values(self):
+        """Return the persisted fields as a tuple"""
+        return (self.description, self.quantity, self.unit_price, self.amount, self.tax_rate)
+    
+    def _mark_clean(self):
+        """Record the current fields as persisted"""
+        self._persisted = self._values()
+    
+    @property
+    def is_new(self):
+        """Whether the item has not been stored yet"""
+        return self._persisted is None
+    
+    @property
+    def is_modified(self):
+        """Whether a stored item changed since it was loaded or saved"""
+        return self._persisted is not None and self._persisted != self._values()
 
 class Bill:
-    """Bill model class"""
+    """Bill model class
+    
+    Bills are plain records: reads and writes go through a Database session,
+    passed as db or created per call.
+    """
+    
+    __slots__ = ('_totals', 'id', 'bill_number', 'customer_id', 'bill_date', 'due_date', 'total_amount',
+                 'tax_amount', 'grand_total', 'status', 'notes', 'created_at', 'items', '_removed_item_ids',
+                 'rows_written', 'queued')
     
     def __init__(self, id=None, bill_number="", customer_id=None, bill_date=None, due_date=None,
-                 total_amount=0.0, tax_amount=0.0, grand_total=0.0, status="PENDING", notes="", created_at=None):
+                 total_amount=0, tax_amount=0, grand_total=0, status="PENDING", notes="", created_at=None,
+                 tax_rate=DEFAULT_TAX_RATE):
+        self._totals = Totals(tax_rate)     # Running sums of the items
         self.id = id
-        self.bill_number = bill_number if bill_number else self._generate_bill_number()
+        self.bill_number = bill_number      # Assigned on first insert when empty
         self.customer_id = customer_id
         self.bill_date = bill_date if bill_date else datetime.now().date()
         self.due_date = due_date if due_date else (datetime.now() + timedelta(days=30)).date()
-        self.total_amount = total_amount
-        self.tax_amount = tax_amount
-        self.grand_total = grand_total
+        self.total_amount = to_decimal(total_amount)
+        self.tax_amount = to_decimal(tax_amount)
+        self.grand_total = to_decimal(grand_total)
         self.status = status
         self.notes = notes
         self.created_at = created_at
         self.items = []
-        self.db = Database()
+        self._removed_item_ids = []     # Stored items removed since load/save
+        self.rows_written = 0           # Rows touched by the last successful save
+        self.queued = None              # Journal key of a save queued while offline
+    
+    @property
+    def tax_rate(self):
+        """Tax rate applied to items without their own rate"""
+        return self._totals.tax_rate
     
-    def _generate_bill_number(self):
-        """Generate a unique bill number"""
+    @tax_rate.setter
+    def tax_rate(self, rate):
+        self._totals.tax_rate = to_rate(rate)
+        self._apply_totals()
+    
+    def _bill_sequence(self):
+        """Return this month's bill number prefix and its sequence"""
         today = datetime.now()
         prefix = f"INV-{today.year}{today.month:02d}"
-        
-        # Get last bill number with this prefix
-        db = Database()
+        return prefix, get_sequence(prefix, seed=lambda db: self._last_bill_number(prefix, db))
+
+    def _generate_bill_number(self, db=None):
+        """Generate a unique bill number from the monthly sequence, reserving through db"""
+        prefix, sequence = self._bill_sequence()
+        number = sequence.next_value(db)
+        return f"{prefix}-{number:04d}" if number else None
+
+    def skip_used_numbers(self, db=None):
+        """Move this month's sequence past numbers stored without it, such as imported ones"""
+        db = db or Database()
+        prefix, sequence = self._bill_sequence()
+        return sequence.advance_past(self._last_bill_number(prefix, db), db)
+    
+    def _last_bill_number(self, prefix, db):
+        """Return the highest number already used with a prefix"""
         query = "SELECT MAX(bill_number) as last_bill FROM bills WHERE bill_number LIKE %s"
         result = db.fetch_one(query, (f"{prefix}%",))
         
         if result and result['last_bill']:
-            # Extract the number part and increment
+            # Extract the number part
             try:
-                last_num = int(result['last_bill'].split('-')[-1])
-                return f"{prefix}-{last_num + 1:04d}"
-            except:
+                return int(result['last_bill'].split('-')[-1])
+            except ValueError:
                 pass
-        
-        # Default to starting number
-        return f"{prefix}-0001"
+        return 0
     
-    def add_item(self, description, quantity, unit_price):
-        """Add an item to the bill"""
-        amount = quantity * unit_price
+    def add_item(self, description, quantity, unit_price, tax_rate=None):
+        """Add an item to the bill; tax_rate overrides the bill's rate for it"""
         item = BillItem(
             description=description,
             quantity=quantity,
             unit_price=unit_price,
-            amount=amount
+            tax_rate=tax_rate
         )
         self.items.append(item)
-        self._recalculate_totals()
+        self._totals.add(item.amount, item.tax_rate)
+        self._apply_totals()
+        return item
+    
+    def add_items(self, lines):
+        """Add many (description, quantity, unit_price) lines, updating the totals once"""
+        added = []
+        for description, quantity, unit_price in lines:
+            item = BillItem(description=description, quantity=quantity, unit_price=unit_price)
+            self._totals.add(item.amount, item.tax_rate)
+            added.append(item)
+        self.items.extend(added)
+        self._apply_totals()
+        return added
+    
+    def update_item(self, index, description=None, quantity=None, unit_price=None):
+        """Change fields of an existing item"""
+        if not 0 <= index < len(self.items):
+            return None
+        
+        item = self.items[index]
+        self._totals.remove(item.amount, item.tax_rate)
+        if description is not None:
+            item.description = description
+        if quantity is not None:
+            item.quantity = to_decimal(quantity)
+        if unit_price is not None:
+            item.unit_price = to_decimal(unit_price)
+        item.amount = line_amount(item.quantity, item.unit_price)
+        self._totals.add(item.amount, item.tax_rate)
+        self._apply_totals()
         return item
     
     def remove_item(self, index):
         """Remove an item from the bill"""
         if 0 <= index < len(self.items):
-            self.items.pop(index)
-            self._recalculate_totals()
+            item = self.items.pop(index)
+            if not item.is_new:
+                self._removed_item_ids.append(item.id)
+            self._totals.remove(item.amount, item.tax_rate)
+            self._apply_totals()
             return True
         return False
     
+    def clear_items(self):
+        """Remove every item from the bill"""
+        self._removed_item_ids.extend(item.id for item in self.items if not item.is_new)
+        self.items = []
+        self._totals.clear()
+        self._apply_totals()
+    
     def _recalculate_totals(self):
-        """Recalculate bill totals"""
-        self.total_amount = sum(item.amount for item in self.items)
-        # Assuming tax rate of 10%
-        self.tax_amount = self.total_amount * 0.10
-        self.grand_total = self.total_amount + self.tax_amount
-    
-    def save(self):
-        """Save bill to database"""
-        if self.id is None:
+        """Rebuild the running sums from all items"""
+        self._totals.clear()
+        for item in self.items:
+            self._totals.add(item.amount, item.tax_rate)
+        self._apply_totals()
+    
+    def _apply_totals(self):
+        """Copy the running sums to the total fields"""
+        self.total_amount = self._totals.subtotal
+        self.tax_amount = self._totals.tax
+        self.grand_total = self._totals.grand_total
+    
+    def save(self, db=None, idempotency_key=None):
+        """Save bill and its items to database in a single transaction
+        
+        db is the session to write through; a fresh one is used by default.
+        It must not have a transaction open.
+        
+        If the database cannot be reached, or earlier saves are still queued,
+        the save is queued in the offline journal instead: queued is set to
+        its key and True is returned. The journal replays it with
+        idempotency_key, so it is applied only once; a new bill queued before
+        it had a number is numbered then.
+        """
+        db = db or Database()
+        self.queued = None
+        if idempotency_key is None and journal.is_offline(db):
+            return self._queue()
+        if self._write(db, idempotency_key):
+            return True
+        if idempotency_key is None and not db.is_reachable():
+            return self._queue()
+        return False
+    
+    def _queue(self):
+        """Queue this save in the offline journal and return whether it was stored"""
+        self.queued = journal.queue('bill', self._journal_payload())
+        return self.queued is not None
+    
+    def _write(self, db, idempotency_key):
+        """Write the bill and its items in one transaction and return whether it committed"""
+        is_new = self.id is None
+        if is_new and not self.bill_number:
+            bill_number = self._generate_bill_number(db)
+            if not bill_number:
+                return False
+            self.bill_number = bill_number
+        
+        if not db.begin():
+            return False
+        if idempotency_key and journal.is_applied(db, idempotency_key):
+            db.rollback()
+            return True
+        
+        # The stored version is taken out of the reporting summaries
+        old = None if is_new else report.bill_row(db, self.id)
+        if not is_new and old is None:
+            # Deleted by another session: updating would add a phantom to the summaries
+            db.rollback()
+            logging.error(f"Bill {self.id} could not be read for update; it may have been deleted")
+            return False
+        
+        if is_new:
             # Insert new bill
             query = """
                 INSERT INTO bills (bill_number, customer_id, bill_date, due_date,
-                                    total_amount, tax_amount, grand_total, status, notes)
-                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
+                                    total_amount, tax_amount, grand_total, tax_rate, status, notes)
+                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
             """
             params = (
                 self.bill_number, self.customer_id, self.bill_date, self.due_date,
-                self.total_amount, self.tax_amount, self.grand_total, self.status, self.notes
+                self.total_amount, self.tax_amount, self.grand_total, self.tax_rate, self.status, self.notes
             )
-            self.id = self.db.insert(query, params)
-            
-            if self.id:
-                # Save bill items
-                self._save_items()
-                return True
-            return False
+            self.id = db.insert(query, params)
+            saved = self.id is not None
         else:
             # Update existing bill
             query = """
                 UPDATE bills
                 SET bill_number = %s, customer_id = %s, bill_date = %s, due_date = %s,
-                    total_amount = %s, tax_amount = %s, grand_total = %s, status = %s, notes = %s
+                    total_amount = %s, tax_amount = %s, grand_total = %s, tax_rate = %s,
+                    status = %s, notes = %s
                 WHERE id = %s
             """
             params = (
                 self.bill_number, self.customer_id, self.bill_date, self.due_date,
-                self.total_amount, self.tax_amount, self.grand_total, self.status, self.notes,
-                self.id
+                self.total_amount, self.tax_amount, self.grand_total, self.tax_rate,
+                self.status, self.notes, self.id
             )
-            if self.db.execute_query(query, params):
-                # Delete existing items and save new ones
-                self._delete_items()
-                self._save_items()
-                return True
-            return False
+            saved = db.execute_query(query, params)
+        
+        item_rows = self._save_items(db) if saved else None
+        if (item_rows is not None and self._update_reports(db, old) and
+                (not idempotency_key or journal.record_applied(db, idempotency_key, self.id)) and db.commit()):
+            for item in self.items:
+                item._mark_clean()
+            self._removed_item_ids = []
+            self.rows_written = item_rows + 1
+            self._invalidate_cached(old)
+            events.bus.publish((events.BillCreated if is_new else events.BillUpdated)(self.id))
+            return True
+        
+        # Nothing was written, so a new bill and its new items stay unsaved
+        db.rollback()
+        if is_new:
+            self.id = None
+        for item in self.items:
+            if item.is_new:
+                item.id = None
+                item.bill_id = None
+        return False
+    
+    def _journal_payload(self):
+        """The fields and items a queued save writes"""
+        return {
+            'id': self.id, 'bill_number': self.bill_number, 'customer_id': self.customer_id,
+            'bill_date': str(self.bill_date), 'due_date': str(self.due_date), 'status': self.status,
+            'notes': self.notes, 'tax_rate': str(self.tax_rate),
+            'items': [
+                [item.id, item.description, str(item.quantity), str(item.unit_price),
+                 None if item.tax_rate is None else str(item.tax_rate)]
+                for item in self.items
+            ],
+            'removed_item_ids': list(self._removed_item_ids),
+        }
+    
+    @staticmethod
+    def from_journal(payload):
+        """Rebuild a queued save; stored items are all written back"""
+        bill = Bill(
+            id=payload['id'], bill_number=payload['bill_number'], customer_id=payload['customer_id'],
+            bill_date=payload['bill_date'], due_date=payload['due_date'], status=payload['status'],
+            notes=payload['notes'], tax_rate=payload['tax_rate']
+        )
+        for item_id, description, quantity, unit_price, tax_rate in payload['items']:
+            item = BillItem(id=item_id, bill_id=bill.id, description=description,
+                            quantity=quantity, unit_price=unit_price, tax_rate=tax_rate)
+            if item.id is not None:
+                item._persisted = ()    # Differs from any values, so the item is written back
+            bill.items.append(item)
+        bill._removed_item_ids = list(payload['removed_item_ids'])
+        bill._recalculate_totals()
+        return bill
     
 # models/bill.py (continued)
-    def _save_items(self):
-        """Save bill items to database"""
-        for item in self.items:
+    def _save_items(self, db):
+        """Write only the item rows added, modified or removed since load and return the count"""
+        added = [item for item in self.items if item.is_new]
+        modified = [item for item in self.items if item.is_modified]
+        removed = self._removed_item_ids
+        
+        if removed:
+            placeholders = ", ".join(["%s"] * len(removed))
+            query = f"DELETE FROM bill_items WHERE bill_id = %s AND id IN ({placeholders})"
+            if not db.execute_query(query, (self.id, *removed)):
+                return None
+        
+        if modified:
+            # Only rows still on this bill are updated; a row deleted or moved
+            # by another session fails the save rather than being written back
+            query = """
+                UPDATE bill_items
+                SET description = %s, quantity = %s, unit_price = %s, amount = %s, tax_rate = %s
+                WHERE id = %s AND bill_id = %s
+            """
+            params = [
+                (item.description, item.quantity, item.unit_price, item.amount, item.tax_rate, item.id, self.id)
+                for item in modified
+            ]
+            matched = db.update_many(query, params)
+            if matched != len(modified):
+                if matched is not None:
+                    logging.error(f"Items of bill {self.id} were changed by another session")
+                return None
+        
+        if added:
             query = """
-                INSERT INTO bill_items (bill_id, description, quantity, unit_price, amount)
-                VALUES (%s, %s, %s, %s, %s)
+                INSERT INTO bill_items (bill_id, description, quantity, unit_price, amount, tax_rate)
+                VALUES (%s, %s, %s, %s, %s, %s)
             """
-            params = (self.id, item.description, item.quantity, item.unit_price, item.amount)
-            item_id = self.db.insert(query, params)
-            if item_id:
+            params = [
+                (self.id, item.description, item.quantity, item.unit_price, item.amount, item.tax_rate)
+                for item in added
+            ]
+            first_id = db.insert_many(query, params)
+            if not first_id:
+                return None
+            
+            # The ids of one insert ascend from first_id but need not be
+            # consecutive (auto_increment_increment, interleaved lock mode), so
+            # they are read back; the bill's row lock keeps other sessions out
+            query = "SELECT id FROM bill_items WHERE bill_id = %s AND id >= %s ORDER BY id"
+            new_ids = [row[0] for row in db.fetch_all(query, (self.id, first_id), dictionary=False)]
+            if len(new_ids) != len(added):
+                return None
+            for item, item_id in zip(added, new_ids):
                 item.id = item_id
                 item.bill_id = self.id
+        
+        return len(added) + len(modified) + len(removed)
     
-    def _delete_items(self):
+    def _invalidate_cached(self, old):
+        """Drop the cached copies of this bill and of its customer's bill list"""
+        tags = {f"bill:{self.id}", f"bills_of:{self.customer_id}"}
+        if old:
+            tags.add(f"bills_of:{old['customer_id']}")
+        results.invalidate(*tags)
+    
+    def _update_reports(self, db, old):
+        """Replace the stored version of the bill by this one in the reporting summaries"""
+        new = {
+            'bill_date': self.bill_date, 'customer_id': self.customer_id, 'status': self.status,
+            'total_amount': self.total_amount, 'tax_amount': self.tax_amount, 'grand_total': self.grand_total,
+        }
+        return report.apply(db, removed=[old] if old else [], added=[new])
+    
+    def _delete_items(self, db):
         """Delete all items for this bill"""
         query = "DELETE FROM bill_items WHERE bill_id = %s"
-        return self.db.execute_query(query, (self.id,))
-    
-    def load(self, id):
-        """Load bill data from database by ID"""
-        query = "SELECT * FROM bills WHERE id = %s"
-        data = self.db.fetch_one(query, (id,))
-        
-        if data:
-            self.id = data['id']
-            self.bill_number = data['bill_number']
-            self.customer_id = data['customer_id']
-            self.bill_date = data['bill_date']
-            self.due_date = data['due_date']
-            self.total_amount = float(data['total_amount'])
-            self.tax_amount = float(data['tax_amount'])
-            self.grand_total = float(data['grand_total'])
-            self.status = data['status']
-            self.notes = data['notes']
-            self.created_at = data['created_at']
-            
-            # Load bill items
-            self._load_items()
+        return db.execute_query(query, (self.id,))
+    
+    def load(self, id, db=None, cached=True):
+        """Load bill data and its items by ID with one query
+        
+        The result cache is used unless cached is False or db has a
+        transaction open. Load a bill to edit with cached=False: the cache
+        only sees this process's writes, not those of other terminals.
+        """
+        db = db or Database()
+        query = _WITH_ITEMS + " WHERE b.id = %s ORDER BY i.id"
+        if db.connection is not None or not cached:
+            rows = db.fetch_all(query, (id,), dictionary=False)
+        else:
+            # The rows are cached rather than the bill, which its editor changes in place
+            rows = results.get(
+                f"bill:{id}",
+                lambda: db.fetch_all(query, (id,), dictionary=False),
+                lambda rows: (f"bill:{id}", f"owner:{rows[0][2]}", "bills")
+            )
+        
+        if rows:
+            self._set_header(rows[0])
+            for row in rows:
+                self._add_loaded_item(row)
+            # Start the running sums from the loaded items
+            self._recalculate_totals()
             return True
         return False
     
-    def _load_items(self):
-        """Load bill items from database"""
-        query = "SELECT * FROM bill_items WHERE bill_id = %s"
-        items_data = self.db.fetch_all(query, (self.id,))
-        
+    def _set_header(self, row):
+        """Set the bill fields from a _WITH_ITEMS row and clear the items"""
+        (self.id, self.bill_number, self.customer_id, self.bill_date, self.due_date,
+         total_amount, tax_amount, grand_total, tax_rate, self.status, self.notes,
+         self.created_at) = row[:_ITEM_COLUMN]
+        self.total_amount = to_decimal(total_amount)
+        self.tax_amount = to_decimal(tax_amount)
+        self.grand_total = to_decimal(grand_total)
+        self._totals.tax_rate = to_rate(tax_rate)
         self.items = []
-        for item_data in items_data:
-            item = BillItem(
-                id=item_data['id'],
-                bill_id=item_data['bill_id'],
-                description=item_data['description'],
-                quantity=float(item_data['quantity']),
-                unit_price=float(item_data['unit_price']),
-                amount=float(item_data['amount'])
-            )
-            self.items.append(item)
+        self._removed_item_ids = []
+    
+    def _add_loaded_item(self, row):
+        """Add the item in a _WITH_ITEMS row, if the row has one"""
+        item_id, description, quantity, unit_price, amount, tax_rate = row[_ITEM_COLUMN:]
+        if item_id is not None:
+            self.items.append(BillItem(
+                id=item_id,
+                bill_id=self.id,
+                description=description,
+                quantity=quantity,
+                unit_price=unit_price,
+                amount=amount,
+                tax_rate=tax_rate
+            ))
     
-    def delete(self):
-        """Delete bill from database"""
+    @staticmethod
+    def _group_rows(rows):
+        """Yield loaded bills from _WITH_ITEMS rows ordered by bill id, in one pass"""
+        bill = None
+        for row in rows:
+            if bill is None or row[0] != bill.id:
+                if bill is not None:
+                    bill._recalculate_totals()
+                    yield bill
+                bill = Bill()
+                bill._set_header(row)
+            bill._add_loaded_item(row)
+        if bill is not None:
+            bill._recalculate_totals()
+            yield bill
+    
+    def delete(self, db=None):
+        """Delete bill from database, through db when given"""
         if self.id is None:
             return False
-            
-        # Delete bill items (cascade will work, but this is clearer)
-        self._delete_items()
         
-        # Delete the bill
+        db = db or Database()
+        if not db.begin():
+            return False
+        
+        # Delete bill items (cascade will work, but this is clearer)
+        old = report.bill_row(db, self.id)
         query = "DELETE FROM bills WHERE id = %s"
-        return self.db.execute_query(query, (self.id,))
+        if (old and self._delete_items(db) and db.execute_query(query, (self.id,)) and
+                report.apply(db, removed=[old]) and db.commit()):
+            self._invalidate_cached(old)
+            events.bus.publish(events.BillDeleted(self.id))
+            return True
+        
+        db.rollback()
+        return False
+    
+    @staticmethod
+    def recompute_totals(bill_ids=None, db=None):
+        """Recompute totals from the stored items of many bills at once
+        
+        Returns a dict of bill_id -> (total_amount, tax_amount, grand_total)
+        for the given bills, or for every bill with items when bill_ids is None.
+        Pass db to read inside its open transaction.
+        """
+        db = db or Database()
+        query = """
+            SELECT i.bill_id, i.amount, i.tax_rate, b.tax_rate as bill_tax_rate
+            FROM bill_items i
+            JOIN bills b ON b.id = i.bill_id
+        """
+        params = None
+        if bill_ids is not None:
+            bill_ids = list(bill_ids)
+            if not bill_ids:
+                return {}
+            query += f" WHERE i.bill_id IN ({', '.join(['%s'] * len(bill_ids))})"
+            params = tuple(bill_ids)
+        
+        rows = db.fetch_all(query, params)
+        return batch_totals(
+            (row['bill_id'], row['amount'], row['tax_rate'], row['bill_tax_rate'])
+            for row in rows
+        )
     
     @staticmethod
     def get_all():
@@ -206,30 +546,179 @@ class Bill:
         return db.fetch_all(query)
     
     @staticmethod
-    def search(term):
-        """Search bills by bill number or customer name"""
+    def get_page(after=None, limit=PAGE_SIZE):
+        """Get one page of bills with customer info, newest first
+        
+        after is the (bill_date, id) cursor of the last row of the previous
+        page, as returned by page_cursor; None starts at the newest bill.
+        """
+        db = Database()
+        if after is None:
+            query = """
+                SELECT b.*, c.name as customer_name
+                FROM bills b
+                JOIN customers c ON b.customer_id = c.id
+                ORDER BY b.bill_date DESC, b.id DESC
+                LIMIT %s
+            """
+            params = (limit,)
+        else:
+            query = """
+                SELECT b.*, c.name as customer_name
+                FROM bills b
+                JOIN customers c ON b.customer_id = c.id
+                WHERE b.bill_date <= %s AND (b.bill_date < %s OR b.id < %s)
+                ORDER BY b.bill_date DESC, b.id DESC
+                LIMIT %s
+            """
+            # The leading bill_date <= bound lets idx_bill_date start a range scan at the cursor
+            bill_date, bill_id = after
+            params = (bill_date, bill_date, bill_id, limit)
+        return db.fetch_all(query, params)
+    
+    @staticmethod
+    def get_row(id):
+        """Get one bill with customer info, as get_page returns it, or None"""
         db = Database()
         query = """
             SELECT b.*, c.name as customer_name
             FROM bills b
             JOIN customers c ON b.customer_id = c.id
-            WHERE b.bill_number LIKE %s OR c.name LIKE %s
-            ORDER BY b.bill_date DESC
+            WHERE b.id = %s
         """
-        search_term = f"%{term}%"
-        params = (search_term, search_term)
-        return db.fetch_all(query, params)
+        return db.fetch_one(query, (id,))
+    
+    @staticmethod
+    def page_cursor(row):
+        """Get the keyset cursor for a row returned by get_page"""
+        return (row['bill_date'], row['id'])
+    
+    @staticmethod
+    def count_estimate():
+        """Estimate the number of bills without scanning the table"""
+        db = Database()
+        return db.estimate_rows('bills')
+    
+    @staticmethod
+    def search(term, limit=SEARCH_LIMIT):
+        """Search bills by bill number prefix or customer name, best matches first"""
+        db = Database()
+        return db.fetch_all(*Bill._search_query(term, limit))
+    
+    @staticmethod
+    def iter_search(term, db, limit=SEARCH_LIMIT, chunk_size=25):
+        """Run a search on db, yielding results in chunks as they arrive"""
+        return db.iter_chunks(*Bill._search_query(term, limit), size=chunk_size)
     
     @staticmethod
-    def get_by_id(id):
+    def _search_query(term, limit):
+        """Build the search query and parameters for a term"""
+        bill_number = prefix_pattern(term)
+        match = fulltext_query(term)
+        if match:
+            # Bill number prefix hits rank above customer name matches
+            query = """
+                SELECT b.*, c.name as customer_name, MAX(m.score) as score
+                FROM (
+                    SELECT id as bill_id, 1000 as score
+                    FROM bills
+                    WHERE bill_number LIKE %s ESCAPE '!'
+                    UNION ALL
+                    SELECT cb.id, MATCH(cc.name) AGAINST (%s IN BOOLEAN MODE)
+                    FROM customers cc
+                    JOIN bills cb ON cb.customer_id = cc.id
+                    WHERE MATCH(cc.name) AGAINST (%s IN BOOLEAN MODE)
+                ) m
+                JOIN bills b ON b.id = m.bill_id
+                JOIN customers c ON b.customer_id = c.id
+                GROUP BY b.id
+                ORDER BY score DESC, b.bill_date DESC
+                LIMIT %s
+            """
+            params = (bill_number, match, match, limit)
+        else:
+            # Too short for the full-text index: match the start of each field,
+            # one indexed lookup per field (an OR across the join scans bills)
+            query = """
+                SELECT b.*, c.name as customer_name
+                FROM (
+                    SELECT id as bill_id
+                    FROM bills
+                    WHERE bill_number LIKE %s ESCAPE '!'
+                    UNION
+                    SELECT cb.id
+                    FROM customers cc
+                    JOIN bills cb ON cb.customer_id = cc.id
+                    WHERE cc.name LIKE %s ESCAPE '!'
+                ) m
+                JOIN bills b ON b.id = m.bill_id
+                JOIN customers c ON b.customer_id = c.id
+                ORDER BY b.bill_date DESC
+                LIMIT %s
+            """
+            params = (bill_number, bill_number, limit)
+        return query, params
+    
+    @staticmethod
+    def get_by_id(id, db=None, cached=True):
         """Get bill by ID"""
         bill = Bill()
-        bill.load(id)
+        bill.load(id, db, cached)
         return bill if bill.id else None
     
+    @staticmethod
+    def load_many(ids, db=None):
+        """Load many bills with their items
+        
+        Returns a dict of bill_id -> Bill for the ids that exist. Every
+        LOAD_CHUNK ids take a single query joining the items.
+        """
+        db = db or Database()
+        ids = list(dict.fromkeys(ids))
+        bills = {}
+        for start in range(0, len(ids), LOAD_CHUNK):
+            chunk = ids[start:start + LOAD_CHUNK]
+            query = _WITH_ITEMS + f" WHERE b.id IN ({', '.join(['%s'] * len(chunk))}) ORDER BY b.id, i.id"
+            for bill in Bill._group_rows(db.fetch_all(query, tuple(chunk), dictionary=False)):
+                bills[bill.id] = bill
+        return bills
+    
+    @staticmethod
+    def iter_with_items(date_from=None, date_to=None, status=None, customer_id=None,
+                        db=None, chunk_size=500):
+        """Yield bills with their items, in id order, optionally filtered
+        
+        The bills and items are streamed from one query, so memory stays flat
+        however many bills match. The query holds a connection until the
+        iteration finishes or the generator is closed, and a failure part way
+        through raises the backend's error.
+        """
+        db = db or Database()
+        conditions = []
+        params = []
+        if date_from is not None:
+            conditions.append("b.bill_date >= %s")
+            params.append(date_from)
+        if date_to is not None:
+            conditions.append("b.bill_date <= %s")
+            params.append(date_to)
+        if status is not None:
+            conditions.append("b.status = %s")
+            params.append(status)
+        if customer_id is not None:
+            conditions.append("b.customer_id = %s")
+            params.append(customer_id)
+        
+        query = _WITH_ITEMS
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        query += " ORDER BY b.id, i.id"
+        chunks = db.iter_chunks(query, tuple(params) or None, chunk_size, dictionary=False)
+        yield from Bill._group_rows(row for chunk in chunks for row in chunk)
+    
     @staticmethod
     def get_by_customer(customer_id):
-        """Get bills for a specific customer"""
+        """Get bills for a specific customer, from the cache when possible; the list must not be modified"""
         db = Database()
         query = """
             SELECT b.*, c.name as customer_name
@@ -238,4 +727,8 @@ class Bill:
             WHERE b.customer_id = %s
             ORDER BY b.bill_date DESC
         """
-        return db.fetch_all(query, (customer_id,))
\ No newline at end of file
+        return results.get(
+            f"bills_of:{customer_id}",
+            lambda: db.fetch_all(query, (customer_id,)),
+            (f"customer:{customer_id}", f"bills_of:{customer_id}", "bills")
+        )
\ No newline at end of file
@@ -0,0 +1,250 @@
+# models/cache.py
+# Read-through cache of entities and query results. A lookup names a key and
+# a loader; on a miss the loader runs and its result is kept, tagged with the
+# records it was read from ("bill:12", "customer:3", ...). Writes invalidate
+# tags, which drops exactly the entries they made stale. Entries also expire
+# after a TTL, and the least recently used go first once the cache is full.
+#
+# Setting BILLING_CACHE_PATH to a file shares the cache between processes on
+# one machine: entries are also kept in that SQLite file, and invalidations
+# are logged there and applied by the other processes within SYNC_INTERVAL.
+# Use one cache file per database.
+import logging
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+import database
+
+CACHE_SIZE = 2000       # Entries kept in memory
+CACHE_TTL = 300         # Seconds before an entry is loaded again
+SYNC_INTERVAL = 1.0     # Seconds between checks for other processes' invalidations
+PRUNE_INTERVAL = 60     # Seconds between removals of expired entries from the file
+
+# Shared on-disk cache file; None keeps the cache in this process only
+CACHE_PATH = os.environ.get('BILLING_CACHE_PATH')
+
+
+class DiskCache:
+    """Cache entries and invalidations kept in a local SQLite file
+
+    The cache is best effort: errors are logged and treated as misses.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, timeout=1, isolation_level=None, check_same_thread=False)
+        self._connection.executescript("""
+            PRAGMA journal_mode = WAL;
+            PRAGMA synchronous = OFF;
+            CREATE TABLE IF NOT EXISTS entries (key TEXT PRIMARY KEY, value BLOB, expires REAL);
+            CREATE TABLE IF NOT EXISTS entry_tags (tag TEXT, key TEXT, PRIMARY KEY (tag, key));
+            CREATE TABLE IF NOT EXISTS invalidations (seq INTEGER PRIMARY KEY AUTOINCREMENT, tag TEXT, at REAL);
+        """)
+        self.seen = self._run("SELECT COALESCE(MAX(seq), 0) FROM invalidations")[0][0]
+
+    def _run(self, query, params=(), many=False):
+        """Run one statement and return its rows"""
+        with self._lock:
+            if many:
+                self._connection.executemany(query, params)
+                return []
+            return self._connection.execute(query, params).fetchall()
+
+    def get(self, key):
+        """Get (value, tags, expires) for a live entry, or None"""
+        try:
+            rows = self._run("SELECT value, expires FROM entries WHERE key = ? AND expires > ?", (key, time.time()))
+            if rows:
+                value, tags = pickle.loads(rows[0][0])
+                return value, tags, rows[0][1]
+        except (sqlite3.Error, pickle.PickleError, EOFError) as e:
+            logging.warning(f"Error reading cache entry {key}: {e}")
+        return None
+
+    def put(self, key, value, tags, expires):
+        try:
+            blob = pickle.dumps((value, tags), pickle.HIGHEST_PROTOCOL)
+            self._run("INSERT OR REPLACE INTO entries (key, value, expires) VALUES (?, ?, ?)", (key, blob, expires))
+            self._run("INSERT OR IGNORE INTO entry_tags (tag, key) VALUES (?, ?)", [(tag, key) for tag in tags], many=True)
+        except (sqlite3.Error, pickle.PickleError) as e:
+            logging.warning(f"Error writing cache entry {key}: {e}")
+
+    def invalidate(self, tags):
+        """Drop the entries with any of the tags and log the tags for other processes"""
+        try:
+            now = time.time()
+            with self._lock:
+                self._connection.execute("BEGIN IMMEDIATE")
+                try:
+                    for tag in tags:
+                        self._connection.execute(
+                            "DELETE FROM entries WHERE key IN (SELECT key FROM entry_tags WHERE tag = ?)", (tag,))
+                        self._connection.execute("DELETE FROM entry_tags WHERE tag = ?", (tag,))
+                        self._connection.execute("INSERT INTO invalidations (tag, at) VALUES (?, ?)", (tag, now))
+                    self._connection.execute("COMMIT")
+                except sqlite3.Error:
+                    self._connection.execute("ROLLBACK")
+                    raise
+        except sqlite3.Error as e:
+            logging.warning(f"Error invalidating cache tags: {e}")
+
+    def invalidated_since_seen(self):
+        """Get the tags invalidated since the last call, by any process"""
+        try:
+            rows = self._run("SELECT seq, tag FROM invalidations WHERE seq > ? ORDER BY seq", (self.seen,))
+        except sqlite3.Error as e:
+            logging.warning(f"Error reading cache invalidations: {e}")
+            return []
+        if rows:
+            self.seen = rows[-1][0]
+        return [tag for _, tag in rows]
+
+    def prune(self, ttl):
+        """Remove expired entries and invalidations older than any live entry"""
+        try:
+            now = time.time()
+            self._run("DELETE FROM entries WHERE expires <= ?", (now,))
+            self._run("DELETE FROM entry_tags WHERE key NOT IN (SELECT key FROM entries)")
+            self._run("DELETE FROM invalidations WHERE at < ?", (now - ttl,))
+        except sqlite3.Error as e:
+            logging.warning(f"Error pruning cache: {e}")
+
+
+class ResultCache:
+    """Read-through cache of loaded values, invalidated by tag
+
+    Values must not be modified by callers. Empty results are never cached,
+    since a failed query also returns nothing. A value loaded while any tag
+    was invalidated is returned but not kept, as it may already be stale.
+    """
+
+    def __init__(self, size=CACHE_SIZE, ttl=CACHE_TTL, path=CACHE_PATH):
+        self.size = size
+        self.ttl = ttl
+        self._entries = OrderedDict()   # key -> (expires, value, tags), least recently used first
+        self._tags = {}                 # tag -> keys
+        self._generation = 0            # Increased by every invalidation
+        self._pool = None               # Pool the entries were read through
+        self._lock = threading.Lock()
+        self._disk = None
+        self._synced = 0.0
+        self._pruned = time.monotonic()
+        self._counters = {'hits': 0, 'disk_hits': 0, 'misses': 0, 'evictions': 0, 'invalidations': 0}
+        if path:
+            try:
+                self._disk = DiskCache(path)
+            except sqlite3.Error as e:
+                logging.warning(f"Shared cache {path} unavailable, caching in memory only: {e}")
+
+    def get(self, key, load, tags=()):
+        """Get the value for key, calling load() on a miss
+
+        tags are the tags of the loaded value, or a function returning them
+        from the value.
+        """
+        self._sync()
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > now:
+                self._entries.move_to_end(key)
+                self._counters['hits'] += 1
+                return entry[1]
+            generation = self._generation
+
+        if self._disk:
+            entry = self._disk.get(key)
+            if entry is not None:
+                value, entry_tags, expires = entry
+                with self._lock:
+                    self._counters['disk_hits'] += 1
+                    if generation == self._generation:
+                        self._store(key, value, entry_tags, expires)
+                return value
+
+        value = load()
+        with self._lock:
+            self._counters['misses'] += 1
+            if not value or generation != self._generation:
+                return value
+            entry_tags = tuple(tags(value) if callable(tags) else tags)
+            expires = now + self.ttl
+            self._store(key, value, entry_tags, expires)
+        if self._disk:
+            self._disk.put(key, value, entry_tags, expires)
+        return value
+
+    def _store(self, key, value, tags, expires):
+        """Keep an entry in memory (lock held)"""
+        self._drop(key)
+        self._entries[key] = (expires, value, tags)
+        for tag in tags:
+            self._tags.setdefault(tag, set()).add(key)
+        while len(self._entries) > self.size:
+            self._drop(next(iter(self._entries)))
+            self._counters['evictions'] += 1
+
+    def _drop(self, key):
+        """Remove an entry from memory (lock held)"""
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            for tag in entry[2]:
+                keys = self._tags.get(tag)
+                if keys is not None:
+                    keys.discard(key)
+                    if not keys:
+                        del self._tags[tag]
+
+    def _forget(self, tags):
+        """Drop the in-memory entries with any of the tags (lock held)"""
+        self._generation += 1
+        for tag in tags:
+            for key in list(self._tags.get(tag, ())):
+                self._drop(key)
+
+    def invalidate(self, *tags):
+        """Drop every entry with any of the tags, here and in other processes"""
+        with self._lock:
+            self._forget(tags)
+            self._counters['invalidations'] += len(tags)
+        if self._disk:
+            self._disk.invalidate(tags)
+
+    def clear(self):
+        """Drop every in-memory entry"""
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+            self._tags.clear()
+
+    def _sync(self):
+        """Follow the database in use and apply other processes' invalidations"""
+        pool = database.get_pool()
+        if pool is not self._pool:
+            # A different database: nothing cached so far applies to it
+            self.clear()
+            self._pool = pool
+        if self._disk and time.monotonic() - self._synced >= SYNC_INTERVAL:
+            self._synced = time.monotonic()
+            tags = self._disk.invalidated_since_seen()
+            if tags:
+                with self._lock:
+                    self._forget(tags)
+            if self._synced - self._pruned >= PRUNE_INTERVAL:
+                self._pruned = self._synced
+                self._disk.prune(self.ttl)
+
+    def stats(self):
+        """Get the counters, the entry count and the hit rate"""
+        with self._lock:
+            stats = dict(self._counters, entries=len(self._entries))
+        lookups = stats['hits'] + stats['disk_hits'] + stats['misses']
+        stats['hit_rate'] = (stats['hits'] + stats['disk_hits']) / lookups if lookups else 0.0
+        return stats
+
+
+results = ResultCache()
@@ -1,8 +1,67 @@
 # models/customer.py
 from database import Database
+from models import events, journal, report
+from models.search import SEARCH_LIMIT, fulltext_query, prefix_pattern
+from models.cache import results
+import threading
+import time
+
+# Customer list snapshot settings
+CACHE_TTL = 300         # Seconds before the snapshot is refetched
+
+class CustomerCache:
+    """Process-wide versioned snapshot of the full customer list
+    
+    The version increases whenever the snapshot is replaced or invalidated, so
+    views can skip re-rendering when it has not changed. The snapshot expires
+    after CACHE_TTL to pick up writes from other processes. Single customers
+    are cached in models.cache.results.
+    """
+    
+    def __init__(self, ttl=CACHE_TTL):
+        self.ttl = ttl
+        self.version = 0
+        self._snapshot = None
+        self._snapshot_expires = 0
+        self._lock = threading.Lock()
+    
+    def get_all(self):
+        """Get (version, rows) for the full list, or None if not cached"""
+        with self._lock:
+            if self._snapshot is None or self._snapshot_expires < time.monotonic():
+                return None
+            return self.version, self._snapshot
+    
+    def put_all(self, rows, version):
+        """Store the full list fetched while the cache was at version
+        
+        Returns the new version, or None if the cache was invalidated while
+        the rows were being fetched and they may therefore be stale.
+        """
+        with self._lock:
+            if version != self.version:
+                return None
+            self.version += 1
+            self._snapshot = rows
+            self._snapshot_expires = time.monotonic() + self.ttl
+            return self.version
+    
+    def invalidate(self):
+        """Drop the full-list snapshot after a write"""
+        with self._lock:
+            self._snapshot = None
+            self.version += 1
+
+cache = CustomerCache()
 
 class Customer:
-    """Customer model class"""
+    """Customer model class
+    
+    Customers are plain records: reads and writes go through a Database
+    session, passed as db or created per call.
+    """
+    
+    __slots__ = ('id', 'name', 'email', 'phone', 'address', 'created_at', 'queued')
     
     def __init__(self, id=None, name="", email="", phone="", address="", created_at=None):
         self.id = id
@@ -11,19 +70,37 @@ class Customer:
         self.phone = phone
         self.address = address
         self.created_at = created_at
-        self.db = Database()
+        self.queued = None      # Journal key of a save queued while offline
     
-    def save(self):
-        """Save customer to database"""
-        if self.id is None:
+    def save(self, db=None, idempotency_key=None):
+        """Save customer to database, through db when given
+        
+        If the database cannot be reached, or earlier saves are still queued,
+        the save is queued in the offline journal instead: queued is set to
+        its key and True is returned. The journal replays it with
+        idempotency_key, so it is applied only once.
+        """
+        db = db or Database()
+        is_new = self.id is None
+        self.queued = None
+        if idempotency_key is None and journal.is_offline(db):
+            return self._queue()
+        if idempotency_key:
+            if not db.begin():
+                return False
+            if journal.is_applied(db, idempotency_key):
+                db.rollback()
+                return True
+        
+        if is_new:
             # Insert new customer
             query = """
                 INSERT INTO customers (name, email, phone, address)
                 VALUES (%s, %s, %s, %s)
             """
             params = (self.name, self.email, self.phone, self.address)
-            self.id = self.db.insert(query, params)
-            return self.id is not None
+            self.id = db.insert(query, params)
+            saved = self.id is not None
         else:
             # Update existing customer
             query = """
@@ -32,20 +109,84 @@ class Customer:
                 WHERE id = %s
             """
             params = (self.name, self.email, self.phone, self.address, self.id)
-            return self.db.execute_query(query, params)
+            saved = db.execute_query(query, params)
+        
+        if idempotency_key:
+            saved = saved and journal.record_applied(db, idempotency_key, self.id) and db.commit()
+            if not saved:
+                db.rollback()
+        if not saved and is_new:
+            self.id = None
+        
+        cache.invalidate()
+        if not is_new:
+            results.invalidate(f"customer:{self.id}")
+        if saved:
+            events.bus.publish((events.CustomerCreated if is_new else events.CustomerUpdated)(self.id, self._row()))
+            return True
+        if idempotency_key is None and not db.is_reachable():
+            return self._queue()
+        return False
+    
+    def _queue(self):
+        """Queue this save in the offline journal and return whether it was stored"""
+        self.queued = journal.queue('customer', self._journal_payload())
+        return self.queued is not None
+    
+    def _journal_payload(self):
+        """The fields a queued save writes"""
+        return {'id': self.id, 'name': self.name, 'email': self.email, 'phone': self.phone, 'address': self.address}
+    
+    @staticmethod
+    def from_journal(payload):
+        """Rebuild a queued save"""
+        return Customer(**payload)
+    
+    def _row(self):
+        """The customer as a row like those the queries return"""
+        return {
+            'id': self.id, 'name': self.name, 'email': self.email, 'phone': self.phone,
+            'address': self.address, 'created_at': self.created_at,
+        }
     
-    def delete(self):
-        """Delete customer from database"""
+    def delete(self, db=None):
+        """Delete customer from database, through db when given"""
         if self.id is None:
             return False
-            
+        
+        db = db or Database()
+        if not db.begin():
+            return False
+        
+        # Bills go with the customer (ON DELETE CASCADE), so take them out of the reports first
         query = "DELETE FROM customers WHERE id = %s"
-        return self.db.execute_query(query, (self.id,))
+        deleted = (
+            report.apply(db, removed=report.customer_rows(db, self.id)) and
+            db.execute_query(query, (self.id,)) and
+            db.commit()
+        )
+        if not deleted:
+            db.rollback()
+        cache.invalidate()
+        # Their bills went with them
+        results.invalidate(f"customer:{self.id}", f"owner:{self.id}", f"bills_of:{self.id}")
+        if deleted:
+            events.bus.publish(events.CustomerDeleted(self.id))
+        return deleted
     
-    def load(self, id):
-        """Load customer data from database by ID"""
+    def load(self, id, db=None, cached=True):
+        """Load customer data by ID
+        
+        The result cache is used unless cached is False or db has a
+        transaction open. Load a customer to edit with cached=False: the
+        cache only sees this process's writes, not those of other terminals.
+        """
         query = "SELECT * FROM customers WHERE id = %s"
-        data = self.db.fetch_one(query, (id,))
+        db = db or Database()
+        if db.connection is not None or not cached:
+            data = db.fetch_one(query, (id,))
+        else:
+            data = results.get(f"customer:{id}", lambda: db.fetch_one(query, (id,)), (f"customer:{id}",))
         
         if data:
             self.id = data['id']
@@ -59,27 +200,72 @@ class Customer:
     
     @staticmethod
     def get_all():
-        """Get all customers from database"""
+        """Get all customers, from the cache when possible"""
+        return Customer.get_all_versioned()[1]
+    
+    @staticmethod
+    def get_all_versioned(refresh=False):
+        """Get (cache version, customers); the list must not be modified
+        
+        refresh bypasses the cached snapshot and reloads it from the database.
+        """
+        cached = None if refresh else cache.get_all()
+        if cached:
+            return cached
+        
+        version = cache.version
         db = Database()
         query = "SELECT * FROM customers ORDER BY name"
-        return db.fetch_all(query)
+        rows = db.fetch_all(query)
+        # An empty result may be a failed query, so it is never cached; rows
+        # fetched across an invalidation are returned but not cached either
+        new_version = cache.put_all(rows, version) if rows else None
+        if new_version is not None:
+            journal.keep_customers(rows)
+        elif not rows and not db.is_reachable():
+            # Offline: bills can still be made out to the customers last seen
+            rows = journal.kept_customers()
+        return (new_version if new_version is not None else cache.version), rows
     
     @staticmethod
-    def search(term):
-        """Search customers by name, email or phone"""
+    def search(term, limit=SEARCH_LIMIT):
+        """Search customers by name, email or phone, best matches first"""
         db = Database()
-        query = """
-            SELECT * FROM customers
-            WHERE name LIKE %s OR email LIKE %s OR phone LIKE %s
-            ORDER BY name
-        """
-        search_term = f"%{term}%"
-        params = (search_term, search_term, search_term)
-        return db.fetch_all(query, params)
+        return db.fetch_all(*Customer._search_query(term, limit))
+    
+    @staticmethod
+    def iter_search(term, db, limit=SEARCH_LIMIT, chunk_size=25):
+        """Run a search on db, yielding results in chunks as they arrive"""
+        return db.iter_chunks(*Customer._search_query(term, limit), size=chunk_size)
+    
+    @staticmethod
+    def _search_query(term, limit):
+        """Build the search query and parameters for a term"""
+        match = fulltext_query(term)
+        if match:
+            query = """
+                SELECT *, MATCH(name, email, phone) AGAINST (%s IN BOOLEAN MODE) as score
+                FROM customers
+                WHERE MATCH(name, email, phone) AGAINST (%s IN BOOLEAN MODE)
+                ORDER BY score DESC, name
+                LIMIT %s
+            """
+            params = (match, match, limit)
+        else:
+            # Too short for the full-text index: match the start of each field
+            query = """
+                SELECT * FROM customers
+                WHERE name LIKE %s ESCAPE '!' OR email LIKE %s ESCAPE '!' OR phone LIKE %s ESCAPE '!'
+                ORDER BY name
+                LIMIT %s
+            """
+            search_term = prefix_pattern(term)
+            params = (search_term, search_term, search_term, limit)
+        return query, params
     
     @staticmethod
-    def get_by_id(id):
+    def get_by_id(id, db=None, cached=True):
         """Get customer by ID"""
         customer = Customer()
-        customer.load(id)
+        customer.load(id, db, cached)
         return customer if customer.id else None
\ No newline at end of file
@@ -0,0 +1,103 @@
+# models/events.py
+# Change notifications from the models. A model publishes an event after each
+# committed write, and views apply it to the rows they show instead of
+# reloading. Handlers run on the publishing thread (often a database worker);
+# UI code subscribes through ui.events, which delivers on the GUI thread.
+import logging
+import threading
+from collections import Counter
+
+
+class ModelEvent:
+    """A committed change to one record"""
+
+    def __init__(self, id, row=None):
+        self.id = id
+        self.row = row      # The record as written, when the model has it
+
+    def __repr__(self):
+        return f"{type(self).__name__}(id={self.id})"
+
+
+class CustomerEvent(ModelEvent):
+    """Base class of customer changes"""
+
+
+class CustomerCreated(CustomerEvent):
+    pass
+
+
+class CustomerUpdated(CustomerEvent):
+    pass
+
+
+class CustomerDeleted(CustomerEvent):
+    """A customer was deleted, and their bills with them"""
+
+
+class BillEvent(ModelEvent):
+    """Base class of bill changes"""
+
+
+class BillCreated(BillEvent):
+    pass
+
+
+class BillUpdated(BillEvent):
+    pass
+
+
+class BillDeleted(BillEvent):
+    pass
+
+
+class EventBus:
+    """Publishes model events to the handlers subscribed to their type
+
+    A handler subscribed to a base class receives every subclass event.
+    Subscribing the same handler twice has no effect. The counters record
+    events published and delivered, plus any a subscriber reports with
+    count(), such as the full reloads it avoided.
+    """
+
+    def __init__(self):
+        self._handlers = []     # (event type, handler) in subscription order
+        self._lock = threading.Lock()
+        self._counters = Counter()
+
+    def subscribe(self, event_type, handler):
+        """Call handler(event) for every event of event_type published from now on"""
+        with self._lock:
+            if (event_type, handler) not in self._handlers:
+                self._handlers.append((event_type, handler))
+
+    def unsubscribe(self, event_type, handler):
+        with self._lock:
+            if (event_type, handler) in self._handlers:
+                self._handlers.remove((event_type, handler))
+
+    def publish(self, event):
+        """Deliver an event to its subscribers"""
+        with self._lock:
+            handlers = [handler for event_type, handler in self._handlers if isinstance(event, event_type)]
+            self._counters['published'] += 1
+            self._counters[type(event).__name__] += 1
+            self._counters['delivered'] += len(handlers)
+        for handler in handlers:
+            try:
+                handler(event)
+            except Exception as e:
+                logging.error(f"Error handling {event!r}: {e}")
+
+    def count(self, name, amount=1):
+        """Add to a named counter"""
+        with self._lock:
+            self._counters[name] += amount
+
+    def stats(self):
+        """Get a copy of the counters"""
+        with self._lock:
+            return dict(self._counters)
+
+
+bus = EventBus()
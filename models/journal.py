@@ -0,0 +1,263 @@
+# models/journal.py
+# Local write-ahead journal for customer and bill saves made while the
+# database cannot be reached. Such a save is appended to a SQLite file on this
+# machine, committed with a full sync, instead of failing. From the first
+# failed connection until a replay has emptied the journal, saves go straight
+# to it without trying the database, so they are applied in the order made.
+# Once the database is back the entries are replayed in order, in batches,
+# through the models' own save(). Each entry carries an idempotency key that
+# the replayed save records in idempotency_keys in its own transaction, so an
+# entry is applied exactly once even if replay is interrupted or runs twice.
+# The app replays periodically; it can also be run by hand:
+#   python -m models.journal [--batch-size N]
+import argparse
+import json
+import logging
+import os
+import sqlite3
+import sys
+import threading
+import time
+import uuid
+from database import Database
+
+# Journal file, next to the SQLite database
+JOURNAL_PATH = os.path.join('data', 'journal.db')
+
+# Entries read and applied per replay batch
+BATCH_SIZE = 100
+
+# Replays an entry may fail (with the database reachable) before it is set aside
+MAX_ATTEMPTS = 5
+
+
+class Journal:
+    """Append-only queue of pending writes in a local SQLite file"""
+
+    def __init__(self, path=JOURNAL_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        self._connection.executescript("""
+            PRAGMA journal_mode = WAL;
+            PRAGMA synchronous = FULL;
+            CREATE TABLE IF NOT EXISTS entries (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                idempotency_key TEXT NOT NULL UNIQUE,
+                kind TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                error TEXT
+            );
+            CREATE TABLE IF NOT EXISTS copies (name TEXT PRIMARY KEY, rows TEXT NOT NULL);
+        """)
+
+    def _run(self, query, params=()):
+        with self._lock:
+            return self._connection.execute(query, params).fetchall()
+
+    def append(self, kind, payload):
+        """Queue a write and return its idempotency key, or None if it could not be stored"""
+        key = uuid.uuid4().hex
+        try:
+            self._run(
+                "INSERT INTO entries (idempotency_key, kind, payload, created_at) VALUES (?, ?, ?, ?)",
+                (key, kind, json.dumps(payload), time.time())
+            )
+        except sqlite3.Error as e:
+            logging.error(f"Error writing to the offline journal: {e}")
+            return None
+        logging.info(f"Queued {kind} write {key} in the offline journal")
+        return key
+
+    def pending(self, limit, after=0):
+        """Get up to limit (seq, key, kind, payload) entries still to replay, oldest first"""
+        rows = self._run(
+            """
+            SELECT seq, idempotency_key, kind, payload FROM entries
+            WHERE seq > ? AND attempts < ?
+            ORDER BY seq LIMIT ?
+            """,
+            (after, MAX_ATTEMPTS, limit)
+        )
+        return [(seq, key, kind, json.loads(payload)) for seq, key, kind, payload in rows]
+
+    def remove(self, seqs):
+        """Drop applied entries"""
+        if seqs:
+            self._run(f"DELETE FROM entries WHERE seq IN ({', '.join('?' * len(seqs))})", tuple(seqs))
+
+    def failed(self, seq, error):
+        """Count a failed replay of an entry"""
+        self._run("UPDATE entries SET attempts = attempts + 1, error = ? WHERE seq = ?", (error, seq))
+
+    def keep(self, name, rows):
+        """Keep a copy of rows read from the database, to use while it is unreachable"""
+        try:
+            self._run("INSERT OR REPLACE INTO copies (name, rows) VALUES (?, ?)",
+                      (name, json.dumps(rows, default=str)))
+        except sqlite3.Error as e:
+            logging.warning(f"Error keeping a copy of {name} in the offline journal: {e}")
+
+    def kept(self, name):
+        """Get the rows last kept under a name, or an empty list"""
+        rows = self._run("SELECT rows FROM copies WHERE name = ?", (name,))
+        return json.loads(rows[0][0]) if rows else []
+
+    def counts(self):
+        """Get the number of entries waiting and set aside after MAX_ATTEMPTS"""
+        (waiting, set_aside), = self._run(
+            "SELECT COUNT(*) - COUNT(CASE WHEN attempts >= ? THEN 1 END), COUNT(CASE WHEN attempts >= ? THEN 1 END) FROM entries",
+            (MAX_ATTEMPTS, MAX_ATTEMPTS)
+        )
+        return waiting, set_aside
+
+
+_journal = None
+_journal_lock = threading.Lock()
+
+# Set while entries wait to be replayed; later saves queue behind them
+_pending = threading.Event()
+
+
+def get_journal():
+    """Return the process-wide journal, opening it on first use"""
+    global _journal
+    if _journal is None:
+        with _journal_lock:
+            if _journal is None:
+                os.makedirs(os.path.dirname(JOURNAL_PATH) or '.', exist_ok=True)
+                journal = Journal(JOURNAL_PATH)
+                if journal.counts()[0]:
+                    _pending.set()
+                _journal = journal
+    return _journal
+
+
+def is_offline(db):
+    """Whether saves go straight to the journal
+
+    True from a failed connection (db.is_reachable() is False) until a replay
+    reconnects, and while entries wait to be replayed.
+    """
+    if not db.is_reachable():
+        return True
+    try:
+        get_journal()
+    except sqlite3.Error as e:
+        logging.error(f"Error opening the offline journal: {e}")
+    return _pending.is_set()
+
+
+def is_applied(db, key):
+    """Whether the write with an idempotency key was already applied (inside db's transaction)"""
+    query = "SELECT record_id FROM idempotency_keys WHERE idempotency_key = %s"
+    return db.fetch_one(query, (key,)) is not None
+
+
+def record_applied(db, key, record_id):
+    """Record an idempotency key in db's transaction; fails if it was already recorded"""
+    query = "INSERT INTO idempotency_keys (idempotency_key, record_id) VALUES (%s, %s)"
+    return db.execute_query(query, (key, record_id))
+
+
+def queue(kind, payload):
+    """Queue a save for replay; return its key, or None if it could not be stored"""
+    try:
+        journal = get_journal()
+    except sqlite3.Error as e:
+        logging.error(f"Error opening the offline journal: {e}")
+        return None
+    with _journal_lock:
+        key = journal.append(kind, payload)
+        if key:
+            _pending.set()
+    return key
+
+
+def keep_customers(rows):
+    """Keep the customer list read from the database for choosing customers offline"""
+    try:
+        get_journal().keep('customers', rows)
+    except sqlite3.Error as e:
+        logging.warning(f"Error opening the offline journal: {e}")
+
+
+def kept_customers():
+    """The customer list last kept, or an empty list"""
+    try:
+        return get_journal().kept('customers')
+    except sqlite3.Error as e:
+        logging.warning(f"Error reading the offline journal: {e}")
+        return []
+
+
+def replay(batch_size=BATCH_SIZE):
+    """Apply the queued writes in order while the database is reachable
+
+    Returns statistics with the entries applied, the entries that failed
+    and the entries still waiting.
+    """
+    from models.bill import Bill
+    from models.customer import Customer
+    records = {'customer': Customer, 'bill': Bill}
+
+    journal = get_journal()
+    db = Database()
+    stats = {'applied': 0, 'failed': 0, 'waiting': 0}
+    if not db.probe():
+        # Still unreachable: one connection attempt per replay
+        stats['waiting'] = journal.counts()[0]
+        return stats
+
+    after = 0
+    while True:
+        entries = journal.pending(batch_size, after)
+        if not entries:
+            break
+        applied = []
+        for seq, key, kind, payload in entries:
+            after = seq
+            if records[kind].from_journal(payload).save(db, idempotency_key=key):
+                applied.append(seq)
+            elif db.is_reachable():
+                journal.failed(seq, "save failed")
+                stats['failed'] += 1
+                logging.error(f"Replaying {kind} write {key} from the offline journal failed")
+            else:
+                # Offline again: the rest waits for the next replay
+                after = None
+                break
+        journal.remove(applied)
+        stats['applied'] += len(applied)
+        if after is None:
+            break
+
+    with _journal_lock:
+        stats['waiting'] = journal.counts()[0]
+        if not stats['waiting']:
+            # Drained: saves go to the database again
+            _pending.clear()
+    if stats['applied'] or stats['failed']:
+        logging.info(
+            f"Offline journal replay applied {stats['applied']} writes, "
+            f"{stats['failed']} failed, {stats['waiting']} waiting"
+        )
+    return stats
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description="Replay writes queued while the database was unreachable.")
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+    args = parser.parse_args(argv)
+
+    if not Database().initialize_database():
+        return 1
+    stats = replay(batch_size=args.batch_size)
+    waiting, set_aside = get_journal().counts()
+    print(f"{stats['applied']} writes applied, {stats['failed']} failed, {waiting} waiting, {set_aside} set aside")
+    return 0 if not waiting and not set_aside else 1
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
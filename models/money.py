@@ -0,0 +1,191 @@
+# models/money.py
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+
+# NumPy, imported on first use by batch_totals (it adds ~100 ms to startup);
+# False once the import has failed
+numpy = None
+
+def _load_numpy():
+    """Import NumPy if needed and return whether it is available"""
+    global numpy
+    if numpy is None:
+        try:
+            import numpy as module
+        except ImportError:     # Only needed to speed up batch_totals
+            module = False
+        numpy = module
+    return numpy is not False
+
+# Tax rate for bills that do not set their own
+DEFAULT_TAX_RATE = Decimal('0.10')
+
+# Precision of the DECIMAL columns: amounts and quantities (10, 2), tax rates (5, 4)
+CENTS = Decimal('0.01')
+RATE_PLACES = Decimal('0.0001')
+
+# Tax rates are applied as integer units of RATE_PLACES
+RATE_SCALE = 10000
+
+def to_decimal(value, places=CENTS):
+    """Convert a number, string or DECIMAL column value to a rounded Decimal"""
+    if value is None:
+        return Decimal(0).quantize(places)
+    # Going through str keeps floats read from SQLite at their printed value
+    return Decimal(str(value)).quantize(places, ROUND_HALF_UP)
+
+def to_rate(value):
+    """Convert a tax rate to a Decimal with four places; None stays None"""
+    return None if value is None else to_decimal(value, RATE_PLACES)
+
+def parse_decimal(text):
+    """Parse user input as a finite Decimal, raising ValueError otherwise"""
+    try:
+        value = Decimal(text.strip())
+    except InvalidOperation:
+        raise ValueError(f"Invalid number: {text!r}") from None
+    if not value.is_finite():
+        raise ValueError(f"Invalid number: {text!r}")
+    return value
+
+def to_cents(amount):
+    """Convert an amount to integer cents"""
+    return int(to_decimal(amount).scaleb(2))
+
+def from_cents(cents):
+    """Convert integer cents to a Decimal amount"""
+    return Decimal(cents).scaleb(-2)
+
+def line_amount(quantity, unit_price):
+    """Amount of an item line, rounded to cents"""
+    return to_decimal(Decimal(quantity) * Decimal(unit_price))
+
+def rate_units(rate):
+    """Convert a tax rate to integer units of RATE_PLACES"""
+    return int(to_rate(rate).scaleb(4))
+
+def tax_cents(cents, units):
+    """Tax in cents on an amount in cents, rounded half away from zero"""
+    tax = (abs(cents) * units + RATE_SCALE // 2) // RATE_SCALE
+    return -tax if cents < 0 else tax
+
+
+class Totals:
+    """Running subtotal and tax of one bill, kept in integer cents
+
+    Item amounts are summed per tax rate, so adding, removing or editing an
+    item costs O(1) and tax is rounded once per rate rather than per item.
+    Items without their own rate are summed under None and taxed at the
+    bill's rate, which can therefore change without revisiting the items.
+    """
+
+    __slots__ = ('tax_rate', '_cents')
+
+    def __init__(self, tax_rate=DEFAULT_TAX_RATE):
+        self.tax_rate = to_rate(tax_rate)
+        self._cents = {}    # Item tax rate (or None) -> summed amount in cents
+
+    def add(self, amount, rate=None):
+        """Add an item amount taxed at rate (None for the bill's rate)"""
+        self._add_cents(to_cents(amount), rate)
+
+    def remove(self, amount, rate=None):
+        """Remove an item amount previously added with the same rate"""
+        self._add_cents(-to_cents(amount), rate)
+
+    def _add_cents(self, cents, rate):
+        total = self._cents.get(rate, 0) + cents
+        if total:
+            self._cents[rate] = total
+        else:
+            self._cents.pop(rate, None)
+
+    def clear(self):
+        """Remove every item"""
+        self._cents = {}
+
+    @property
+    def subtotal_cents(self):
+        return sum(self._cents.values())
+
+    @property
+    def tax_cents(self):
+        return sum(
+            tax_cents(cents, rate_units(self.tax_rate if rate is None else rate))
+            for rate, cents in self._cents.items()
+        )
+
+    @property
+    def subtotal(self):
+        return from_cents(self.subtotal_cents)
+
+    @property
+    def tax(self):
+        return from_cents(self.tax_cents)
+
+    @property
+    def grand_total(self):
+        return from_cents(self.subtotal_cents + self.tax_cents)
+
+
+def batch_totals(rows):
+    """Compute the totals of many bills at once from their item rows
+
+    rows yields (bill_id, amount, item_tax_rate, bill_tax_rate) tuples, with
+    item_tax_rate None for items taxed at the bill's rate. Returns a dict of
+    bill_id -> (subtotal, tax, grand_total) Decimals, rounded exactly as
+    Totals does; bills without items are not included. Uses NumPy over
+    integer cents when it is installed.
+    """
+    bill_ids, cents, units = [], [], []
+    for bill_id, amount, item_rate, bill_rate in rows:
+        bill_ids.append(bill_id)
+        cents.append(to_cents(amount))
+        units.append(rate_units(bill_rate if item_rate is None else item_rate))
+    if not bill_ids:
+        return {}
+
+    if _load_numpy():
+        sums = _batch_sums_numpy(bill_ids, cents, units)
+    else:
+        sums = _batch_sums_python(bill_ids, cents, units)
+    return {
+        bill_id: (from_cents(subtotal), from_cents(tax), from_cents(subtotal + tax))
+        for bill_id, (subtotal, tax) in sums.items()
+    }
+
+def _batch_sums_python(bill_ids, cents, units):
+    """Sum cents per (bill, rate), then subtotal and tax per bill"""
+    groups = {}
+    for bill_id, rate, amount in zip(bill_ids, units, cents):
+        groups[bill_id, rate] = groups.get((bill_id, rate), 0) + amount
+
+    sums = {}
+    for (bill_id, rate), amount in groups.items():
+        subtotal, tax = sums.get(bill_id, (0, 0))
+        sums[bill_id] = (subtotal + amount, tax + tax_cents(amount, rate))
+    return sums
+
+def _batch_sums_numpy(bill_ids, cents, units):
+    """Vectorised _batch_sums_python using int64 arrays"""
+    cents = numpy.asarray(cents, dtype=numpy.int64)
+    pairs = numpy.column_stack((
+        numpy.asarray(bill_ids, dtype=numpy.int64),
+        numpy.asarray(units, dtype=numpy.int64)
+    ))
+    groups, group_of = numpy.unique(pairs, axis=0, return_inverse=True)
+    group_cents = numpy.zeros(len(groups), dtype=numpy.int64)
+    numpy.add.at(group_cents, group_of.reshape(-1), cents)
+
+    # Same rounding as tax_cents, half away from zero
+    group_tax = (numpy.abs(group_cents) * groups[:, 1] + RATE_SCALE // 2) // RATE_SCALE
+    group_tax *= numpy.where(group_cents < 0, -1, 1)
+
+    bills, bill_of = numpy.unique(groups[:, 0], return_inverse=True)
+    subtotals = numpy.zeros(len(bills), dtype=numpy.int64)
+    taxes = numpy.zeros(len(bills), dtype=numpy.int64)
+    numpy.add.at(subtotals, bill_of, group_cents)
+    numpy.add.at(taxes, bill_of, group_tax)
+    return {
+        int(bill_id): (int(subtotal), int(tax))
+        for bill_id, subtotal, tax in zip(bills, subtotals, taxes)
+    }
@@ -0,0 +1,93 @@
+# models/overdue.py
+# Marks PENDING bills past their due date as OVERDUE. The app runs a sweep at
+# startup and then periodically; it can also be run as a scheduled job:
+#   python -m models.overdue [--batch-size N]
+import argparse
+import logging
+import sys
+import time
+from datetime import date
+from backends import Error
+from database import Database
+from models import report
+from models.cache import results
+
+# Bills updated per transaction, bounding lock time and undo size
+BATCH_SIZE = 1000
+
+def _sweep_batch(db, today, batch_size):
+    """Mark one batch of past-due bills overdue and return the count, or None on error"""
+    if not db.begin():
+        return None
+
+    # Served by idx_status_due_date: an index range scan that stops after batch_size rows
+    query = f"""
+        SELECT id, {report.BILL_COLUMNS}
+        FROM bills
+        WHERE status = 'PENDING' AND due_date < %s
+        ORDER BY due_date
+        LIMIT %s
+        FOR UPDATE
+    """
+    # iter_chunks raises on error, so a failed read is never taken for "no bills left"
+    try:
+        rows = [row for chunk in db.iter_chunks(query, (today, batch_size), size=batch_size) for row in chunk]
+    except Error:
+        db.rollback()
+        return None
+    if not rows:
+        db.rollback()
+        return 0
+
+    placeholders = ", ".join(["%s"] * len(rows))
+    query = f"UPDATE bills SET status = 'OVERDUE' WHERE id IN ({placeholders})"
+    overdue = [dict(row, status='OVERDUE') for row in rows]
+    if (db.execute_query(query, tuple(row['id'] for row in rows)) and
+            report.apply(db, removed=rows, added=overdue) and db.commit()):
+        results.invalidate(*{f"bill:{row['id']}" for row in rows}, *{f"bills_of:{row['customer_id']}" for row in rows})
+        return len(rows)
+    db.rollback()
+    return None
+
+def sweep(today=None, batch_size=BATCH_SIZE):
+    """Mark every PENDING bill due before today as OVERDUE, in batches
+
+    Returns statistics with the number of bills updated, the batches used,
+    the time taken and whether the sweep finished without errors.
+    """
+    db = Database()
+    today = today or date.today()
+    stats = {'updated': 0, 'batches': 0, 'seconds': 0.0, 'complete': False}
+    started = time.perf_counter()
+
+    while True:
+        updated = _sweep_batch(db, today, batch_size)
+        if updated is None:
+            break
+        stats['updated'] += updated
+        stats['batches'] += 1
+        if updated < batch_size:
+            stats['complete'] = True
+            break
+
+    stats['seconds'] = time.perf_counter() - started
+    if stats['updated'] or not stats['complete']:
+        logging.info(
+            f"Overdue sweep marked {stats['updated']} bills in {stats['batches']} batches "
+            f"in {stats['seconds']:.2f}s{'' if stats['complete'] else ' (stopped on error)'}"
+        )
+    return stats
+
+def main(argv):
+    parser = argparse.ArgumentParser(description="Mark pending bills past their due date as overdue.")
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+    args = parser.parse_args(argv)
+
+    if not Database().initialize_database():
+        return 1
+    stats = sweep(batch_size=args.batch_size)
+    print(f"{stats['updated']} bills marked overdue in {stats['batches']} batches, {stats['seconds']:.2f}s")
+    return 0 if stats['complete'] else 1
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,179 @@
+# models/report.py
+# Summary tables for reporting, kept up to date as bills are written.
+# report_daily holds bill counts and amounts per bill date and status, and
+# report_customer per customer and status, so reports read a few summary rows
+# instead of scanning bills. Rebuild them from the bills table with:
+#   python -m models.report rebuild
+import sys
+import time
+from datetime import date
+from database import Database
+from models.money import to_decimal
+
+# Statuses whose grand total is still owed
+OUTSTANDING_STATUSES = ('PENDING', 'OVERDUE')
+
+# Columns read from bills to maintain the summaries
+BILL_COLUMNS = "bill_date, customer_id, status, total_amount, tax_amount, grand_total"
+
+_AMOUNTS = ('total_amount', 'tax_amount', 'grand_total')
+
+def apply(db, removed=(), added=()):
+    """Update the summary tables for bills removed and added, inside db's transaction
+
+    removed and added are bill rows with the BILL_COLUMNS fields, e.g. the
+    old and new versions of an updated bill; a row may carry a 'bills'
+    count to stand for several bills at once. Returns False on error.
+    """
+    daily = {}
+    by_customer = {}
+    for sign, rows in ((-1, removed), (1, added)):
+        for row in rows:
+            count = sign * row.get('bills', 1)
+            amounts = [sign * to_decimal(row[field]) for field in _AMOUNTS]
+            for totals, key in ((daily, (str(row['bill_date']), row['status'])),
+                                (by_customer, (row['customer_id'], row['status']))):
+                current = totals.setdefault(key, [0, 0, 0, 0])
+                for index, value in enumerate([count] + amounts):
+                    current[index] += value
+
+    # Updating a bill without changing its date, customer or status leaves zero deltas
+    daily = [(*key, *values) for key, values in daily.items() if any(values)]
+    by_customer = [(*key, *values) for key, values in by_customer.items() if any(values)]
+    return (
+        db.execute_many(_upsert('report_daily', 'day'), daily) and
+        db.execute_many(_upsert('report_customer', 'customer_id'), by_customer)
+    )
+
+def _upsert(table, key):
+    """Statement adding a delta to one summary row, creating it if needed"""
+    # SQLite keeps DECIMAL columns as floats, so each running sum is rounded
+    # back to cents rather than left to gather float error; exact on MySQL
+    return f"""
+        INSERT INTO {table} ({key}, status, bills, total_amount, tax_amount, grand_total)
+        VALUES (%s, %s, %s, %s, %s, %s)
+        ON DUPLICATE KEY UPDATE bills = bills + VALUES(bills),
+            total_amount = ROUND(total_amount + VALUES(total_amount), 2),
+            tax_amount = ROUND(tax_amount + VALUES(tax_amount), 2),
+            grand_total = ROUND(grand_total + VALUES(grand_total), 2)
+    """
+
+def bill_row(db, bill_id):
+    """Read a bill's summary fields, locking the row inside a transaction"""
+    return db.fetch_one(f"SELECT {BILL_COLUMNS} FROM bills WHERE id = %s FOR UPDATE", (bill_id,))
+
+def customer_rows(db, customer_id):
+    """Summary fields of all a customer's bills, grouped the way they are counted"""
+    query = """
+        SELECT bill_date, customer_id, status, COUNT(*) as bills, SUM(total_amount) as total_amount,
+               SUM(tax_amount) as tax_amount, SUM(grand_total) as grand_total
+        FROM bills
+        WHERE customer_id = %s
+        GROUP BY bill_date, customer_id, status
+    """
+    return db.fetch_all(query, (customer_id,))
+
+def rebuild(db=None):
+    """Recompute both summary tables from the bills table in one transaction"""
+    db = db or Database()
+    if not db.begin():
+        return False
+    statements = [
+        "DELETE FROM report_daily",
+        "DELETE FROM report_customer",
+        """
+            INSERT INTO report_daily (day, status, bills, total_amount, tax_amount, grand_total)
+            SELECT bill_date, status, COUNT(*),
+                   ROUND(SUM(total_amount), 2), ROUND(SUM(tax_amount), 2), ROUND(SUM(grand_total), 2)
+            FROM bills
+            GROUP BY bill_date, status
+        """,
+        """
+            INSERT INTO report_customer (customer_id, status, bills, total_amount, tax_amount, grand_total)
+            SELECT customer_id, status, COUNT(*),
+                   ROUND(SUM(total_amount), 2), ROUND(SUM(tax_amount), 2), ROUND(SUM(grand_total), 2)
+            FROM bills
+            GROUP BY customer_id, status
+        """,
+    ]
+    if all(db.execute_query(statement) for statement in statements):
+        return db.commit()
+    db.rollback()
+    return False
+
+def _summary(rows):
+    """Convert summed amounts, which SQLite returns as floats, to Decimals"""
+    for row in rows:
+        row['bills'] = int(row['bills'] or 0)
+        for field in _AMOUNTS:
+            row[field] = to_decimal(row[field])
+    return rows
+
+def period_totals(date_from, date_to):
+    """Bill count and amounts per status for bills dated in [date_from, date_to]"""
+    db = Database()
+    query = """
+        SELECT status, SUM(bills) as bills, SUM(total_amount) as total_amount,
+               SUM(tax_amount) as tax_amount, SUM(grand_total) as grand_total
+        FROM report_daily
+        WHERE day BETWEEN %s AND %s
+        GROUP BY status
+    """
+    return {row['status']: row for row in _summary(db.fetch_all(query, (date_from, date_to)))}
+
+def monthly_totals(date_from, date_to):
+    """Bill count and amounts per month for bills dated in [date_from, date_to], oldest first"""
+    db = Database()
+    query = """
+        SELECT day, SUM(bills) as bills, SUM(total_amount) as total_amount,
+               SUM(tax_amount) as tax_amount, SUM(grand_total) as grand_total
+        FROM report_daily
+        WHERE day BETWEEN %s AND %s
+        GROUP BY day
+        ORDER BY day
+    """
+    months = {}
+    # At most a few hundred days per year, so months are folded here rather than in SQL
+    for row in _summary(db.fetch_all(query, (date_from, date_to))):
+        month = str(row['day'])[:7]
+        totals = months.setdefault(month, {'month': month, 'bills': 0, 'total_amount': 0, 'tax_amount': 0, 'grand_total': 0})
+        for field in ('bills',) + _AMOUNTS:
+            totals[field] += row[field]
+    return list(months.values())
+
+def outstanding_by_customer(limit=100):
+    """Customers owing the most on pending and overdue bills, largest balance first"""
+    db = Database()
+    query = f"""
+        SELECT c.id, c.name, SUM(r.bills) as bills, SUM(r.total_amount) as total_amount,
+               SUM(r.tax_amount) as tax_amount, SUM(r.grand_total) as grand_total
+        FROM report_customer r
+        JOIN customers c ON c.id = r.customer_id
+        WHERE r.status IN ({', '.join(['%s'] * len(OUTSTANDING_STATUSES))})
+        GROUP BY c.id, c.name
+        HAVING ROUND(SUM(r.grand_total), 2) > 0
+        ORDER BY SUM(r.grand_total) DESC
+        LIMIT %s
+    """
+    return _summary(db.fetch_all(query, (*OUTSTANDING_STATUSES, limit)))
+
+def quarter_start(day):
+    """First day of the quarter containing day"""
+    return date(day.year, 3 * ((day.month - 1) // 3) + 1, 1)
+
+def main(argv):
+    if argv != ['rebuild']:
+        print("Usage: python -m models.report rebuild")
+        return 2
+    db = Database()
+    if not db.initialize_database():
+        return 1
+    started = time.perf_counter()
+    if not rebuild(db):
+        print("Rebuild failed")
+        return 1
+    print(f"Rebuilt report tables in {time.perf_counter() - started:.1f}s")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
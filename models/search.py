@@ -0,0 +1,33 @@
+# models/search.py
+import re
+from database import get_backend
+
+# InnoDB ignores full-text tokens shorter than innodb_ft_min_token_size (default 3)
+MIN_TOKEN_SIZE = 3
+
+# Default maximum number of search results
+SEARCH_LIMIT = 100
+
+_WORD_RE = re.compile(r"\w+")
+
+def search_words(term):
+    """Split a search term into plain words, dropping full-text operators"""
+    return _WORD_RE.findall(term)
+
+def fulltext_query(term):
+    """Build a BOOLEAN MODE query requiring every word as a prefix
+
+    Returns None when the backend has no full-text index or any word is too
+    short for it, in which case callers fall back to an indexed prefix LIKE.
+    """
+    if not get_backend().supports_fulltext:
+        return None
+    words = search_words(term)
+    if not words or any(len(word) < MIN_TOKEN_SIZE for word in words):
+        return None
+    return " ".join(f"+{word}*" for word in words)
+
+def prefix_pattern(term):
+    """Build a LIKE pattern (used with ESCAPE '!') matching values that start with term"""
+    escaped = term.replace("!", "!!").replace("%", "!%").replace("_", "!_")
+    return f"{escaped}%"
@@ -0,0 +1,91 @@
+# models/sequence.py
+from database import Database
+import threading
+import logging
+
+class Sequence:
+    """Named counter handed out from blocks reserved in the sequences table"""
+
+    BLOCK_SIZE = 20
+
+    def __init__(self, name, block_size=BLOCK_SIZE, seed=None):
+        self.name = name
+        self.block_size = block_size
+        self.seed = seed            # Callable taking a session, returning the last value already in use
+        self._next = 0
+        self._limit = 0
+        self._pool = None           # Pool of the database the block was reserved in
+        self._lock = threading.Lock()
+
+    def next_value(self, db=None):
+        """Return the next value, reserving a new block when the local one runs out
+
+        db is the session to reserve through; a fresh one is used by default.
+        It must not have a transaction open.
+        """
+        db = db or Database()
+        with self._lock:
+            if db.pool is not self._pool:
+                # A block reserved in another database means nothing in this one
+                self._next = self._limit = 0
+                self._pool = db.pool
+            if self._next >= self._limit:
+                if not self._reserve_block(db):
+                    return None
+            value = self._next
+            self._next += 1
+            return value
+
+    def advance_past(self, value, db=None):
+        """Make sure no value up to value is handed out, e.g. after values were written without the sequence"""
+        db = db or Database()
+        with self._lock:
+            query = "INSERT IGNORE INTO sequences (name, next_value) VALUES (%s, %s)"
+            done = db.execute_query(query, (self.name, value + 1))
+            query = "UPDATE sequences SET next_value = %s WHERE name = %s AND next_value <= %s"
+            done = done and db.execute_query(query, (value + 1, self.name, value))
+            if db.pool is self._pool and self._next <= value:
+                # The local block overlaps those values, so the next call reserves a fresh one
+                self._next = self._limit = 0
+            if not done:
+                logging.error(f"Error advancing sequence {self.name}")
+            return done
+
+    def _reserve_block(self, db):
+        """Atomically advance the stored counter by one block"""
+        query = "SELECT next_value FROM sequences WHERE name = %s"
+        if db.fetch_one(query, (self.name,)) is None:
+            if not db.is_reachable():
+                return False
+            # First use of this name: start after any values already taken
+            start = (self.seed(db) if self.seed else 0) + 1
+            query = "INSERT IGNORE INTO sequences (name, next_value) VALUES (%s, %s)"
+            db.execute_query(query, (self.name, start))
+
+        if not db.begin():
+            return False
+
+        query = "UPDATE sequences SET next_value = next_value + %s WHERE name = %s"
+        if db.execute_query(query, (self.block_size, self.name)):
+            # The UPDATE holds the row lock, so this reads our own increment
+            query = "SELECT next_value FROM sequences WHERE name = %s"
+            result = db.fetch_one(query, (self.name,))
+            if result and db.commit():
+                self._limit = result['next_value']
+                self._next = self._limit - self.block_size
+                return True
+
+        db.rollback()
+        logging.error(f"Error reserving values for sequence {self.name}")
+        return False
+
+
+_sequences = {}
+_sequences_lock = threading.Lock()
+
+def get_sequence(name, seed=None):
+    """Return the process-wide sequence for a name"""
+    with _sequences_lock:
+        if name not in _sequences:
+            _sequences[name] = Sequence(name, seed=seed)
+        return _sequences[name]
@@ -1,45 +0,0 @@
--- schema.sql
--- Database creation
-CREATE DATABASE IF NOT EXISTS billing_app;
-USE billing_app;
-
--- Customer table
-CREATE TABLE IF NOT EXISTS customers (
-    id INT AUTO_INCREMENT PRIMARY KEY,
-    name VARCHAR(100) NOT NULL,
-    email VARCHAR(100),
-    phone VARCHAR(20),
-    address TEXT,
-    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-);
-
--- Bill table
-CREATE TABLE IF NOT EXISTS bills (
-    id INT AUTO_INCREMENT PRIMARY KEY,
-    bill_number VARCHAR(50) NOT NULL UNIQUE,
-    customer_id INT NOT NULL,
-    bill_date DATE NOT NULL,
-    due_date DATE NOT NULL,
-    total_amount DECIMAL(10, 2) NOT NULL DEFAULT 0.00,
-    tax_amount DECIMAL(10, 2) NOT NULL DEFAULT 0.00,
-    grand_total DECIMAL(10, 2) NOT NULL DEFAULT 0.00,
-    status ENUM('PENDING', 'PAID', 'OVERDUE') NOT NULL DEFAULT 'PENDING',
-    notes TEXT,
-    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-    FOREIGN KEY (customer_id) REFERENCES customers(id) ON DELETE CASCADE
-);
-
--- Bill items table
-CREATE TABLE IF NOT EXISTS bill_items (
-    id INT AUTO_INCREMENT PRIMARY KEY,
-    bill_id INT NOT NULL,
-    description VARCHAR(255) NOT NULL,
-    quantity DECIMAL(10, 2) NOT NULL DEFAULT 1.00,
-    unit_price DECIMAL(10, 2) NOT NULL DEFAULT 0.00,
-    amount DECIMAL(10, 2) NOT NULL DEFAULT 0.00,
-    FOREIGN KEY (bill_id) REFERENCES bills(id) ON DELETE CASCADE
-);
-
--- Index for better performance
-CREATE INDEX idx_customer_id ON bills(customer_id);
-CREATE INDEX idx_bill_id ON bill_items(bill_id);
\ No newline at end of file
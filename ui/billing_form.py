@@ -2,16 +2,46 @@
 from PySide6.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout, QFormLayout, QLabel,
     QLineEdit, QTextEdit, QPushButton, QMessageBox, QComboBox,
-    QDateEdit, QTableWidget, QTableWidgetItem, QHeaderView, QAbstractItemView
+    QDateEdit, QTableView, QHeaderView, QAbstractItemView, QCompleter,
+    QApplication, QFileDialog
 )
 from PySide6.QtCore import Qt, Signal, Slot, QDate
+from PySide6.QtGui import QKeySequence, QShortcut
 from models.bill import Bill
 from models.customer import Customer
+from models.money import parse_decimal
+from ui.workers import submit
+from ui.table_models import RecordListModel, BillItemsModel
+from ui.delegates import ButtonDelegate
+import csv
+import io
 import locale
 
 # Set locale for currency formatting
 locale.setlocale(locale.LC_ALL, '')
 
+def parse_item_lines(text):
+    """Parse pasted or imported item lines of description, quantity and unit price
+    
+    Fields are tab separated as copied from a spreadsheet, or comma separated
+    as in a CSV file. Returns the (description, quantity, unit_price) tuples
+    and the number of lines skipped as invalid, such as a header row.
+    """
+    delimiter = '\t' if '\t' in text else ','
+    lines = []
+    skipped = 0
+    for fields in csv.reader(io.StringIO(text), delimiter=delimiter):
+        if not any(field.strip() for field in fields):
+            continue
+        try:
+            description, quantity, unit_price = (field.strip() for field in fields[:3])
+            if not description:
+                raise ValueError("Missing description")
+            lines.append((description, parse_decimal(quantity), parse_decimal(unit_price)))
+        except ValueError:
+            skipped += 1
+    return lines, skipped
+
 class BillingForm(QWidget):
     """Form for creating and editing bills"""
     
@@ -21,6 +51,9 @@ class BillingForm(QWidget):
     def __init__(self):
         super().__init__()
         self.bill = None
+        self.customers_task = None
+        self.customers_version = None   # Customer cache version shown in the combo box
+        self.bill_task = None
         self.setup_ui()
         self.showEvent = self.refresh_customers_on_show 
     
@@ -43,11 +76,20 @@ class BillingForm(QWidget):
         # Bill number
         self.txt_bill_number = QLineEdit()
         self.txt_bill_number.setReadOnly(True)
+        self.txt_bill_number.setPlaceholderText("Assigned on save")
         left_form.addRow("Bill Number:", self.txt_bill_number)
         
-        # Customer selector
+        # Customer selector, searchable by typing any part of the name
+        self.customers_model = RecordListModel('name', self)
         self.cmb_customer = QComboBox()
-        self.load_customers()
+        self.cmb_customer.setModel(self.customers_model)
+        self.cmb_customer.setEditable(True)
+        self.cmb_customer.setInsertPolicy(QComboBox.NoInsert)
+        self.cmb_customer.view().setUniformItemSizes(True)
+        completer = QCompleter(self.customers_model, self.cmb_customer)
+        completer.setCaseSensitivity(Qt.CaseInsensitive)
+        completer.setFilterMode(Qt.MatchContains)
+        self.cmb_customer.setCompleter(completer)
         left_form.addRow("Customer:", self.cmb_customer)
         
         # Date fields
@@ -81,7 +123,8 @@ class BillingForm(QWidget):
         self.lbl_grand_total.setStyleSheet("font-weight: bold;")
         
         right_form.addRow("Total:", self.lbl_total)
-        right_form.addRow("Tax (10%):", self.lbl_tax)
+        self.lbl_tax_caption = QLabel("Tax:")
+        right_form.addRow(self.lbl_tax_caption, self.lbl_tax)
         right_form.addRow("Grand Total:", self.lbl_grand_total)
         
         # Add forms to main layout
@@ -96,18 +139,29 @@ class BillingForm(QWidget):
         items_label.setStyleSheet("font-size: 16px; font-weight: bold;")
         items_layout.addWidget(items_label)
         
-        # Line items table
-        self.table_items = QTableWidget()
-        self.table_items.setColumnCount(5)
-        self.table_items.setHorizontalHeaderLabels(["Description", "Quantity", "Unit Price", "Amount", ""])
-        self.table_items.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        # Line items table, edited in place; the delete buttons are painted by a delegate
+        self.items_model = BillItemsModel(self)
+        self.items_model.totals_changed.connect(self.update_totals)
+        self.table_items = QTableView()
+        self.table_items.setModel(self.items_model)
+        self.table_items.setEditTriggers(QAbstractItemView.DoubleClicked | QAbstractItemView.EditKeyPressed)
         self.table_items.verticalHeader().setVisible(False)
-        self.table_items.setSelectionBehavior(QTableWidget.SelectRows)
+        self.table_items.setSelectionBehavior(QAbstractItemView.SelectRows)
+        
+        self.delete_delegate = ButtonDelegate("Delete", self.table_items)
+        self.delete_delegate.clicked.connect(self.delete_item)
+        self.table_items.setItemDelegateForColumn(BillItemsModel.DELETE, self.delete_delegate)
         
         header = self.table_items.horizontalHeader()
         header.setSectionResizeMode(0, QHeaderView.Stretch)
         for i in range(1, 5):
             header.setSectionResizeMode(i, QHeaderView.ResizeToContents)
+        # Size columns from the visible rows only, not the whole bill
+        header.setResizeContentsPrecision(0)
+        
+        paste_shortcut = QShortcut(QKeySequence.Paste, self.table_items)
+        paste_shortcut.setContext(Qt.WidgetShortcut)
+        paste_shortcut.activated.connect(self.paste_items)
         
         items_layout.addWidget(self.table_items)
         
@@ -125,11 +179,15 @@ class BillingForm(QWidget):
         self.txt_unit_price.setMaximumWidth(100)
         
         self.btn_add_item = QPushButton("Add Item")
+        self.btn_paste_items = QPushButton("Paste Items")
+        self.btn_import_items = QPushButton("Import Items...")
         
         add_item_layout.addWidget(self.txt_description)
         add_item_layout.addWidget(self.txt_quantity)
         add_item_layout.addWidget(self.txt_unit_price)
         add_item_layout.addWidget(self.btn_add_item)
+        add_item_layout.addWidget(self.btn_paste_items)
+        add_item_layout.addWidget(self.btn_import_items)
         
         items_layout.addLayout(add_item_layout)
         layout.addLayout(items_layout)
@@ -147,9 +205,11 @@ class BillingForm(QWidget):
         
         # Action buttons
         btn_layout = QHBoxLayout()
+        self.lbl_status = QLabel()
         self.btn_save = QPushButton("Save Bill")
         self.btn_cancel = QPushButton("Cancel")
         
+        btn_layout.addWidget(self.lbl_status)
         btn_layout.addStretch()
         btn_layout.addWidget(self.btn_cancel)
         btn_layout.addWidget(self.btn_save)
@@ -161,15 +221,43 @@ class BillingForm(QWidget):
         self.btn_save.clicked.connect(self.save_bill)
         self.btn_cancel.clicked.connect(self.cancel)
         self.btn_add_item.clicked.connect(self.add_item)
+        self.btn_paste_items.clicked.connect(self.paste_items)
+        self.btn_import_items.clicked.connect(self.import_items)
     
     def load_customers(self):
-        """Load customers into combo box"""
-        self.cmb_customer.clear()
-        customers = Customer.get_all()
+        """Load customers into combo box in the background"""
+        if self.customers_task:
+            self.customers_task.cancel()
+        self.customers_task = submit(Customer.get_all_versioned, on_done=self.set_customers)
+    
+    def set_customers(self, result):
+        """Fill the combo box if the customer list changed, keeping the selected customer"""
+        self.customers_task = None
+        version, customers = result
+        if version == self.customers_version:
+            return
         
-        for customer in customers:
-            # Store customer ID as user data
-            self.cmb_customer.addItem(customer['name'], customer['id'])
+        selected = self.bill.customer_id if self.bill and self.bill.customer_id else self.cmb_customer.currentData()
+        # Customer ID is stored as user data
+        self.customers_model.set_rows(customers)
+        self.customers_version = version
+        self.select_customer(selected)
+    
+    def select_customer(self, customer_id):
+        """Select a customer in the combo box if it is listed"""
+        index = self.customers_model.row_of(customer_id)
+        if index >= 0:
+            self.cmb_customer.setCurrentIndex(index)
+    
+    def set_busy(self, message):
+        """Show a status message and block editing until the task completes"""
+        busy = bool(message)
+        self.lbl_status.setText(message)
+        self.btn_save.setEnabled(not busy)
+        self.btn_add_item.setEnabled(not busy)
+        self.btn_paste_items.setEnabled(not busy)
+        self.btn_import_items.setEnabled(not busy)
+        self.table_items.setEnabled(not busy)
 
 
     def refresh_customers_on_show(self, event):
@@ -180,69 +268,64 @@ class BillingForm(QWidget):
     
     def clear(self):
         """Clear the form"""
+        self.cancel_loading()
+        self.set_busy("")
         self.bill = Bill()
         self.txt_bill_number.setText(self.bill.bill_number)
         self.date_bill.setDate(QDate.currentDate())
         self.date_due.setDate(QDate.currentDate().addDays(30))
         self.cmb_status.setCurrentText("PENDING")
         self.txt_notes.clear()
-        self.clear_items_table()
-        self.update_totals()
+        self.items_model.set_bill(self.bill)
     
-    def load(self, bill_id):
-        """Load bill data into form"""
-        self.bill = Bill.get_by_id(bill_id)
-        if self.bill:
-            self.txt_bill_number.setText(self.bill.bill_number)
-            
-            # Set customer
-            index = self.cmb_customer.findData(self.bill.customer_id)
-            if index >= 0:
-                self.cmb_customer.setCurrentIndex(index)
-            
-            # Set dates
-            self.date_bill.setDate(QDate.fromString(str(self.bill.bill_date), "yyyy-MM-dd"))
-            self.date_due.setDate(QDate.fromString(str(self.bill.due_date), "yyyy-MM-dd"))
-            
-            # Set status
-            self.cmb_status.setCurrentText(self.bill.status)
-            
-            # Set notes
-            self.txt_notes.setText(self.bill.notes)
-            
-            # Load items
-            self.load_items()
-            
-            # Update totals
-            self.update_totals()
+    def cancel_loading(self):
+        """Cancel a bill load in flight"""
+        if self.bill_task:
+            self.bill_task.cancel()
+            self.bill_task = None
     
-    def clear_items_table(self):
-        """Clear items table"""
-        self.table_items.setRowCount(0)
-        if self.bill:
-            self.bill.items.clear()
+    def load(self, bill_id):
+        """Load bill data into form in the background"""
+        self.cancel_loading()
+        self.bill = None
+        self.items_model.set_bill(None)
+        self.set_busy("Loading...")
+        # Read past the cache: saving writes back whatever was loaded
+        self.bill_task = submit(Bill.get_by_id, bill_id, cached=False, on_done=self.show_bill,
+                                on_error=lambda message: self.show_bill(None))
     
-    def load_items(self):
-        """Load bill items into table"""
-        self.table_items.setRowCount(0)
-        
-        for index, item in enumerate(self.bill.items):
-            self.table_items.insertRow(index)
-            
-            self.table_items.setItem(index, 0, QTableWidgetItem(item.description))
-            self.table_items.setItem(index, 1, QTableWidgetItem(str(item.quantity)))
-            self.table_items.setItem(index, 2, QTableWidgetItem(f"{item.unit_price:.2f}"))
-            self.table_items.setItem(index, 3, QTableWidgetItem(f"{item.amount:.2f}"))
-            
-            # Delete button
-            btn_delete = QPushButton("Delete")
-            btn_delete.clicked.connect(lambda checked, row=index: self.delete_item(row))
-            self.table_items.setCellWidget(index, 4, btn_delete)
+    def show_bill(self, bill):
+        """Fill the form from a loaded bill"""
+        self.bill_task = None
+        self.bill = bill
+        if not self.bill:
+            self.set_busy("Failed to load bill.")
+            return
+        
+        self.set_busy("")
+        self.txt_bill_number.setText(self.bill.bill_number)
+        
+        # Set customer
+        self.select_customer(self.bill.customer_id)
+        
+        # Set dates
+        self.date_bill.setDate(QDate.fromString(str(self.bill.bill_date), "yyyy-MM-dd"))
+        self.date_due.setDate(QDate.fromString(str(self.bill.due_date), "yyyy-MM-dd"))
+        
+        # Set status
+        self.cmb_status.setCurrentText(self.bill.status)
+        
+        # Set notes
+        self.txt_notes.setText(self.bill.notes)
+        
+        # Load items; the model updates the totals
+        self.items_model.set_bill(self.bill)
     
     def update_totals(self):
         """Update totals display"""
         if self.bill:
             self.lbl_total.setText(f"{self.bill.total_amount:.2f}")
+            self.lbl_tax_caption.setText(f"Tax ({(self.bill.tax_rate * 100).normalize():f}%):")
             self.lbl_tax.setText(f"{self.bill.tax_amount:.2f}")
             self.lbl_grand_total.setText(f"{self.bill.grand_total:.2f}")
     
@@ -259,51 +342,60 @@ class BillingForm(QWidget):
             return
         
         try:
-            quantity = float(quantity_text)
+            quantity = parse_decimal(quantity_text)
         except ValueError:
             QMessageBox.warning(self, "Warning", "Please enter a valid quantity.")
             self.txt_quantity.setFocus()
             return
         
         try:
-            unit_price = float(unit_price_text)
+            unit_price = parse_decimal(unit_price_text)
         except ValueError:
             QMessageBox.warning(self, "Warning", "Please enter a valid unit price.")
             self.txt_unit_price.setFocus()
             return
         
-        # Add item to bill
-        item = self.bill.add_item(description, quantity, unit_price)
-        
-        # Add item to table
-        row = self.table_items.rowCount()
-        self.table_items.insertRow(row)
-        
-        self.table_items.setItem(row, 0, QTableWidgetItem(item.description))
-        self.table_items.setItem(row, 1, QTableWidgetItem(str(item.quantity)))
-        self.table_items.setItem(row, 2, QTableWidgetItem(f"{item.unit_price:.2f}"))
-        self.table_items.setItem(row, 3, QTableWidgetItem(f"{item.amount:.2f}"))
-        
-        # Delete button
-        btn_delete = QPushButton("Delete")
-        btn_delete.clicked.connect(lambda checked, r=row: self.delete_item(r))
-        self.table_items.setCellWidget(row, 4, btn_delete)
+        # Add item to bill and table
+        self.items_model.add_item(description, quantity, unit_price)
         
         # Clear inputs
         self.txt_description.clear()
         self.txt_quantity.clear()
         self.txt_unit_price.clear()
         self.txt_description.setFocus()
+    
+    def paste_items(self):
+        """Add item lines copied from a spreadsheet or text file"""
+        self.add_item_lines(QApplication.clipboard().text())
+    
+    def import_items(self):
+        """Add item lines from a CSV file"""
+        path, _ = QFileDialog.getOpenFileName(self, "Import Items", "", "CSV files (*.csv *.txt);;All files (*)")
+        if not path:
+            return
+        try:
+            with open(path, newline='', encoding='utf-8-sig') as f:
+                text = f.read()
+        except OSError as e:
+            QMessageBox.critical(self, "Error", f"Failed to read {path}: {e}")
+            return
+        self.add_item_lines(text)
+    
+    def add_item_lines(self, text):
+        """Add every valid line of text to the bill at once"""
+        lines, skipped = parse_item_lines(text)
+        if not lines:
+            QMessageBox.warning(self, "Warning", "No items found. Expected lines of description, quantity and unit price.")
+            return
         
-        # Update totals
-        self.update_totals()
+        self.items_model.add_items(lines)
+        self.table_items.scrollToBottom()
+        if skipped:
+            QMessageBox.information(self, "Items Added", f"Added {len(lines)} items; skipped {skipped} invalid lines.")
     
     def delete_item(self, row):
         """Delete item from bill"""
-        if 0 <= row < len(self.bill.items):
-            self.bill.remove_item(row)
-            self.load_items()  # Reload all items
-            self.update_totals()
+        self.items_model.remove_item(row)
     
     def save_bill(self):
         """Save bill data"""
@@ -324,7 +416,18 @@ class BillingForm(QWidget):
         self.bill.notes = self.txt_notes.toPlainText()
         
         # Save to database
-        if self.bill.save():
+        self.set_busy("Saving...")
+        submit(self.bill.save, on_done=self.on_saved, on_error=lambda message: self.on_saved(False))
+    
+    def on_saved(self, saved):
+        """Report the result of a save"""
+        self.set_busy("")
+        if saved and self.bill.queued:
+            QMessageBox.information(self, "Saved Offline",
+                                    "The database cannot be reached. The bill was kept on this computer "
+                                    "and will be saved when the connection is back.")
+            self.saved.emit()
+        elif saved:
             QMessageBox.information(self, "Success", "Bill saved successfully.")
             self.saved.emit()
         else:
@@ -332,7 +435,8 @@ class BillingForm(QWidget):
     
     def validate(self):
         """Validate form data"""
-        if self.cmb_customer.currentIndex() < 0:
+        index = self.cmb_customer.currentIndex()
+        if index < 0 or self.cmb_customer.currentText() != self.cmb_customer.itemText(index):
             QMessageBox.warning(self, "Warning", "Please select a customer.")
             return False
         
@@ -344,4 +448,5 @@ class BillingForm(QWidget):
     
     def cancel(self):
         """Cancel form"""
+        self.cancel_loading()
         self.saved.emit()
\ No newline at end of file
@@ -1,12 +1,17 @@
 # ui/bills_view.py
 from PySide6.QtWidgets import (
-    QWidget, QVBoxLayout, QHBoxLayout, QTableWidget, QTableWidgetItem,
-    QPushButton, QLineEdit, QLabel, QHeaderView, QMessageBox, QMenu
+    QWidget, QVBoxLayout, QHBoxLayout, QTableView, QAbstractItemView,
+    QPushButton, QLineEdit, QLabel, QHeaderView, QMessageBox, QMenu, QProgressBar
 )
-from PySide6.QtCore import Qt, Signal, Slot
+from PySide6.QtCore import Qt, Signal, Slot, QTimer
 from PySide6.QtGui import QAction, QIcon, QCursor
-from models.bill import Bill
+from models import events
+from models.bill import Bill, PAGE_SIZE
+from ui.events import model_events
+from ui.table_models import RecordTableModel
+from ui.workers import SearchController, submit
 import locale
+import threading
 
 # Set locale for currency formatting
 locale.setlocale(locale.LC_ALL, '')
@@ -17,8 +22,15 @@ class BillsView(QWidget):
     # Signal to edit a bill
     edit_bill_signal = Signal(int)
     
+    # Pause in typing before a search runs
+    SEARCH_DELAY_MS = 250
+    
     def __init__(self):
         super().__init__()
+        self._total = 0
+        self.count_task = None
+        self.exporter = None    # Export in progress
+        self.stale = True       # Whether the table needs a full reload when shown
         self.setup_ui()
     
     def setup_ui(self):
@@ -36,22 +48,35 @@ class BillsView(QWidget):
         self.txt_search.setPlaceholderText("Search bills...")
         self.btn_search = QPushButton("Search")
         self.btn_refresh = QPushButton("Refresh")
+        self.btn_export = QPushButton("Export...")
         
         search_layout.addWidget(self.txt_search)
         search_layout.addWidget(self.btn_search)
         search_layout.addWidget(self.btn_refresh)
+        search_layout.addWidget(self.btn_export)
         
         layout.addLayout(search_layout)
         
         # Bills table
-        self.table = QTableWidget()
-        self.table.setColumnCount(7)
-        self.table.setHorizontalHeaderLabels([
-            "ID", "Bill #", "Customer", "Date", "Due Date", "Total", "Status"
-        ])
-        self.table.setEditTriggers(QTableWidget.NoEditTriggers)
-        self.table.setSelectionBehavior(QTableWidget.SelectRows)
-        self.table.setSelectionMode(QTableWidget.SingleSelection)
+        self.model = RecordTableModel(
+            [
+                ("ID", 'id', None),
+                ("Bill #", 'bill_number', None),
+                ("Customer", 'customer_name', None),
+                ("Date", 'bill_date', None),
+                ("Due Date", 'due_date', None),
+                ("Total", 'grand_total', lambda value: f"{float(value):.2f}"),
+                ("Status", 'status', None),
+            ],
+            background=('status', {'PAID': Qt.green, 'OVERDUE': Qt.red, 'PENDING': Qt.yellow}),
+            parent=self,
+            hidden_fields=['customer_id']
+        )
+        self.table = QTableView()
+        self.table.setModel(self.model)
+        self.table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.table.setSelectionMode(QAbstractItemView.SingleSelection)
         self.table.verticalHeader().setVisible(False)
         
         header = self.table.horizontalHeader()
@@ -60,65 +85,213 @@ class BillsView(QWidget):
         
         layout.addWidget(self.table)
         
+        # Row count and export progress
+        status_layout = QHBoxLayout()
+        self.lbl_count = QLabel()
+        self.export_progress = QProgressBar()
+        self.export_progress.setFormat("Exporting %v of %m rows")
+        self.btn_cancel_export = QPushButton("Cancel Export")
+        self.export_progress.hide()
+        self.btn_cancel_export.hide()
+        
+        status_layout.addWidget(self.lbl_count)
+        status_layout.addStretch()
+        status_layout.addWidget(self.export_progress)
+        status_layout.addWidget(self.btn_cancel_export)
+        layout.addLayout(status_layout)
+        
+        # Search as you type, once typing pauses
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(self.SEARCH_DELAY_MS)
+        self.searcher = SearchController(Bill.iter_search, self)
+        
         # Connect signals
         self.btn_search.clicked.connect(self.search_bills)
         self.btn_refresh.clicked.connect(self.refresh)
+        self.btn_export.clicked.connect(self.export)
+        self.btn_cancel_export.clicked.connect(self.cancel_export)
         self.txt_search.returnPressed.connect(self.search_bills)
-        self.table.cellDoubleClicked.connect(self.on_row_double_clicked)
+        self.txt_search.textChanged.connect(lambda: self.search_timer.start())
+        self.search_timer.timeout.connect(self.search_bills)
+        self.searcher.rows.connect(self.on_search_rows)
+        self.searcher.finished.connect(self.update_count)
+        self.table.doubleClicked.connect(self.on_row_double_clicked)
         self.table.setContextMenuPolicy(Qt.CustomContextMenu)
         self.table.customContextMenuRequested.connect(self.show_context_menu)
-        
-        # Load bills
-        self.refresh()
+        self.model.rowsInserted.connect(self.update_count)
+        self.model.loading.connect(self.on_loading)
+        model_events().changed.connect(self.on_model_event)
     
     def refresh(self):
-        """Refresh bills table"""
-        self.load_bills(Bill.get_all())
+        """Refresh bills table, fetching pages in the background as the user scrolls"""
+        self.stale = False
+        self.searcher.cancel()
+        if self.count_task:
+            self.count_task.cancel()
+        self._total = 0
+        self.count_task = submit(Bill.count_estimate, on_done=self.set_total)
+        self.model.set_rows(fetcher=self.page_fetcher())
+    
+    def page_fetcher(self):
+        """Return a fetcher that walks all bills one page per call"""
+        cursor = None
+        
+        def fetch_page():
+            nonlocal cursor
+            bills = Bill.get_page(cursor)
+            if bills:
+                cursor = Bill.page_cursor(bills[-1])
+            return bills, len(bills) == PAGE_SIZE
+        
+        return fetch_page
+    
+    def on_model_event(self, event):
+        """Apply a bill or customer change to the loaded rows instead of reloading"""
+        if self.stale:
+            return
+        if isinstance(event, (events.BillCreated, events.BillUpdated)):
+            # Rows show the customer's name, so fetch the bill as it is listed
+            submit(Bill.get_row, event.id, on_done=lambda row: self.place_bill(event, row))
+            return
+        if isinstance(event, events.BillDeleted):
+            removed = self.model.remove_where('id', event.id)
+        elif isinstance(event, events.CustomerDeleted):
+            removed = self.model.remove_where('customer_id', event.id)
+        elif isinstance(event, events.CustomerUpdated):
+            removed = 0
+            self.model.update_where('customer_id', event.id, {'customer_name': event.row['name']})
+        else:
+            return
+        self._total = max(self._total - removed, 0)
+        self.update_count()
+        events.bus.count('refreshes_avoided')
+    
+    def place_bill(self, event, row):
+        """Show a created or updated bill where it sorts among the loaded rows"""
+        if row is None or self.stale:
+            return
+        if self.txt_search.text().strip():
+            # Searches are not re-run; a bill in the results is updated in place
+            self.model.update_where('id', row['id'], row)
+        else:
+            self.model.remove_where('id', row['id'])
+            position = self.sort_position(row)
+            if position is not None:
+                self.model.insert_row(position, row)
+            if isinstance(event, events.BillCreated):
+                self._total += 1
+        self.update_count()
+        events.bus.count('refreshes_avoided')
+    
+    def sort_position(self, row):
+        """Row at which a bill sorts among the loaded bills, newest first
+        
+        Returns None when it sorts after them and more pages remain, as
+        paging will bring it in.
+        """
+        key = (str(row['bill_date']), row['id'])
+        for position in range(self.model.loaded_count()):
+            if (str(self.model.value(position, 'bill_date')), self.model.value(position, 'id')) < key:
+                return position
+        return None if self.model.has_more() else self.model.loaded_count()
+    
+    def set_total(self, total):
+        """Set the estimated number of bills"""
+        self.count_task = None
+        self._total = total
+        self.update_count()
+    
+    def on_loading(self, loading):
+        """Show a loading indicator while a page is being fetched"""
+        if loading:
+            self.lbl_count.setText("Loading...")
+        else:
+            self.update_count()
+    
+    def update_count(self):
+        """Update the row count label"""
+        rows = self.model.rowCount()
+        self.lbl_count.setText(f"Showing {rows} of about {max(self._total, rows)} bills")
     
     def search_bills(self):
-        """Search bills"""
+        """Search bills in the background, streaming results into the table"""
+        self.search_timer.stop()
         search_term = self.txt_search.text().strip()
         if search_term:
-            results = Bill.search(search_term)
-            self.load_bills(results)
+            self.load_bills([])
+            self.searcher.search(search_term)
+            self.lbl_count.setText("Searching...")
         else:
             self.refresh()
     
+    def on_search_rows(self, bills):
+        """Append a chunk of search results"""
+        self._total += len(bills)
+        self.model.append_rows(bills)
+    
     def load_bills(self, bills):
         """Load bills into table"""
-        self.table.setRowCount(0)
-        
-        for row, bill in enumerate(bills):
-            self.table.insertRow(row)
-            self.table.setItem(row, 0, QTableWidgetItem(str(bill['id'])))
-            self.table.setItem(row, 1, QTableWidgetItem(bill['bill_number']))
-            self.table.setItem(row, 2, QTableWidgetItem(bill['customer_name']))
-            self.table.setItem(row, 3, QTableWidgetItem(str(bill['bill_date'])))
-            self.table.setItem(row, 4, QTableWidgetItem(str(bill['due_date'])))
-            self.table.setItem(row, 5, QTableWidgetItem(f"{float(bill['grand_total']):.2f}"))
-            
-            status_item = QTableWidgetItem(bill['status'])
-            if bill['status'] == 'PAID':
-                status_item.setBackground(Qt.green)
-            elif bill['status'] == 'OVERDUE':
-                status_item.setBackground(Qt.red)
-            else:  # PENDING
-                status_item.setBackground(Qt.yellow)
-            
-            self.table.setItem(row, 6, status_item)
+        self._total = len(bills)
+        self.model.set_rows(bills)
+        self.update_count()
+    
+    def export(self):
+        """Ask for export options and run the export in the background"""
+        # Imported here: the exporter loads pyarrow, which would slow down startup
+        from ui.export_dialog import ExportDialog
+        exporter = ExportDialog.get_exporter(self)
+        if exporter is None:
+            return
+        
+        self.exporter = exporter
+        self.btn_export.setEnabled(False)
+        self.export_progress.setRange(0, 0)     # Busy until the row count is known
+        self.export_progress.show()
+        self.btn_cancel_export.show()
+        submit(exporter.run, on_done=self.on_exported, on_progress=self.on_export_progress,
+               on_error=lambda message: self.on_exported(None, message))
+    
+    def on_export_progress(self, stats):
+        """Show the rows written so far"""
+        self.export_progress.setRange(0, max(stats['total'], stats['rows']))
+        self.export_progress.setValue(stats['rows'])
     
-    def on_row_double_clicked(self, row, column):
+    def cancel_export(self):
+        """Stop the export in progress; its partial file is removed"""
+        if self.exporter:
+            # Cancelling may kill the query on the server, so keep it off the GUI thread;
+            # not on db_executor: it would queue behind the export it is meant to stop
+            threading.Thread(target=self.exporter.cancel, daemon=True).start()
+    
+    def on_exported(self, stats, message=None):
+        """Report the result of an export"""
+        cancelled = self.exporter.cancelled
+        self.exporter = None
+        self.btn_export.setEnabled(True)
+        self.export_progress.hide()
+        self.btn_cancel_export.hide()
+        
+        if stats and stats['complete']:
+            QMessageBox.information(
+                self, "Export Complete",
+                f"Exported {stats['rows']} rows to {stats['path']} in {stats['seconds']:.1f}s."
+            )
+        elif not cancelled:
+            QMessageBox.critical(self, "Error", f"Export failed. {message or ''}".strip())
+    
+    def on_row_double_clicked(self, index):
         """Handle row double click"""
-        bill_id = int(self.table.item(row, 0).text())
+        bill_id = self.model.value(index.row(), 'id')
         self.edit_bill_signal.emit(bill_id)
     
     def show_context_menu(self, position):
         """Show context menu"""
-        row = self.table.currentRow()
+        row = self.table.currentIndex().row()
         if row < 0:
             return
         
-        bill_id = int(self.table.item(row, 0).text())
+        bill_id = self.model.value(row, 'id')
         
         menu = QMenu(self)
         edit_action = menu.addAction("Edit")
@@ -141,9 +314,15 @@ class BillsView(QWidget):
         )
         
         if reply == QMessageBox.Yes:
-            bill = Bill.get_by_id(bill_id)
-            if bill and bill.delete():
-                QMessageBox.information(self, "Success", "Bill deleted successfully.")
-                self.refresh()
-            else:
-                QMessageBox.critical(self, "Error", "Failed to delete bill.")
\ No newline at end of file
+            def delete():
+                bill = Bill.get_by_id(bill_id)
+                return bool(bill and bill.delete())
+            
+            submit(delete, on_done=self.on_deleted, on_error=lambda message: self.on_deleted(False))
+    
+    def on_deleted(self, deleted):
+        """Report the result of a delete"""
+        if deleted:
+            QMessageBox.information(self, "Success", "Bill deleted successfully.")
+        else:
+            QMessageBox.critical(self, "Error", "Failed to delete bill.")
\ No newline at end of file
@@ -5,6 +5,7 @@ from PySide6.QtWidgets import (
 )
 from PySide6.QtCore import Qt, Signal, Slot
 from models.customer import Customer
+from ui.workers import submit
 
 class CustomerForm(QWidget):
     """Customer form for adding/editing customers"""
@@ -15,6 +16,7 @@ class CustomerForm(QWidget):
     def __init__(self):
         super().__init__()
         self.customer = None
+        self.load_task = None
         self.setup_ui()
     
     def setup_ui(self):
@@ -48,9 +50,11 @@ class CustomerForm(QWidget):
         
         # Buttons
         btn_layout = QHBoxLayout()
+        self.lbl_status = QLabel()
         self.btn_save = QPushButton("Save")
         self.btn_cancel = QPushButton("Cancel")
         
+        btn_layout.addWidget(self.lbl_status)
         btn_layout.addStretch()
         btn_layout.addWidget(self.btn_cancel)
         btn_layout.addWidget(self.btn_save)
@@ -62,8 +66,21 @@ class CustomerForm(QWidget):
         self.btn_save.clicked.connect(self.save_customer)
         self.btn_cancel.clicked.connect(self.cancel)
     
+    def set_busy(self, message):
+        """Show a status message and block saving until the task completes"""
+        self.lbl_status.setText(message)
+        self.btn_save.setEnabled(not message)
+    
+    def cancel_loading(self):
+        """Cancel a customer load in flight"""
+        if self.load_task:
+            self.load_task.cancel()
+            self.load_task = None
+    
     def clear(self):
         """Clear the form"""
+        self.cancel_loading()
+        self.set_busy("")
         self.customer = Customer()
         self.txt_name.setText("")
         self.txt_email.setText("")
@@ -71,13 +88,27 @@ class CustomerForm(QWidget):
         self.txt_address.setText("")
     
     def load(self, customer_id):
-        """Load customer data into form"""
-        self.customer = Customer.get_by_id(customer_id)
-        if self.customer:
-            self.txt_name.setText(self.customer.name)
-            self.txt_email.setText(self.customer.email)
-            self.txt_phone.setText(self.customer.phone)
-            self.txt_address.setText(self.customer.address)
+        """Load customer data into form in the background"""
+        self.cancel_loading()
+        self.customer = None
+        self.set_busy("Loading...")
+        # Read past the cache: saving writes back whatever was loaded
+        self.load_task = submit(Customer.get_by_id, customer_id, cached=False, on_done=self.show_customer,
+                                on_error=lambda message: self.show_customer(None))
+    
+    def show_customer(self, customer):
+        """Fill the form from a loaded customer"""
+        self.load_task = None
+        self.customer = customer
+        if not self.customer:
+            self.set_busy("Failed to load customer.")
+            return
+        
+        self.set_busy("")
+        self.txt_name.setText(self.customer.name)
+        self.txt_email.setText(self.customer.email)
+        self.txt_phone.setText(self.customer.phone)
+        self.txt_address.setText(self.customer.address)
     
     def save_customer(self):
         """Save customer data"""
@@ -94,7 +125,18 @@ class CustomerForm(QWidget):
         self.customer.address = self.txt_address.toPlainText()
         
         # Save to database
-        if self.customer.save():
+        self.set_busy("Saving...")
+        submit(self.customer.save, on_done=self.on_saved, on_error=lambda message: self.on_saved(False))
+    
+    def on_saved(self, saved):
+        """Report the result of a save"""
+        self.set_busy("")
+        if saved and self.customer.queued:
+            QMessageBox.information(self, "Saved Offline",
+                                    "The database cannot be reached. The customer was kept on this computer "
+                                    "and will be saved when the connection is back.")
+            self.saved.emit()
+        elif saved:
             QMessageBox.information(self, "Success", "Customer saved successfully.")
             self.saved.emit()
         else:
@@ -110,4 +152,5 @@ class CustomerForm(QWidget):
     
     def cancel(self):
         """Cancel form"""
+        self.cancel_loading()
         self.saved.emit()
\ No newline at end of file
@@ -1,11 +1,15 @@
 # ui/customers_view.py
 from PySide6.QtWidgets import (
-    QWidget, QVBoxLayout, QHBoxLayout, QTableWidget, QTableWidgetItem,
+    QWidget, QVBoxLayout, QHBoxLayout, QTableView, QAbstractItemView,
     QPushButton, QLineEdit, QLabel, QHeaderView, QMessageBox, QMenu
 )
-from PySide6.QtCore import Qt, Signal, Slot
+from PySide6.QtCore import Qt, Signal, Slot, QTimer
 from PySide6.QtGui import QAction, QIcon, QCursor
+from models import events
 from models.customer import Customer
+from ui.events import model_events
+from ui.table_models import RecordTableModel
+from ui.workers import SearchController, submit
 
 class CustomersView(QWidget):
     """View to display and manage customers"""
@@ -13,8 +17,14 @@ class CustomersView(QWidget):
     # Signal to edit a customer
     edit_customer_signal = Signal(int)
     
+    # Pause in typing before a search runs
+    SEARCH_DELAY_MS = 250
+    
     def __init__(self):
         super().__init__()
+        self.load_task = None
+        self.version = None     # Customer cache version shown in the table
+        self.stale = True       # Whether the table needs a full reload when shown
         self.setup_ui()
     
 # ui/customers_view.py (continued)
@@ -41,65 +51,137 @@ class CustomersView(QWidget):
         layout.addLayout(search_layout)
         
         # Customers table
-        self.table = QTableWidget()
-        self.table.setColumnCount(5)
-        self.table.setHorizontalHeaderLabels(["ID", "Name", "Email", "Phone", "Address"])
-        self.table.setEditTriggers(QTableWidget.NoEditTriggers)
-        self.table.setSelectionBehavior(QTableWidget.SelectRows)
-        self.table.setSelectionMode(QTableWidget.SingleSelection)
+        self.model = RecordTableModel(
+            [
+                ("ID", 'id', None),
+                ("Name", 'name', None),
+                ("Email", 'email', None),
+                ("Phone", 'phone', None),
+                ("Address", 'address', None),
+            ],
+            parent=self
+        )
+        self.table = QTableView()
+        self.table.setModel(self.model)
+        self.table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.table.setSelectionMode(QAbstractItemView.SingleSelection)
         self.table.verticalHeader().setVisible(False)
         self.table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
         
         layout.addWidget(self.table)
         
+        # Loading indicator
+        self.lbl_status = QLabel()
+        layout.addWidget(self.lbl_status)
+        
+        # Search as you type, once typing pauses
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(self.SEARCH_DELAY_MS)
+        self.searcher = SearchController(Customer.iter_search, self)
+        
         # Connect signals
         self.btn_search.clicked.connect(self.search_customers)
-        self.btn_refresh.clicked.connect(self.refresh)
+        self.btn_refresh.clicked.connect(lambda: self.refresh(force=True))
         self.txt_search.returnPressed.connect(self.search_customers)
-        self.table.cellDoubleClicked.connect(self.on_row_double_clicked)
+        self.txt_search.textChanged.connect(lambda: self.search_timer.start())
+        self.search_timer.timeout.connect(self.search_customers)
+        self.searcher.rows.connect(self.on_search_rows)
+        self.searcher.finished.connect(self.lbl_status.clear)
+        self.table.doubleClicked.connect(self.on_row_double_clicked)
         self.table.setContextMenuPolicy(Qt.CustomContextMenu)
         self.table.customContextMenuRequested.connect(self.show_context_menu)
+        model_events().changed.connect(self.on_model_event)
+    
+    def refresh(self, force=False):
+        """Refresh customers table in the background
         
-        # Load customers
-        self.refresh()
+        The table is only re-rendered when the customer cache version changed,
+        unless force is set.
+        """
+        self.stale = False
+        self.cancel_loading()
+        if force:
+            self.version = None
+        self.lbl_status.setText("Loading...")
+        self.load_task = submit(Customer.get_all_versioned, force, on_done=self.on_loaded,
+                                on_error=lambda message: self.lbl_status.setText("Failed to load customers."))
+    
+    def on_loaded(self, result):
+        """Show the full customer list if it changed since it was last shown"""
+        version, customers = result
+        if version == self.version:
+            self.load_task = None
+            self.lbl_status.clear()
+            return
+        self.load_customers(customers)
+        self.version = version
+    
+    def on_model_event(self, event):
+        """Apply a customer change to the loaded rows instead of reloading"""
+        if self.stale or not isinstance(event, events.CustomerEvent):
+            return
+        if isinstance(event, events.CustomerDeleted):
+            self.model.remove_where('id', event.id)
+        elif self.txt_search.text().strip():
+            # Searches are not re-run; a customer in the results is updated in place
+            self.model.update_where('id', event.id, event.row)
+        else:
+            self.model.remove_where('id', event.id)
+            self.model.insert_row(self.sort_position(event.row), event.row)
+        events.bus.count('refreshes_avoided')
     
-    def refresh(self):
-        """Refresh customers table"""
-        self.load_customers(Customer.get_all())
+    def sort_position(self, row):
+        """Row at which a customer sorts by name among the loaded customers"""
+        name = (row['name'] or "").casefold()
+        for position in range(self.model.loaded_count()):
+            if (self.model.value(position, 'name') or "").casefold() > name:
+                return position
+        return self.model.loaded_count()
+    
+    def cancel_loading(self):
+        """Cancel the load or search in flight"""
+        self.searcher.cancel()
+        if self.load_task:
+            self.load_task.cancel()
+            self.load_task = None
     
     def search_customers(self):
-        """Search customers"""
+        """Search customers in the background, streaming results into the table"""
+        self.search_timer.stop()
         search_term = self.txt_search.text().strip()
         if search_term:
-            results = Customer.search(search_term)
-            self.load_customers(results)
+            self.cancel_loading()
+            self.load_customers([])
+            self.version = None
+            self.searcher.search(search_term)
+            self.lbl_status.setText("Searching...")
         else:
             self.refresh()
     
+    def on_search_rows(self, customers):
+        """Append a chunk of search results"""
+        self.model.append_rows(customers)
+    
     def load_customers(self, customers):
         """Load customers into table"""
-        self.table.setRowCount(0)
-        
-        for row, customer in enumerate(customers):
-            self.table.insertRow(row)
-            self.table.setItem(row, 0, QTableWidgetItem(str(customer['id'])))
-            self.table.setItem(row, 1, QTableWidgetItem(customer['name']))
-            self.table.setItem(row, 2, QTableWidgetItem(customer['email'] or ""))
-            self.table.setItem(row, 3, QTableWidgetItem(customer['phone'] or ""))
-            self.table.setItem(row, 4, QTableWidgetItem(customer['address'] or ""))
-    
-    def on_row_double_clicked(self, row, column):
+        self.load_task = None
+        self.lbl_status.clear()
+        self.model.set_rows(customers)
+    
+    def on_row_double_clicked(self, index):
         """Handle row double click"""
-        customer_id = int(self.table.item(row, 0).text())
+        customer_id = self.model.value(index.row(), 'id')
         self.edit_customer_signal.emit(customer_id)
     
     def show_context_menu(self, position):
         """Show context menu"""
-        row = self.table.currentRow()
+        row = self.table.currentIndex().row()
         if row < 0:
             return
         
-        customer_id = int(self.table.item(row, 0).text())
+        customer_id = self.model.value(row, 'id')
         
         menu = QMenu(self)
         edit_action = menu.addAction("Edit")
@@ -122,9 +204,15 @@ class CustomersView(QWidget):
         )
         
         if reply == QMessageBox.Yes:
-            customer = Customer.get_by_id(customer_id)
-            if customer and customer.delete():
-                QMessageBox.information(self, "Success", "Customer deleted successfully.")
-                self.refresh()
-            else:
-                QMessageBox.critical(self, "Error", "Failed to delete customer.")
\ No newline at end of file
+            def delete():
+                customer = Customer.get_by_id(customer_id)
+                return bool(customer and customer.delete())
+            
+            submit(delete, on_done=self.on_deleted, on_error=lambda message: self.on_deleted(False))
+    
+    def on_deleted(self, deleted):
+        """Report the result of a delete"""
+        if deleted:
+            QMessageBox.information(self, "Success", "Customer deleted successfully.")
+        else:
+            QMessageBox.critical(self, "Error", "Failed to delete customer.")
\ No newline at end of file
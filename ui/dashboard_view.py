@@ -0,0 +1,164 @@
+# ui/dashboard_view.py
+from PySide6.QtWidgets import (
+    QWidget, QVBoxLayout, QHBoxLayout, QFormLayout, QTableView, QAbstractItemView,
+    QPushButton, QLabel, QHeaderView, QComboBox
+)
+from PySide6.QtCore import Signal
+from datetime import date, timedelta
+from models import report
+from ui.table_models import RecordTableModel
+from ui.workers import submit
+
+def _money(value):
+    return f"{value:.2f}"
+
+def period_range(period, today=None):
+    """Get the (first, last) bill dates covered by a dashboard period"""
+    today = today or date.today()
+    if period == "This Month":
+        return today.replace(day=1), today
+    if period == "This Quarter":
+        return report.quarter_start(today), today
+    if period == "This Year":
+        return today.replace(month=1, day=1), today
+    if period == "Last 12 Months":
+        return (today.replace(day=1) - timedelta(days=335)).replace(day=1), today
+    return date(1900, 1, 1), date(9999, 12, 31)
+
+def load_dashboard(period):
+    """Read everything the dashboard shows from the summary tables"""
+    date_from, date_to = period_range(period)
+    return {
+        'totals': report.period_totals(date_from, date_to),
+        'months': report.monthly_totals(date_from, date_to),
+        'outstanding': report.outstanding_by_customer(),
+    }
+
+class DashboardView(QWidget):
+    """Revenue, tax and outstanding balances from the reporting summaries"""
+
+    # Signal to show a customer's record
+    edit_customer_signal = Signal(int)
+
+    PERIODS = ["This Month", "This Quarter", "This Year", "Last 12 Months", "All Time"]
+
+    def __init__(self):
+        super().__init__()
+        self.load_task = None
+        self.setup_ui()
+
+    def setup_ui(self):
+        """Setup the user interface"""
+        layout = QVBoxLayout(self)
+
+        # Title
+        title = QLabel("Dashboard")
+        title.setStyleSheet("font-size: 18px; font-weight: bold;")
+        layout.addWidget(title)
+
+        # Period selector
+        period_layout = QHBoxLayout()
+        self.cmb_period = QComboBox()
+        self.cmb_period.addItems(self.PERIODS)
+        self.cmb_period.setCurrentText("This Quarter")
+        self.btn_refresh = QPushButton("Refresh")
+        self.lbl_status = QLabel()
+
+        period_layout.addWidget(QLabel("Period:"))
+        period_layout.addWidget(self.cmb_period)
+        period_layout.addWidget(self.btn_refresh)
+        period_layout.addWidget(self.lbl_status)
+        period_layout.addStretch()
+        layout.addLayout(period_layout)
+
+        # Period totals
+        totals_form = QFormLayout()
+        self.totals_labels = {}
+        for key, caption in [
+            ('bills', "Bills:"),
+            ('revenue', "Revenue (before tax):"),
+            ('tax', "Tax:"),
+            ('paid', "Paid:"),
+            ('outstanding', "Outstanding:"),
+            ('overdue', "Overdue:"),
+        ]:
+            label = QLabel("0")
+            label.setStyleSheet("font-weight: bold;")
+            self.totals_labels[key] = label
+            totals_form.addRow(caption, label)
+        layout.addLayout(totals_form)
+
+        # Revenue by month and outstanding by customer
+        tables_layout = QHBoxLayout()
+        self.months_model = RecordTableModel(
+            [
+                ("Month", 'month', None),
+                ("Bills", 'bills', None),
+                ("Revenue", 'total_amount', _money),
+                ("Tax", 'tax_amount', _money),
+                ("Grand Total", 'grand_total', _money),
+            ],
+            parent=self
+        )
+        self.outstanding_model = RecordTableModel(
+            [
+                ("Customer", 'name', None),
+                ("Bills", 'bills', None),
+                ("Outstanding", 'grand_total', _money),
+            ],
+            parent=self
+        )
+        for caption, model in (("Revenue by Month", self.months_model),
+                               ("Outstanding by Customer (All Dates)", self.outstanding_model)):
+            table_layout = QVBoxLayout()
+            label = QLabel(caption)
+            label.setStyleSheet("font-size: 16px; font-weight: bold;")
+            table = QTableView()
+            table.setModel(model)
+            table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+            table.setSelectionBehavior(QAbstractItemView.SelectRows)
+            table.verticalHeader().setVisible(False)
+            table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+            table_layout.addWidget(label)
+            table_layout.addWidget(table)
+            tables_layout.addLayout(table_layout)
+            if model is self.outstanding_model:
+                self.outstanding_table = table
+        layout.addLayout(tables_layout)
+
+        # Connect signals
+        self.cmb_period.currentTextChanged.connect(self.refresh)
+        self.btn_refresh.clicked.connect(self.refresh)
+        self.outstanding_table.doubleClicked.connect(self.on_customer_double_clicked)
+
+    def refresh(self):
+        """Load the dashboard for the selected period in the background"""
+        if self.load_task:
+            self.load_task.cancel()
+        self.lbl_status.setText("Loading...")
+        self.load_task = submit(load_dashboard, self.cmb_period.currentText(), on_done=self.show_dashboard,
+                                on_error=lambda message: self.lbl_status.setText("Failed to load reports."))
+
+    def show_dashboard(self, data):
+        """Fill the dashboard from loaded report data"""
+        self.load_task = None
+        self.lbl_status.setText("")
+        totals = data['totals']
+
+        def total(statuses, field):
+            return sum((totals[status][field] for status in statuses if status in totals), 0)
+
+        all_statuses = ('PENDING', 'PAID', 'OVERDUE')
+        self.totals_labels['bills'].setText(str(total(all_statuses, 'bills')))
+        self.totals_labels['revenue'].setText(_money(total(all_statuses, 'total_amount')))
+        self.totals_labels['tax'].setText(_money(total(all_statuses, 'tax_amount')))
+        self.totals_labels['paid'].setText(_money(total(('PAID',), 'grand_total')))
+        self.totals_labels['outstanding'].setText(_money(total(report.OUTSTANDING_STATUSES, 'grand_total')))
+        self.totals_labels['overdue'].setText(_money(total(('OVERDUE',), 'grand_total')))
+
+        self.months_model.set_rows(data['months'])
+        self.outstanding_model.set_rows(data['outstanding'])
+
+    def on_customer_double_clicked(self, index):
+        """Open the customer of a row"""
+        self.edit_customer_signal.emit(self.outstanding_model.value(index.row(), 'id'))
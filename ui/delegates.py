@@ -0,0 +1,44 @@
+# ui/delegates.py
+from PySide6.QtCore import Qt, QEvent, QSize, Signal
+from PySide6.QtWidgets import QApplication, QStyle, QStyledItemDelegate, QStyleOptionButton
+
+class ButtonDelegate(QStyledItemDelegate):
+    """Draws a push button in every cell of a column and reports clicks by row
+
+    The buttons are only painted, so no widget or signal connection is
+    created per row and rows can be inserted or removed without rewiring.
+    """
+
+    # Emitted with the row whose button was clicked
+    clicked = Signal(int)
+
+    def __init__(self, text, parent=None):
+        super().__init__(parent)
+        self.text = text
+
+    def _button_option(self, option):
+        button = QStyleOptionButton()
+        button.rect = option.rect.adjusted(2, 2, -2, -2)
+        button.text = self.text
+        button.state = QStyle.State_Raised | (option.state & QStyle.State_Enabled)
+        return button
+
+    def _style(self, option):
+        return option.widget.style() if option.widget else QApplication.style()
+
+    def paint(self, painter, option, index):
+        self._style(option).drawControl(QStyle.CE_PushButton, self._button_option(option), painter, option.widget)
+
+    def sizeHint(self, option, index):
+        button = self._button_option(option)
+        text_size = option.fontMetrics.size(Qt.TextShowMnemonic, self.text)
+        return self._style(option).sizeFromContents(QStyle.CT_PushButton, button, text_size, option.widget) + QSize(4, 4)
+
+    def editorEvent(self, event, model, option, index):
+        """Emit clicked on a left button release inside the cell"""
+        if event.type() == QEvent.MouseButtonRelease and event.button() == Qt.LeftButton:
+            if option.rect.contains(event.position().toPoint()):
+                self.clicked.emit(index.row())
+            return True
+        # Keep presses from starting selection or editing in the button column
+        return event.type() in (QEvent.MouseButtonPress, QEvent.MouseButtonDblClick)
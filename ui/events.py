@@ -0,0 +1,22 @@
+# ui/events.py
+from PySide6.QtCore import QObject, Signal
+from models import events
+
+class ModelEvents(QObject):
+    """Re-emits model events as a Qt signal, delivered on the GUI thread
+
+    Models publish from database workers; connecting to changed queues each
+    event to the receiver's thread.
+    """
+
+    changed = Signal(object)
+
+_model_events = None
+
+def model_events():
+    """Return the process-wide bridge, subscribing it to the model bus on first use"""
+    global _model_events
+    if _model_events is None:
+        _model_events = ModelEvents()
+        events.bus.subscribe(events.ModelEvent, _model_events.changed.emit)
+    return _model_events
@@ -0,0 +1,114 @@
+# ui/export_dialog.py
+from PySide6.QtWidgets import (
+    QDialog, QVBoxLayout, QHBoxLayout, QFormLayout, QComboBox, QDateEdit,
+    QCheckBox, QLineEdit, QPushButton, QDialogButtonBox, QFileDialog, QMessageBox
+)
+from PySide6.QtCore import QDate
+import exporter
+
+class ExportDialog(QDialog):
+    """Dialog choosing what to export, with which filters and to which file"""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Export")
+        self._exporter = None
+        self.setup_ui()
+
+    def setup_ui(self):
+        """Setup the user interface"""
+        layout = QVBoxLayout(self)
+        form = QFormLayout()
+
+        self.cmb_dataset = QComboBox()
+        self.cmb_dataset.addItems(list(exporter.DATASETS))
+        form.addRow("Export:", self.cmb_dataset)
+
+        # Bill date range, off by default
+        self.chk_dates = QCheckBox("Bill date from")
+        self.date_from = QDateEdit(QDate.currentDate().addMonths(-1))
+        self.date_to = QDateEdit(QDate.currentDate())
+        for date_edit in (self.date_from, self.date_to):
+            date_edit.setCalendarPopup(True)
+            date_edit.setEnabled(False)
+        dates_layout = QHBoxLayout()
+        dates_layout.addWidget(self.date_from)
+        dates_layout.addWidget(self.date_to)
+        form.addRow(self.chk_dates, dates_layout)
+
+        self.cmb_status = QComboBox()
+        self.cmb_status.addItems(["All", "PENDING", "PAID", "OVERDUE"])
+        form.addRow("Status:", self.cmb_status)
+
+        # Output file
+        self.txt_path = QLineEdit()
+        self.btn_browse = QPushButton("Browse...")
+        path_layout = QHBoxLayout()
+        path_layout.addWidget(self.txt_path)
+        path_layout.addWidget(self.btn_browse)
+        form.addRow("File:", path_layout)
+
+        layout.addLayout(form)
+
+        buttons = QDialogButtonBox(QDialogButtonBox.Ok | QDialogButtonBox.Cancel)
+        layout.addWidget(buttons)
+
+        # Connect signals
+        self.chk_dates.toggled.connect(self.date_from.setEnabled)
+        self.chk_dates.toggled.connect(self.date_to.setEnabled)
+        self.cmb_dataset.currentTextChanged.connect(self.on_dataset_changed)
+        self.btn_browse.clicked.connect(self.browse)
+        buttons.accepted.connect(self.accept)
+        buttons.rejected.connect(self.reject)
+
+    def on_dataset_changed(self, dataset):
+        """Filters only apply to bills and items"""
+        filtered = dataset != 'customers'
+        self.chk_dates.setEnabled(filtered)
+        self.cmb_status.setEnabled(filtered)
+
+    def browse(self):
+        """Choose the output file"""
+        filters = ["CSV files (*.csv)"]
+        if exporter.pyarrow is not None:
+            filters += ["Parquet files (*.parquet)", "Arrow files (*.arrow)"]
+        path, _ = QFileDialog.getSaveFileName(
+            self, "Export", f"{self.cmb_dataset.currentText()}.csv", ";;".join(filters)
+        )
+        if path:
+            self.txt_path.setText(path)
+
+    def create_exporter(self):
+        """Create the Exporter for the chosen options, or None if they are invalid"""
+        path = self.txt_path.text().strip()
+        if not path:
+            QMessageBox.warning(self, "Warning", "Please choose a file to export to.")
+            return None
+
+        date_from = date_to = None
+        if self.chk_dates.isChecked():
+            date_from = self.date_from.date().toString("yyyy-MM-dd")
+            date_to = self.date_to.date().toString("yyyy-MM-dd")
+        status = self.cmb_status.currentText()
+        try:
+            return exporter.Exporter(
+                self.cmb_dataset.currentText(), path, date_from, date_to,
+                None if status == "All" else status
+            )
+        except ValueError as e:
+            QMessageBox.warning(self, "Warning", str(e))
+            return None
+
+    def accept(self):
+        """Close only once the options are valid"""
+        self._exporter = self.create_exporter()
+        if self._exporter is not None:
+            super().accept()
+
+    @staticmethod
+    def get_exporter(parent=None):
+        """Show the dialog and return the configured Exporter, or None if cancelled"""
+        dialog = ExportDialog(parent)
+        if dialog.exec() == QDialog.Accepted:
+            return dialog._exporter
+        return None
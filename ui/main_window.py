@@ -3,27 +3,52 @@ from PySide6.QtWidgets import (
     QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, QPushButton,
     QStackedWidget, QLabel, QMessageBox, QSplitter, QFrame
 )
-from PySide6.QtCore import Qt, Slot, Signal
+from PySide6.QtCore import Qt, Slot, Signal, QTimer
 from PySide6.QtGui import QIcon, QFont, QAction
 
 from ui.customer_form import CustomerForm
 from ui.billing_form import BillingForm
 from ui.customers_view import CustomersView
 from ui.bills_view import BillsView
+from ui.dashboard_view import DashboardView
+from ui.workers import submit
 from database import Database
+from models import journal, overdue
 
 class MainWindow(QMainWindow):
     """Main application window"""
     
+    # Time between overdue sweeps
+    OVERDUE_SWEEP_INTERVAL_MS = 60 * 60 * 1000
+    
+    # Time between replays of writes queued while the database was unreachable
+    JOURNAL_REPLAY_INTERVAL_MS = 30 * 1000
+    
     def __init__(self):
         super().__init__()
-        
-        # Initialize database
-        self.db = Database()
-        self.db.initialize_database()
+        self.sweep_task = None
+        self.replay_task = None
+        self.open_task = None
+        self.ready = False  # Whether the schema is up to date
+        self.pages = {}     # Pages by class, created on first navigation
         
         # Setup UI
         self.setup_ui()
+        
+        # Mark past-due bills overdue periodically, once the database is ready
+        self.sweep_timer = QTimer(self)
+        self.sweep_timer.setInterval(self.OVERDUE_SWEEP_INTERVAL_MS)
+        self.sweep_timer.timeout.connect(self.sweep_overdue)
+        
+        # Send writes queued offline once the database is reachable again
+        self.replay_timer = QTimer(self)
+        self.replay_timer.setInterval(self.JOURNAL_REPLAY_INTERVAL_MS)
+        self.replay_timer.timeout.connect(self.replay_journal)
+        
+        # Keep trying to open a database that was unreachable at startup
+        self.open_timer = QTimer(self)
+        self.open_timer.setInterval(self.JOURNAL_REPLAY_INTERVAL_MS)
+        self.open_timer.timeout.connect(self.open_database)
     
     def setup_ui(self):
         """Setup the user interface"""
@@ -59,6 +84,9 @@ class MainWindow(QMainWindow):
         self.btn_new_bill = QPushButton("New Bill")
         self.btn_new_bill.setMinimumHeight(40)
         
+        self.btn_dashboard = QPushButton("Dashboard")
+        self.btn_dashboard.setMinimumHeight(40)
+        
         # Add navigation buttons to sidebar
         sidebar_layout.addWidget(app_title)
         sidebar_layout.addWidget(QLabel("Customers"))
@@ -68,75 +96,198 @@ class MainWindow(QMainWindow):
         sidebar_layout.addWidget(QLabel("Bills"))
         sidebar_layout.addWidget(self.btn_bills)
         sidebar_layout.addWidget(self.btn_new_bill)
+        sidebar_layout.addSpacing(20)
+        sidebar_layout.addWidget(QLabel("Reports"))
+        sidebar_layout.addWidget(self.btn_dashboard)
         sidebar_layout.addStretch()
         
-        # Create stacked widget for different screens
-        self.stacked_widget = QStackedWidget()
+        # Writes waiting in the offline journal
+        self.lbl_sync = QLabel("")
+        self.lbl_sync.setWordWrap(True)
+        sidebar_layout.addWidget(self.lbl_sync)
         
-        # Create pages
-        self.customers_view = CustomersView()
-        self.bills_view = BillsView()
-        self.customer_form = CustomerForm()
-        self.billing_form = BillingForm()
-        
-        # Add pages to stacked widget
-        self.stacked_widget.addWidget(self.customers_view)
-        self.stacked_widget.addWidget(self.bills_view)
-        self.stacked_widget.addWidget(self.customer_form)
-        self.stacked_widget.addWidget(self.billing_form)
+        # Create stacked widget for different screens; pages are added as
+        # they are first shown, after a placeholder while the database opens
+        self.stacked_widget = QStackedWidget()
+        self.lbl_starting = QLabel("Opening database...")
+        self.lbl_starting.setAlignment(Qt.AlignCenter)
+        self.stacked_widget.addWidget(self.lbl_starting)
         
         # Add widgets to main layout
         main_layout.addWidget(sidebar)
         main_layout.addWidget(self.stacked_widget)
         
+        # Navigation is enabled once the database is ready
+        self.sidebar = sidebar
+        self.sidebar.setEnabled(False)
+        
         # Connect signals/slots
         self.btn_customers.clicked.connect(self.show_customers)
         self.btn_new_customer.clicked.connect(self.new_customer)
         self.btn_bills.clicked.connect(self.show_bills)
         self.btn_new_bill.clicked.connect(self.new_bill)
-        
-        self.customers_view.edit_customer_signal.connect(self.edit_customer)
-        self.bills_view.edit_bill_signal.connect(self.edit_bill)
+        self.btn_dashboard.clicked.connect(self.show_dashboard)
+    
+    def page(self, page_class):
+        """Get the page of a class, creating it on first use"""
+        page = self.pages.get(page_class)
+        if page is None:
+            page = self.pages[page_class] = page_class()
+            self.stacked_widget.addWidget(page)
+            # Connected once here; the handlers below only navigate
+            if page_class in (CustomersView, DashboardView):
+                page.edit_customer_signal.connect(self.edit_customer)
+            elif page_class is BillsView:
+                page.edit_bill_signal.connect(self.edit_bill)
+            elif page_class is CustomerForm:
+                page.saved.connect(self.show_customers)
+                page.saved.connect(self.replay_journal)
+            elif page_class is BillingForm:
+                page.saved.connect(self.show_bills)
+                page.saved.connect(self.replay_journal)
+        return page
+    
+    @property
+    def customers_view(self):
+        return self.page(CustomersView)
+    
+    @property
+    def bills_view(self):
+        return self.page(BillsView)
+    
+    @property
+    def customer_form(self):
+        return self.page(CustomerForm)
+    
+    @property
+    def billing_form(self):
+        return self.page(BillingForm)
+    
+    @property
+    def dashboard_view(self):
+        return self.page(DashboardView)
+    
+    @Slot()
+    def open_database(self):
+        """Bring the schema up to date off the GUI thread, so the window paints first"""
+        if self.open_task is None:
+            self.open_task = submit(Database().initialize_database, on_done=self.on_database_ready,
+                                    on_error=lambda message: self.on_database_ready(False))
+    
+    @Slot(bool)
+    def on_database_ready(self, ok):
+        """Load the first page and start background jobs once the schema is up to date"""
+        self.open_task = None
+        if not ok:
+            if Database().is_reachable():
+                self.lbl_starting.setText("Could not open the database. See app.log for details.")
+                self.open_timer.stop()
+            elif not self.open_timer.isActive():
+                # Customers and bills can still be entered; they wait in the
+                # offline journal until the database can be opened
+                self.lbl_starting.setText("The database cannot be reached. New customers and bills "
+                                          "are saved on this computer until it is back.")
+                self.sidebar.setEnabled(True)
+                self.open_timer.start()
+            return
+        self.open_timer.stop()
+        self.sidebar.setEnabled(True)
+        if self.ready:
+            return
+        self.ready = True
         
         # Show customers by default
         self.show_customers()
+        
+        # Mark past-due bills overdue now and then periodically
+        self.sweep_timer.start()
+        self.sweep_overdue()
+        
+        # Send anything queued while the database was unreachable
+        self.replay_timer.start()
+        self.replay_journal()
+    
+    @Slot()
+    def sweep_overdue(self):
+        """Run the overdue sweep in the background unless one is running"""
+        if self.sweep_task is None:
+            self.sweep_task = submit(overdue.sweep, on_done=self.on_swept,
+                                     on_error=lambda message: self.on_swept(None))
+    
+    def on_swept(self, stats):
+        """Show bills whose status changed"""
+        self.sweep_task = None
+        if stats and stats['updated']:
+            bills_view = self.pages.get(BillsView)
+            if bills_view is not None:
+                # Statuses changed in bulk, so the bills are reloaded when next shown
+                bills_view.stale = True
+            current = self.stacked_widget.currentWidget()
+            if current in (bills_view, self.pages.get(DashboardView)):
+                current.refresh()
+    
+    @Slot()
+    def replay_journal(self):
+        """Replay the offline journal in the background unless a replay is running"""
+        if not self.ready:
+            # Replayed once the schema is brought up to date; meanwhile show what waits
+            self.open_database()
+            submit(lambda: journal.get_journal().counts()[0], on_done=self.show_waiting)
+            return
+        if self.replay_task is None:
+            self.replay_task = submit(journal.replay, on_done=self.on_replayed,
+                                      on_error=lambda message: self.on_replayed(None))
+    
+    def on_replayed(self, stats):
+        """Show how many writes are still waiting; replayed saves update the views through model events"""
+        self.replay_task = None
+        if stats is not None:
+            self.show_waiting(stats['waiting'])
+    
+    def show_waiting(self, waiting):
+        """Show the number of writes waiting in the offline journal"""
+        self.lbl_sync.setText(f"{waiting} change{'s' if waiting != 1 else ''} waiting to be saved" if waiting else "")
     
     @Slot()
     def show_customers(self):
-        """Show customers view"""
-        self.customers_view.refresh()
+        """Show customers view, reloading it only if model events could not keep it current"""
+        if self.customers_view.stale:
+            self.customers_view.refresh()
         self.stacked_widget.setCurrentWidget(self.customers_view)
     
     @Slot()
     def new_customer(self):
         """Create new customer"""
         self.customer_form.clear()
-        self.customer_form.saved.connect(self.show_customers)
         self.stacked_widget.setCurrentWidget(self.customer_form)
     
     @Slot(int)
     def edit_customer(self, customer_id):
         """Edit existing customer"""
         self.customer_form.load(customer_id)
-        self.customer_form.saved.connect(self.show_customers)
         self.stacked_widget.setCurrentWidget(self.customer_form)
     
     @Slot()
     def show_bills(self):
-        """Show bills view"""
-        self.bills_view.refresh()
+        """Show bills view, reloading it only if model events could not keep it current"""
+        if self.bills_view.stale:
+            self.bills_view.refresh()
         self.stacked_widget.setCurrentWidget(self.bills_view)
     
     @Slot()
     def new_bill(self):
         """Create new bill"""
         self.billing_form.clear()
-        self.billing_form.saved.connect(self.show_bills)
         self.stacked_widget.setCurrentWidget(self.billing_form)
     
     @Slot(int)
     def edit_bill(self, bill_id):
         """Edit existing bill"""
         self.billing_form.load(bill_id)
-        self.billing_form.saved.connect(self.show_bills)
-        self.stacked_widget.setCurrentWidget(self.billing_form)
\ No newline at end of file
+        self.stacked_widget.setCurrentWidget(self.billing_form)
+    
+    @Slot()
+    def show_dashboard(self):
+        """Show reporting dashboard"""
+        self.dashboard_view.refresh()
+        self.stacked_widget.setCurrentWidget(self.dashboard_view)
\ No newline at end of file
@@ -0,0 +1,354 @@
+# ui/table_models.py
+from PySide6.QtCore import Qt, QAbstractTableModel, QAbstractListModel, QModelIndex, Signal
+from PySide6.QtGui import QColor
+from models.money import parse_decimal
+from ui.workers import submit
+
+class RecordTableModel(QAbstractTableModel):
+    """Read-only table model over database records kept in a column store
+
+    Records are stored as one list per field rather than one dict per row,
+    rows are exposed to the view in batches through canFetchMore/fetchMore,
+    and cell text is only formatted when the view asks for a visible cell.
+    Further pages are fetched on a database worker thread.
+    """
+
+    # Emitted with True when a page fetch starts and False when it ends
+    loading = Signal(bool)
+
+    # Rows exposed to the view per fetchMore call
+    BATCH_SIZE = 200
+
+    def __init__(self, columns, background=None, parent=None, hidden_fields=()):
+        """columns is a list of (header, field, formatter) tuples; formatter may be None.
+        background is an optional (field, {value: color}) pair for row colouring.
+        hidden_fields are kept for each record without a column of their own."""
+        super().__init__(parent)
+        self._columns = columns
+        self._fields = list(dict.fromkeys(['id'] + [field for _, field, _ in columns] + list(hidden_fields)))
+        self._background = background
+        self._store = {field: [] for field in self._fields}
+        self._loaded = 0        # Rows held in the column store
+        self._exposed = 0       # Rows reported to the view
+        self._fetcher = None    # Callable returning (rows, has_more) for the next page
+        self._fetch_task = None # Page fetch in flight
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self._exposed
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._columns)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return self._columns[section][0]
+        return None
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+
+        row = index.row()
+        if role == Qt.DisplayRole:
+            _, field, formatter = self._columns[index.column()]
+            value = self._store[field][row]
+            if formatter:
+                return formatter(value)
+            return "" if value is None else str(value)
+
+        if role == Qt.BackgroundRole and self._background:
+            field, colors = self._background
+            if self._columns[index.column()][1] == field:
+                color = colors.get(self._store[field][row])
+                return QColor(color) if color is not None else None
+        return None
+
+    def value(self, row, field):
+        """Get the raw value of a field for a row"""
+        return self._store[field][row]
+
+    def set_rows(self, rows=None, fetcher=None):
+        """Replace the contents with rows, optionally followed by pages from fetcher"""
+        self.beginResetModel()
+        self._cancel_fetch()
+        self._store = {field: [] for field in self._fields}
+        self._loaded = 0
+        self._exposed = 0
+        self._fetcher = fetcher
+        if rows:
+            self._append(rows)
+        self._exposed = min(self._loaded, self.BATCH_SIZE)
+        self.endResetModel()
+        if not rows and fetcher:
+            self._pull()
+
+    def append_rows(self, rows):
+        """Add rows to the end of the table and show them immediately"""
+        if not rows:
+            return
+        self._append(rows)
+        self.beginInsertRows(QModelIndex(), self._exposed, self._loaded - 1)
+        self._exposed = self._loaded
+        self.endInsertRows()
+
+    def loaded_count(self):
+        """Number of records held, including those not yet shown"""
+        return self._loaded
+
+    def has_more(self):
+        """Whether further pages remain to be fetched"""
+        return self._fetcher is not None
+
+    def insert_row(self, position, row):
+        """Insert one record at a row position"""
+        for field, values in self._store.items():
+            values.insert(position, row.get(field))
+        self._loaded += 1
+        if position <= self._exposed:
+            self.beginInsertRows(QModelIndex(), position, position)
+            self._exposed += 1
+            self.endInsertRows()
+
+    def update_where(self, field, value, changes):
+        """Set the fields in changes on every loaded record whose field equals value
+
+        Only the changed rows are repainted. Returns the number of records updated.
+        """
+        rows = [row for row, current in enumerate(self._store[field]) if current == value]
+        for row in rows:
+            for name, new_value in changes.items():
+                if name in self._store:
+                    self._store[name][row] = new_value
+        shown = [row for row in rows if row < self._exposed]
+        if shown:
+            self.dataChanged.emit(self.index(shown[0], 0), self.index(shown[-1], len(self._columns) - 1))
+        return len(rows)
+
+    def remove_where(self, field, value):
+        """Remove every loaded record whose field equals value and return the count"""
+        rows = [row for row, current in enumerate(self._store[field]) if current == value]
+        for row in reversed(rows):
+            shown = row < self._exposed
+            if shown:
+                self.beginRemoveRows(QModelIndex(), row, row)
+            for values in self._store.values():
+                del values[row]
+            self._loaded -= 1
+            if shown:
+                self._exposed -= 1
+                self.endRemoveRows()
+        return len(rows)
+
+    def _append(self, rows):
+        """Add records to the column store"""
+        for field, values in self._store.items():
+            values.extend(row.get(field) for row in rows)
+        self._loaded += len(rows)
+
+    def _pull(self):
+        """Start fetching the next page from the fetcher in the background"""
+        self._fetch_task = submit(self._fetcher, on_done=self._on_page, on_error=self._on_page_failed)
+        self.loading.emit(True)
+
+    def _on_page(self, page):
+        """Add a fetched page and show it"""
+        rows, has_more = page
+        self._fetch_task = None
+        if not has_more:
+            self._fetcher = None
+        self.append_rows(rows)
+        self.loading.emit(False)
+
+    def _on_page_failed(self, message):
+        """Stop paging after a failed fetch"""
+        self._fetch_task = None
+        self._fetcher = None
+        self.loading.emit(False)
+
+    def _cancel_fetch(self):
+        """Drop the page fetch in flight, if any"""
+        if self._fetch_task is not None:
+            self._fetch_task.cancel()
+            self._fetch_task = None
+            self.loading.emit(False)
+
+    def canFetchMore(self, parent=QModelIndex()):
+        if parent.isValid():
+            return False
+        return self._exposed < self._loaded or self._fetcher is not None
+
+    def fetchMore(self, parent=QModelIndex()):
+        if parent.isValid():
+            return
+        if self._exposed == self._loaded:
+            if self._fetcher and self._fetch_task is None:
+                self._pull()
+            return
+
+        count = min(self.BATCH_SIZE, self._loaded - self._exposed)
+        if count <= 0:
+            return
+        self.beginInsertRows(QModelIndex(), self._exposed, self._exposed + count - 1)
+        self._exposed += count
+        self.endInsertRows()
+
+
+class RecordListModel(QAbstractListModel):
+    """Read-only list model showing one field of many records, for combo boxes
+
+    The display field and the id (returned for Qt.UserRole) are kept in two
+    plain lists, so very large lists stay cheap to build and to complete on.
+    """
+
+    def __init__(self, field, parent=None):
+        super().__init__(parent)
+        self._field = field
+        self._labels = []
+        self._ids = []
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._ids)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        if role in (Qt.DisplayRole, Qt.EditRole):
+            return self._labels[index.row()]
+        if role == Qt.UserRole:
+            return self._ids[index.row()]
+        return None
+
+    def set_rows(self, rows):
+        """Replace the contents with rows"""
+        self.beginResetModel()
+        self._labels = [row[self._field] for row in rows]
+        self._ids = [row['id'] for row in rows]
+        self.endResetModel()
+
+    def row_of(self, id):
+        """Get the row holding a record id, or -1"""
+        try:
+            return self._ids.index(id)
+        except ValueError:
+            return -1
+
+
+class BillItemsModel(QAbstractTableModel):
+    """Editable table model over the items of one bill
+
+    Every change goes through the Bill so its running totals stay current,
+    and the view is only told about the rows an insert, removal or edit
+    actually touched.
+    """
+
+    # Emitted after any change to the bill's items and totals
+    totals_changed = Signal()
+
+    HEADERS = ["Description", "Quantity", "Unit Price", "Amount", ""]
+    DESCRIPTION, QUANTITY, UNIT_PRICE, AMOUNT, DELETE = range(5)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._bill = None
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid() or self._bill is None:
+            return 0
+        return len(self._bill.items)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.HEADERS)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return self.HEADERS[section]
+        return None
+
+    def flags(self, index):
+        flags = super().flags(index)
+        if index.isValid() and index.column() in (self.DESCRIPTION, self.QUANTITY, self.UNIT_PRICE):
+            flags |= Qt.ItemIsEditable
+        return flags
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or role not in (Qt.DisplayRole, Qt.EditRole):
+            return None
+
+        item = self._bill.items[index.row()]
+        column = index.column()
+        if column == self.DESCRIPTION:
+            return item.description
+        if column == self.QUANTITY:
+            return str(item.quantity)
+        if column == self.UNIT_PRICE:
+            return f"{item.unit_price:.2f}"
+        if column == self.AMOUNT:
+            return f"{item.amount:.2f}"
+        return "Delete"
+
+    def setData(self, index, value, role=Qt.EditRole):
+        """Edit one field of an item, refreshing only its row"""
+        if not index.isValid() or role != Qt.EditRole:
+            return False
+
+        text = str(value).strip()
+        column = index.column()
+        try:
+            if column == self.DESCRIPTION:
+                if not text:
+                    return False
+                changes = {'description': text}
+            elif column == self.QUANTITY:
+                changes = {'quantity': parse_decimal(text)}
+            elif column == self.UNIT_PRICE:
+                changes = {'unit_price': parse_decimal(text)}
+            else:
+                return False
+        except ValueError:
+            return False
+
+        row = index.row()
+        self._bill.update_item(row, **changes)
+        self.dataChanged.emit(self.index(row, self.DESCRIPTION), self.index(row, self.AMOUNT))
+        self.totals_changed.emit()
+        return True
+
+    def set_bill(self, bill):
+        """Show the items of a bill, or nothing for None"""
+        self.beginResetModel()
+        self._bill = bill
+        self.endResetModel()
+        self.totals_changed.emit()
+
+    def add_item(self, description, quantity, unit_price):
+        """Append one item to the bill and return it"""
+        if self._bill is None:
+            return None
+        row = len(self._bill.items)
+        self.beginInsertRows(QModelIndex(), row, row)
+        item = self._bill.add_item(description, quantity, unit_price)
+        self.endInsertRows()
+        self.totals_changed.emit()
+        return item
+
+    def add_items(self, lines):
+        """Append many (description, quantity, unit_price) lines as one insert"""
+        lines = list(lines)
+        if self._bill is None or not lines:
+            return []
+        first = len(self._bill.items)
+        self.beginInsertRows(QModelIndex(), first, first + len(lines) - 1)
+        items = self._bill.add_items(lines)
+        self.endInsertRows()
+        self.totals_changed.emit()
+        return items
+
+    def remove_item(self, row):
+        """Remove the item shown in a row"""
+        if self._bill is None or not 0 <= row < len(self._bill.items):
+            return False
+        self.beginRemoveRows(QModelIndex(), row, row)
+        self._bill.remove_item(row)
+        self.endRemoveRows()
+        self.totals_changed.emit()
+        return True
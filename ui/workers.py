@@ -0,0 +1,165 @@
+# ui/workers.py
+from concurrent.futures import Future
+from PySide6.QtCore import QObject, QRunnable, QThreadPool, Signal
+from backends import Error
+from database import Database
+import logging
+import threading
+
+# Maximum number of threads running database calls at once
+MAX_DB_WORKERS = 4
+
+_executor = None
+
+def db_executor():
+    """Return the thread pool reserved for database calls"""
+    global _executor
+    if _executor is None:
+        _executor = QThreadPool()
+        _executor.setMaxThreadCount(MAX_DB_WORKERS)
+    return _executor
+
+
+class TaskSignals(QObject):
+    """Signals emitted by a background task"""
+
+    finished = Signal(object)
+    failed = Signal(str)
+    progress = Signal(object)
+
+
+class DbTask(QRunnable):
+    """Run a database call on a worker thread
+
+    The outcome is published both on signals (delivered on the GUI thread)
+    and on a concurrent.futures.Future for non-Qt callers.
+    """
+
+    def __init__(self, fn, *args, **kwargs):
+        super().__init__()
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.cancelled = False
+        self.future = Future()
+        self.signals = TaskSignals()
+
+    def run(self):
+        """Call the function unless the task was cancelled while queued"""
+        if not self.future.set_running_or_notify_cancel():
+            return
+        try:
+            result = self.fn(*self.args, **self.kwargs)
+        except Exception as e:
+            logging.error(f"Error in background task: {e}")
+            self.future.set_exception(e)
+            self.signals.failed.emit(str(e))
+            return
+        self.future.set_result(result)
+        self.signals.finished.emit(result)
+
+    def cancel(self):
+        """Skip the task if still queued and drop its result otherwise"""
+        self.cancelled = True
+        self.future.cancel()
+
+
+def submit(fn, *args, on_done=None, on_error=None, on_progress=None, **kwargs):
+    """Run fn(*args, **kwargs) on a database worker and return its DbTask
+
+    on_done and on_error are called on the GUI thread unless the task has
+    been cancelled by then. If on_progress is given, fn is also passed a
+    progress callback whose argument is delivered to on_progress.
+    """
+    task = DbTask(fn, *args, **kwargs)
+    if on_progress:
+        task.kwargs['progress'] = task.signals.progress.emit
+        task.signals.progress.connect(lambda value: task.cancelled or on_progress(value))
+    if on_done:
+        task.signals.finished.connect(lambda result: task.cancelled or on_done(result))
+    if on_error:
+        task.signals.failed.connect(lambda message: task.cancelled or on_error(message))
+    db_executor().start(task)
+    return task
+
+
+class SearchSignals(QObject):
+    """Signals emitted by a search task, tagged with its generation"""
+
+    rows = Signal(int, list)
+    finished = Signal(int)
+
+
+class SearchTask(QRunnable):
+    """Run a model search on a worker thread, streaming result chunks back"""
+
+    def __init__(self, generation, iter_search, term):
+        """iter_search is a model's iter_search(term, db) generator function"""
+        super().__init__()
+        self.generation = generation
+        self.iter_search = iter_search
+        self.term = term
+        self.cancelled = False
+        self.db = Database()
+        self.signals = SearchSignals()
+
+    def run(self):
+        """Fetch results chunk by chunk until done or cancelled"""
+        if self.cancelled:
+            return
+        try:
+            for rows in self.iter_search(self.term, self.db):
+                if self.cancelled:
+                    break
+                self.signals.rows.emit(self.generation, rows)
+        except Error:
+            pass    # Already logged; a killed search also ends here
+        self.signals.finished.emit(self.generation)
+
+    def cancel(self):
+        """Drop any further results and abort the query on the server"""
+        self.cancelled = True
+        # Sending KILL QUERY is a round trip, so keep it off the caller's thread.
+        # Not on db_executor: it would queue behind the searches it is meant to stop
+        threading.Thread(target=self.db.cancel, daemon=True).start()
+
+
+class SearchController(QObject):
+    """Runs searches in the background, keeping only the latest query alive
+
+    Each search gets a new generation number; results from older
+    generations are ignored and their queries killed.
+    """
+
+    rows = Signal(list)
+    finished = Signal()
+
+    def __init__(self, iter_search, parent=None):
+        super().__init__(parent)
+        self.iter_search = iter_search
+        self.generation = 0
+        self.task = None
+
+    def search(self, term):
+        """Start a search, cancelling the one in flight"""
+        self.cancel()
+        self.generation += 1
+        self.task = SearchTask(self.generation, self.iter_search, term)
+        self.task.signals.rows.connect(self._on_rows)
+        self.task.signals.finished.connect(self._on_finished)
+        db_executor().start(self.task)
+
+    def cancel(self):
+        """Cancel the search in flight, if any"""
+        if self.task is not None:
+            self.task.cancel()
+            self.task = None
+
+    def _on_rows(self, generation, rows):
+        if generation == self.generation:
+            self.rows.emit(rows)
+
+    def _on_finished(self, generation):
+        if generation == self.generation:
+            self.task = None
+            self.finished.emit()